@@ -0,0 +1,219 @@
+#
+#  OBOCache.py
+###########################################################################
+#
+#  Purpose:
+#
+#      A cache of parsed OBO files, so repeated runs against the same OBO
+#      snapshot (e.g. a noload run followed by the real load) do not have
+#      to parse the text again.
+#
+#      Each entry holds the header attributes and the term records that
+#      OBOParser returned for one OBO file.  Entries are keyed on:
+#
+#      - the SHA-256 of the OBO file contents
+#      - OBOParser.PARSER_VERSION
+#      - the vocabulary name and the namespaces from the RCD file
+#
+#      Entries are marshalled and zlib-compressed, one file per entry, in
+#      OBO_CACHE_DIR.  When the directory grows beyond OBO_CACHE_SIZE bytes,
+#      the least recently used entries are removed.
+#
+#  Env Vars:
+#
+#      OBO_CACHE_DIR   directory for the cache entries
+#      OBO_CACHE_SIZE  maximum total size of the entries, in bytes
+#                      (0, the default, disables the cache; the OBO file
+#                      is then not hashed)
+#
+###########################################################################
+
+import os
+import hashlib
+import marshal
+import zlib
+
+import OBOHeader
+import OBOTerm
+import OBOParser
+
+# Extension of the cache entry files.
+CACHE_SUFFIX = '.cache'
+
+# marshal format version used for the entries
+MARSHAL_VERSION = 4
+
+# block size used when hashing the OBO file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# CLASS: Cache
+# IS: A directory of parsed OBO files.
+# HAS: The cache directory, the maximum size of the cache and a log.
+# DOES: Computes cache keys, loads and saves entries and evicts old ones.
+#
+class Cache:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Creates the cache directory if it does not exist
+    # Throws: propagates exceptions creating the directory
+    #
+    def __init__ (self, cacheDir, maxSize, log):
+        self.cacheDir = cacheDir
+        self.maxSize = maxSize
+        self.log = log
+
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+
+
+    # Purpose: Compute the cache key for an OBO file.
+    # Returns: Key (hex str)
+    # Assumes: Nothing
+    # Effects: Reads the OBO file
+    # Throws: propagates exceptions reading the file
+    #
+    def getKey (self, oboFile, vocabName, namespaces):
+        digest = hashlib.sha256()
+
+        fp = open(oboFile, 'rb')
+        block = fp.read(HASH_BLOCK_SIZE)
+        while block:
+            digest.update(block)
+            block = fp.read(HASH_BLOCK_SIZE)
+        fp.close()
+
+        digest.update(('\t%s\t%s\t%s' % (OBOParser.PARSER_VERSION,
+            vocabName, '|'.join(sorted(namespaces)))).encode('utf-8'))
+
+        return digest.hexdigest()
+
+
+    # Purpose: Returns the name of the file that holds an entry.
+    # Returns: File name
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def getFileName (self, key):
+        return os.path.join(self.cacheDir, key + CACHE_SUFFIX)
+
+
+    # Purpose: Load an entry.
+    # Returns: Tuple of (OBOHeader.Header, list of OBOTerm.TermRecord),
+    #          or None if there is no (readable) entry for the key
+    # Assumes: Nothing
+    # Effects: Marks the entry as recently used; logs a cache miss
+    # Throws: Nothing
+    #
+    def load (self, key):
+        fileName = self.getFileName(key)
+
+        if not os.path.exists(fileName):
+            self.log.writeline('OBO cache miss: ' + fileName)
+            return None
+
+        try:
+            fp = open(fileName, 'rb')
+            data = fp.read()
+            fp.close()
+            version, defaultNamespace, terms = marshal.loads(zlib.decompress(data))
+            os.utime(fileName)
+        except (OSError, ValueError, EOFError, zlib.error) as e:
+            self.log.writeline('OBO cache miss (cannot read %s: %s)' % \
+                (fileName, e))
+            return None
+
+        header = OBOHeader.Header()
+        header.setVersion(version)
+        header.setDefaultNamespace(defaultNamespace)
+
+        self.log.writeline('Using cached OBO parse: ' + fileName)
+
+        return header, [OBOTerm.TermRecord._make(t) for t in terms]
+
+
+    # Purpose: Save an entry, then evict old entries if the cache is
+    #          too big.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Writes the entry file
+    # Throws: Nothing (a cache that cannot be written is only logged)
+    #
+    def save (self, key, header, terms):
+        fileName = self.getFileName(key)
+        tmpFileName = fileName + '.tmp'
+
+        data = zlib.compress(marshal.dumps((header.getVersion(),
+            header.getDefaultNamespace(), [tuple(t) for t in terms]),
+            MARSHAL_VERSION), 1)
+
+        try:
+            fp = open(tmpFileName, 'wb')
+            fp.write(data)
+            fp.close()
+            os.replace(tmpFileName, fileName)
+        except OSError as e:
+            self.log.writeline('Cannot write OBO cache file %s: %s' % \
+                (fileName, e))
+            return
+
+        self.log.writeline('Saved OBO parse to cache: ' + fileName)
+
+        self.evict(fileName)
+
+
+    # Purpose: Remove the least recently used entries until the cache is
+    #          no bigger than self.maxSize.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Removes entry files
+    # Throws: Nothing
+    #
+    def evict (self, keepFileName):
+        entries = []
+        totalSize = 0
+
+        for name in os.listdir(self.cacheDir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            fileName = os.path.join(self.cacheDir, name)
+            stat = os.stat(fileName)
+            entries.append((stat.st_mtime, stat.st_size, fileName))
+            totalSize = totalSize + stat.st_size
+
+        entries.sort()
+
+        for (mtime, size, fileName) in entries:
+            if totalSize <= self.maxSize:
+                break
+            if fileName == keepFileName:
+                continue
+            os.remove(fileName)
+            totalSize = totalSize - size
+            self.log.writeline('Evicted OBO cache file: ' + fileName)
+
+
+# Purpose: Create the cache configured by OBO_CACHE_DIR/OBO_CACHE_SIZE.
+# Returns: Cache object, or None if the cache is not configured
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getCache (log):
+    try:
+        cacheDir = os.environ['OBO_CACHE_DIR']
+        maxSize = int(os.environ['OBO_CACHE_SIZE'])
+    except (KeyError, ValueError):
+        return None
+
+    if not cacheDir or maxSize <= 0:
+        return None
+
+    try:
+        return Cache(cacheDir, maxSize, log)
+    except OSError as e:
+        log.writeline('Cannot create OBO cache directory %s: %s' % \
+            (cacheDir, e))
+        return None
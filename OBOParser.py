@@ -1,14 +1,43 @@
 import os
+import io
 import re
+import mmap
+import marshal
+import concurrent.futures
 
 import OBOHeader
 import OBOTerm
+import VocabPolicy
+
+# Version of the tag rules below.  Change this whenever the parser would
+# return different terms for the same file; it is part of the OBOCache key.
+PARSER_VERSION = '3'
+
+# Value grammars for the tags that need more than "everything after the
+# first space".  These are compiled once when the module is imported.
+#
+# def:      "text" [xrefs]           -> text up to the next double quote
+# synonym:  "text" TYPE [QUALIFIER]  -> text, type and optional qualifier
+# xref:     ID {trailing modifiers}  -> ID with any modifiers removed
+#
+DEF_PATTERN = re.compile(r'"([^"]*)')
+SYNONYM_PATTERN = re.compile(r'"([^"]*)"?\s*([^ "]*)(?: ([^ "]*))?')
+XREF_PATTERN = re.compile(r'[^{]*')
+
+# number of chunks given to each worker of a ParallelParser; more chunks
+# than workers evens out the load when some chunks parse slower
+CHUNKS_PER_WORKER = 4
+
+# smallest OBO file parsed with workers, in bytes (see getParseWorkers);
+# below it, starting the pool costs more than the workers save
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024
 
 # CLASS: Parser
 # IS: An object that knows how to parse an OBO format file and extract
 #     specific attributes that are needed by the OBO vocabulary loader.
 # HAS: A header object to hold header attributes and a term object
-#      to hold term attributes.
+#      to hold term attributes.  A dispatch table that maps each tag
+#      of interest to the method that handles it.
 # DOES: Parses the OBO format file.
 #
 class Parser:
@@ -23,35 +52,83 @@ class Parser:
         self.fpOBO = fpOBO
         self.log = log	# for debugging only
         self.vocabName = os.environ['VOCAB_NAME']
+        self.policy = VocabPolicy.getPolicy(self.vocabName)
 
         # Create the head an term objects.
         #
         self.header = OBOHeader.Header()
         self.term = OBOTerm.Term()
 
+        # Build the tag dispatch table for term stanzas.  The vocabulary
+        # policy is applied here, once, rather than for every line of the
+        # file.
+        #
+        self.handlers = self.buildHandlers()
+
         # Read through the header records from the OBO file and save the
         # necessary attributes in the header object.
         #
         self.line = self.fpOBO.readline()
         while self.line and self.line[0] != '[':
-            self.line = self.line[:-1]
-            tag = re.split (':', self.line, 1)[0]
+            line = self.line[:-1]
+            tag = line.partition(':')[0]
 
             # Save the version number.
             #
             if tag == 'format-version':
-                self.header.setVersion (re.split (' ', self.line, 1)[1])
+                self.header.setVersion (line.partition(' ')[2])
 
             # Save the default namespace.
             #
-            if tag == 'default-namespace':
-                self.header.setDefaultNamespace (re.split (' ', self.line, 1)[1])
+            elif tag == 'default-namespace':
+                self.header.setDefaultNamespace (line.partition(' ')[2])
 
             # Read the next line from the OBO file.
             #
             self.line = self.fpOBO.readline()
 
 
+    # Purpose: Builds the dispatch table of tag -> handler method for
+    #          the vocabulary being loaded.
+    # Returns: Dictionary of tag -> bound method
+    # Assumes: self.policy has been set
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def buildHandlers (self):
+        handlers = {
+            'id' : self.parseID,
+            'name' : self.parseName,
+            'namespace' : self.parseNamespace,
+            'comment' : self.parseComment,
+            'def' : self.parseDefinition,
+            'is_obsolete' : self.parseObsolete,
+            'is_a' : self.parseIsA,
+            'union_of' : self.parseUnionOf,
+            'synonym' : self.parseSynonym,
+            'subset' : self.parseSubset,
+        }
+
+        policy = self.policy
+
+        if policy.loadAltID:
+            handlers['alt_id'] = self.parseAltID
+
+        if policy.loadRelationship:
+            handlers['relationship'] = self.parseRelationship
+
+        if policy.xrefTrie is not None:
+            handlers['xref'] = self.parseXref
+
+        if policy.subsetSet is not None:
+            handlers['subset'] = self.parseSelectedSubset
+
+        if policy.synonymQualifier:
+            handlers['synonym'] = self.parseQualifiedSynonym
+
+        return handlers
+
+
     # Purpose: Returns the header object.
     # Returns: Header object
     # Assumes: Nothing
@@ -72,128 +149,284 @@ class Parser:
     def nextTerm (self):
         self.term.clear()
 
+        fpOBO = self.fpOBO
+        handlers = self.handlers
+
         # Read through the OBO file until a term stanza is found or EOF is
         # reached.
         #
-        while self.line and self.line[0:6] != '[Term]':
-            self.line = self.fpOBO.readline()
+        line = self.line
+        while line and line[0:6] != '[Term]':
+            line = fpOBO.readline()
 
         # If the current line is not the start of a term stanza, it must be
         # an EOF condition.
         #
-        if self.line[0:6] != '[Term]':
+        if line[0:6] != '[Term]':
+            self.line = line
             return None
 
         # Read the first line of the term stanza and continue to process the
-        # term until another stanza is found or EOF is reached.
+        # term until another stanza is found or EOF is reached.  Each line
+        # is split once and handed to the handler for its tag (if any).
         #
-        self.line = self.fpOBO.readline()
+        line = fpOBO.readline()
 
-        while self.line and self.line[0] != '[':
-            self.line = self.line[:-1]
-            tag = re.split (':', self.line, 1)[0]
+        while line and line[0] != '[':
+            line = line[:-1]
+            handler = handlers.get(line.partition(':')[0])
+            if handler is not None:
+                handler(line.partition(' ')[2])
 
-            # Save the term ID.
+            # Read the next line from the OBO file.
             #
-            if tag == 'id':
-                self.term.setTermID (re.split (' ', self.line, 1)[1].strip())
+            line = fpOBO.readline()
 
-            # Save the term name.
-            #
-            if tag == 'name':
-                self.term.setName (re.split (' ', self.line, 1)[1].strip())
+        self.line = line
+        return self.term
 
-            # Save the namespace.
-            #
-            if tag == 'namespace':
-                self.term.setNamespace (re.split (' ', self.line, 1)[1].strip())
 
-            # Save the comment.
-            #
-            if tag == 'comment':
-                self.term.setComment (re.split (' ', self.line, 1)[1])
+    # Purpose: Iterates over the remaining "Term" stanzas of the OBO input
+    #          file.
+    # Returns: Generator of OBOTerm.TermRecord objects
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    # Notes: Each record is an independent, immutable copy, so callers may
+    #        keep, batch or pass along the records they are given.
+    #
+    def __iter__ (self):
+        term = self.nextTerm()
+        while term != None:
+            yield term.freeze()
+            term = self.nextTerm()
 
-            # Save the definition.
-            #
-            if tag == 'def':
-                newLine = self.line.replace('\\"', "'")
-                self.term.setDefinition (re.split ('"', newLine)[1])
 
-            # Save the obsolete indicator.
-            #
-            if tag == 'is_obsolete':
-                obsolete = re.split (' ', self.line, 1)[1]
-                if obsolete == 'true':
-                    self.term.setObsolete (1)
-                else:
-                    self.term.setObsolete (0)
-
-            # Save an alternate ID.
-            # per TR13072/do not attach alt_id for Disease Ontology
-            if tag == 'alt_id' and self.vocabName != 'Disease Ontology':
-                self.term.addAltID (re.split (' ', self.line, 1)[1].strip())
-
-            # Save an alternate ID using xref.
-            # hard-coded list of xref to be loaded from Disease Ontology
-            xrefList = ['OMIM:', 'EFO:', 'KEGG:', 'MESH:', 'NCI:', 'ORDO:', 'HP:', 'UMLS_CUI', 'ICD10CM', 'ICD9CM']
-            if tag == 'xref' and self.vocabName == 'Disease Ontology':
-                for x in xrefList:
-                    if self.line.find(x) >= 0:
-                        xrefID = re.split (' ', self.line, 1)[1].strip()
-                        xrefID = xrefID.replace('\\n', '')
-                        xrefID = re.split ('{', xrefID, 1)[0].strip()
-                        self.term.addAltID (xrefID)
-
-            # Save an "is-a" relationship.
-            #
-            if tag == 'is_a':
-                self.term.addRelationship (re.split (' ', self.line)[1])
-                self.term.addRelationshipType ('is-a')
+    # The following methods are the tag handlers used by nextTerm().
+    # Each one is given the value of the tag (everything after the first
+    # space of the line, without the trailing newline).
+    #
 
-            # Save an "union_of" relationship.
-            #
-            if tag == 'union_of':
-                self.term.addRelationship (re.split (' ', self.line)[1])
-                self.term.addRelationshipType ('union_of')
+    def parseID (self, value):
+        self.term.setTermID (value.strip())
 
-            # Save a relationship.
-            #
-            if tag == 'relationship':
-                if self.vocabName == 'Disease Ontology':
-                    continue
-                self.term.addRelationship (re.split (' ', self.line)[2])
-                self.term.addRelationshipType (re.split (' ', self.line)[1])
+    def parseName (self, value):
+        self.term.setName (value.strip())
 
-            # Save a synonym and its synonym type.
-            #
-            if tag == 'synonym':
-                self.term.addSynonym (re.split ('"', self.line)[1].rstrip())
-                synType = re.split (' ', re.split ('"', self.line)[2].lstrip())[0]
-                if self.vocabName == 'Feature Relationship' and synType == 'RELATED':
-                    # example from obo file:
-                    # synonym: "contains" RELATED REVERSE
-                    # synonym: "is in " RELATED FORWARD
-
-                    # RELATED FORWARD/RELATED REVERSE
-                    synType = synType + ' ' + re.split (' ', re.split ('"', self.line)[2].lstrip())[1]
-
-                self.term.addSynonymType (synType)
-
-            # Save the subset value
-            # For MCV this is the show/hide value of the term
-            # For Disease Ontology, this is the DO_MGI_slim
-            #
-            subsetList = ['DO_MGI_slim', 'DO_GXD_slim']
-            if tag == 'subset':
-                if self.vocabName == 'Disease Ontology':
-                    for s in subsetList:
-                        if self.line.find(s) >= 0:
-                            self.term.addSubset(re.split (' ', self.line)[1].strip())
-                else:
-                    self.term.addSubset(re.split (' ', self.line)[1])
+    def parseNamespace (self, value):
+        self.term.setNamespace (value.strip())
 
-            # Read the next line from the OBO file.
-            #
-            self.line = self.fpOBO.readline()
+    def parseComment (self, value):
+        self.term.setComment (value)
 
-        return self.term
+    def parseDefinition (self, value):
+        match = DEF_PATTERN.search(value.replace('\\"', "'"))
+        if match:
+            self.term.setDefinition (match.group(1))
+
+    def parseObsolete (self, value):
+        if value == 'true':
+            self.term.setObsolete (1)
+        else:
+            self.term.setObsolete (0)
+
+    def parseAltID (self, value):
+        self.term.addAltID (value.strip())
+
+    # Save an alternate ID using xref, if it starts with one of the xref
+    # prefixes of the vocabulary policy.
+    #
+    def parseXref (self, value):
+        xrefID = XREF_PATTERN.match(value.strip().replace('\\n', '')).group(0).strip()
+        if self.policy.xrefTrie.match(xrefID) is not None:
+            self.term.addAltID (xrefID)
+
+    def parseIsA (self, value):
+        self.term.addRelationship (value.split(' ', 1)[0])
+        self.term.addRelationshipType ('is-a')
+
+    def parseUnionOf (self, value):
+        self.term.addRelationship (value.split(' ', 1)[0])
+        self.term.addRelationshipType ('union_of')
+
+    def parseRelationship (self, value):
+        tokens = value.split(' ', 2)
+        self.term.addRelationship (tokens[1])
+        self.term.addRelationshipType (tokens[0])
+
+    def parseSynonym (self, value):
+        match = SYNONYM_PATTERN.search(value)
+        if match:
+            self.term.addSynonym (match.group(1).rstrip())
+            self.term.addSynonymType (match.group(2))
+
+    # Feature Relationship synonyms carry a direction qualifier on the
+    # RELATED type.  Example from obo file:
+    #   synonym: "contains" RELATED REVERSE
+    #   synonym: "is in " RELATED FORWARD
+    #
+    def parseQualifiedSynonym (self, value):
+        match = SYNONYM_PATTERN.search(value)
+        if match:
+            synType = match.group(2)
+            if synType == 'RELATED' and match.group(3) is not None:
+                # RELATED FORWARD/RELATED REVERSE
+                synType = synType + ' ' + match.group(3)
+            self.term.addSynonym (match.group(1).rstrip())
+            self.term.addSynonymType (synType)
+
+    # Save the subset value
+    # For MCV this is the show/hide value of the term
+    #
+    def parseSubset (self, value):
+        self.term.addSubset (value.split(' ', 1)[0])
+
+    # Save the subset value, if it is one of the subsets of the vocabulary
+    # policy.  For Disease Ontology, this is the DO_MGI_slim/DO_GXD_slim
+    #
+    def parseSelectedSubset (self, value):
+        subset = value.split(' ', 1)[0].strip()
+        if subset in self.policy.subsetSet:
+            self.term.addSubset (subset)
+
+
+# Purpose: Decide how many worker processes to parse an OBO file with.
+# Returns: Tuple of (integer number of workers, str reason if it is fewer
+#          than asked for, else None); 1 means parse without a pool
+# Assumes: oboFile is a plain (uncompressed) file
+# Effects: Nothing
+# Throws: propagates exceptions reading the size of the file
+#
+def getParseWorkers (oboFile, workers):
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    if workers > cpus:
+        workers = cpus
+        if workers < 2:
+            return 1, 'only 1 CPU is available'
+        return workers, 'only %d CPUs are available' % cpus
+
+    if workers > 1 and os.path.getsize(oboFile) < PARALLEL_MIN_SIZE:
+        return 1, 'the file is smaller than %d bytes' % PARALLEL_MIN_SIZE
+
+    return workers, None
+
+
+# CLASS: ParallelParser
+# IS: An object that parses an OBO format file using a pool of worker
+#     processes.
+# HAS: The name of the OBO file, a header object and the number of
+#      workers to use.
+# DOES: Splits the file into chunks at stanza boundaries, parses the
+#       chunks in parallel with the same tag rules as Parser and returns
+#       the terms in the order they appear in the file.
+#
+# The workers send each chunk's terms back as one marshalled list of
+# plain tuples, which the parent turns back into TermRecords; this is
+# several times cheaper than pickling the TermRecords one by one, which
+# cost more than the parse itself.  It only pays with more than one CPU
+# and a large enough file (see getParseWorkers).
+#
+class ParallelParser:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: oboFile is a plain (seekable, uncompressed) file
+    # Effects: Reads the header of the OBO file
+    # Throws: propagates exceptions opening the file
+    #
+    def __init__(self, oboFile, log, workers):
+        self.oboFile = oboFile
+        self.log = log
+        self.workers = workers
+
+        fp = open(oboFile, 'r', encoding='utf-8')
+        self.header = Parser(fp, log).getHeader()
+        fp.close()
+
+
+    # Purpose: Returns the header object.
+    # Returns: Header object
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def getHeader (self):
+        return self.header
+
+
+    # Purpose: Split the OBO file into byte ranges that each start at the
+    #          beginning of a stanza (a line starting with "[").  The
+    #          first range also includes the header.
+    # Returns: List of (start, end) tuples, in file order
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def getChunks (self):
+        fp = open(self.oboFile, 'rb')
+        size = os.fstat(fp.fileno()).st_size
+        if size == 0:
+            fp.close()
+            return []
+
+        mm = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+        numChunks = self.workers * CHUNKS_PER_WORKER
+
+        boundaries = [0]
+        for i in range(1, numChunks):
+            pos = mm.find(b'\n[', max(size * i // numChunks, boundaries[-1]))
+            if pos < 0:
+                break
+            if pos + 1 > boundaries[-1]:
+                boundaries.append(pos + 1)
+        boundaries.append(size)
+
+        mm.close()
+        fp.close()
+
+        return [(self.oboFile, boundaries[i], boundaries[i + 1])
+                for i in range(len(boundaries) - 1)]
+
+
+    # Purpose: Iterates over the "Term" stanzas of the OBO input file.
+    # Returns: Generator of OBOTerm.TermRecord objects, in file order
+    # Assumes: Nothing
+    # Effects: Starts (and stops) the worker processes
+    # Throws: propagates exceptions raised by the workers
+    #
+    def __iter__ (self):
+        chunks = self.getChunks()
+
+        new = tuple.__new__
+        TermRecord = OBOTerm.TermRecord
+
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+            for records in executor.map(parseChunk, chunks):
+                for record in marshal.loads(records):
+                    yield new(TermRecord, record)
+
+
+# Purpose: Parse one chunk of an OBO file (run by ParallelParser workers).
+# Returns: bytes: the terms of the chunk, a marshalled list of tuples (in
+#          the field order of OBOTerm.TermRecord)
+# Assumes: The chunk starts at the beginning of the file or of a stanza
+# Effects: Nothing
+# Throws: propagates exceptions reading the file
+#
+def parseChunk (chunk):
+    oboFile, start, end = chunk
+
+    fp = open(oboFile, 'rb')
+    fp.seek(start)
+    text = fp.read(end - start).decode('utf-8')
+    fp.close()
+
+    # newline=None gives the same line-ending translation as a file
+    # opened in text mode.
+    #
+    parser = Parser(io.StringIO(text, newline = None), None)
+    return marshal.dumps([tuple(record) for record in parser])
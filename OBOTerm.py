@@ -1,5 +1,7 @@
 import os
 import re
+import sys
+import collections
 
 # CLASS: Term
 # IS: An object that holds specific attributes from a Term stanza of an
@@ -116,6 +118,26 @@ class Term:
     def getSubset (self):
         return self.subset
 
+    # Purpose: Return an immutable copy of the term.
+    # Returns: TermRecord object
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def freeze (self):
+        return TermRecord(self.termID,
+                          self.name,
+                          self.namespace,
+                          self.comment,
+                          self.definition,
+                          self.obsolete,
+                          tuple(self.altID),
+                          tuple(self.relationship),
+                          tuple(map(sys.intern, self.relationshipType)),
+                          tuple(self.synonym),
+                          tuple(map(sys.intern, self.synonymType)),
+                          tuple(self.subset))
+
     # Purpose: Return all the attributes as one str.(for debugging).
     # Returns: String of all objects.
     # Assumes: Nothing
@@ -135,3 +157,55 @@ class Term:
                '|synonym=' + ','.join(self.synonym) + \
                '|synonymType=' + ','.join(self.synonymType) + \
                '|subset=' + ','.join(self.subset) + '|'
+
+
+# CLASS: TermRecord
+# IS: An immutable record of the attributes from a Term stanza of an OBO
+#     format file.  Unlike Term, a TermRecord is never cleared or reused by
+#     the parser, so it can be buffered, batched or handed to another
+#     thread.  The relationship and synonym types are interned strings.
+# HAS: Term attributes (lists are stored as tuples)
+# DOES: Provides the same get methods as Term
+#
+class TermRecord(collections.namedtuple('TermRecord',
+        ['termID', 'name', 'namespace', 'comment', 'definition', 'obsolete',
+         'altID', 'relationship', 'relationshipType', 'synonym',
+         'synonymType', 'subset'])):
+
+    __slots__ = ()
+
+    def getTermID (self):
+        return self.termID
+
+    def getName (self):
+        return self.name
+
+    def getNamespace (self):
+        return self.namespace
+
+    def getComment (self):
+        return ''.join([i if ord(i) < 128 else ' ' for i in self.comment])
+
+    def getDefinition (self):
+        return ''.join([i if ord(i) < 128 else ' ' for i in self.definition])
+
+    def getObsolete (self):
+        return self.obsolete
+
+    def getAltID (self):
+        return self.altID
+
+    def getRelationship (self):
+        return self.relationship
+
+    def getRelationshipType (self):
+        return self.relationshipType
+
+    def getSynonym (self):
+        return self.synonym
+
+    def getSynonymType (self):
+        return self.synonymType
+
+    def getSubset (self):
+        return self.subset
@@ -9,7 +9,7 @@
 #
 # Input:
 #
-#	omim.txt
+#	omim.txt (may be gzip, bzip2 or xz compressed)
 #       OMIM.translation
 #	OMIM.special
 #	OMIM.exclude
@@ -54,6 +54,7 @@ import os
 import string
 import db
 import reportlib
+import inputFile
 
 # globals
 
@@ -297,7 +298,7 @@ def processOMIM():
     synonyms = []
     isGeneOnly = 0
 
-    inFile = open(inFileName, 'r')
+    inFile = inputFile.openInput(inFileName)
 
     line = inFile.readline()
     while line:
@@ -0,0 +1,210 @@
+#
+#  VocabPolicy.py
+###########################################################################
+#
+#  Purpose:
+#
+#      The vocabulary specific rules used by OBOParser and loadOBO when
+#      parsing an OBO file and writing the Termfile/DAG files.
+#
+#      Each vocabulary that needs rules different from the defaults has
+#      a Policy subclass registered in POLICIES under its VOCAB_NAME.  The
+#      parser and the writer look the policy up once at startup and then
+#      only test its attributes, so a new vocabulary can be added here
+#      without editing either of them.
+#
+#      If a change here would make the parser return different terms for
+#      the same file, change OBOParser.PARSER_VERSION so cached parses
+#      (OBOCache) are not reused.
+#
+###########################################################################
+
+# CLASS: PrefixTrie
+# IS: A character trie of string prefixes.
+# HAS: Nested dictionaries of character -> node; a node that ends a
+#      prefix has the key None.
+# DOES: Finds the prefix (if any) that a string starts with.
+#
+class PrefixTrie:
+
+    def __init__ (self, prefixes = []):
+        self.root = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add (self, prefix):
+        node = self.root
+        for c in prefix:
+            node = node.setdefault(c, {})
+        node[None] = prefix
+
+    # Purpose: Find the shortest prefix in the trie that text starts with.
+    # Returns: The prefix, or None if there is no such prefix
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def match (self, text):
+        node = self.root
+        for c in text:
+            if None in node:
+                return node[None]
+            node = node.get(c)
+            if node is None:
+                return None
+        return node.get(None)
+
+
+# CLASS: Policy
+# IS: The default rules for loading an OBO vocabulary.
+# HAS: Attributes that switch the vocabulary specific behavior on or off.
+# DOES: Nothing
+#
+class Policy:
+
+    # --- parsing (OBOParser) ---
+
+    # load alt_id tags as secondary IDs
+    loadAltID = 1
+
+    # load relationship tags
+    loadRelationship = 1
+
+    # xref prefixes to load as secondary IDs (None = do not load xrefs)
+    xrefPrefixes = None
+
+    # subsets to load (None = load every subset tag)
+    subsets = None
+
+    # keep the qualifier after a RELATED synonym type (RELATED FORWARD)
+    synonymQualifier = 0
+
+    # --- writing the Termfile/DAG files (loadOBO) ---
+
+    # write the DAG_ROOT_ID node to the DAG file(s)
+    writeRoot = 1
+
+    # if set, the root node is only written to the first DAG file, with
+    # this node label
+    rootNodeLabel = None
+
+    # write an obsolete parent term/DAG (OBSOLETE_* settings)
+    obsoleteParent = 0
+
+    # skip the term whose ID is DAG_ROOT_ID
+    skipRootTerm = 0
+
+    # skip terms that do not have a namespace
+    skipNoNamespace = 0
+
+    # skip terms whose ID does not contain this text (None = no check)
+    requiredIDText = None
+
+    # skip obsolete terms
+    skipObsolete = 0
+
+    # namespace used for every term (None = use the term's namespace)
+    namespace = None
+
+    # a term without a namespace is a fatal error (otherwise the default
+    # namespace from the header is used)
+    requireNamespace = 0
+
+    # validate relationship types and write the DAG file(s)
+    writeDAG = 1
+
+    # the term named after its namespace is the root of that DAG (rather
+    # than a child of DAG_ROOT_ID)
+    namespaceTermAsRoot = 0
+
+    # the (single) subset of a term is its DAG node label
+    subsetNodeLabel = 0
+
+    # subset -> environment variable naming the file that lists the IDs of
+    # the terms in that subset
+    subsetFiles = {}
+
+    def __init__ (self, vocabName):
+        self.vocabName = vocabName
+
+        if self.xrefPrefixes is None:
+            self.xrefTrie = None
+        else:
+            self.xrefTrie = PrefixTrie(self.xrefPrefixes)
+
+        if self.subsets is None:
+            self.subsetSet = None
+        else:
+            self.subsetSet = frozenset(self.subsets)
+
+
+class GOPolicy (Policy):
+    obsoleteParent = 1
+    requireNamespace = 1
+
+
+class DOPolicy (Policy):
+    # per TR13072/do not attach alt_id for Disease Ontology
+    loadAltID = 0
+    loadRelationship = 0
+    # hard-coded list of xref to be loaded from Disease Ontology
+    xrefPrefixes = ['OMIM:', 'EFO:', 'KEGG:', 'MESH:', 'NCI:', 'ORDO:', 'HP:', 'UMLS_CUI', 'ICD10CM', 'ICD9CM']
+    # TR12427/Disease Ontology/subset DO_MGI_slim
+    subsets = ['DO_MGI_slim', 'DO_GXD_slim']
+    subsetFiles = {'DO_MGI_slim' : 'DO_MGI_SLIM_FILE',
+                   'DO_GXD_slim' : 'DO_GXD_SLIM_FILE'}
+    requiredIDText = 'DOID:'
+
+
+class FeatureRelationshipPolicy (Policy):
+    synonymQualifier = 1
+    # ignore the 'real' root for Feature Relationship vocab
+    writeRoot = 0
+    skipRootTerm = 1
+    requireNamespace = 1
+    namespaceTermAsRoot = 1
+
+
+class MCVPolicy (Policy):
+    # for MCV the subset is the show/hide value (Node Label) of the term
+    rootNodeLabel = 'show'
+    subsetNodeLabel = 1
+
+
+class EMAPAPolicy (Policy):
+    skipNoNamespace = 1
+
+
+class HPOPolicy (Policy):
+    skipObsolete = 1
+
+
+class CLPolicy (Policy):
+    namespace = 'cell'
+    writeDAG = 0
+
+
+class ECOPolicy (Policy):
+    namespace = 'eco'
+
+
+# VOCAB_NAME -> Policy class
+POLICIES = {
+    'GO' : GOPolicy,
+    'Disease Ontology' : DOPolicy,
+    'Feature Relationship' : FeatureRelationshipPolicy,
+    'Marker Category' : MCVPolicy,
+    'EMAPA' : EMAPAPolicy,
+    'Human Phenotype Ontology' : HPOPolicy,
+    'Cell Ontology' : CLPolicy,
+    'Evidence Code Ontology' : ECOPolicy,
+}
+
+# Purpose: Get the policy for a vocabulary.
+# Returns: Policy object
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getPolicy (vocabName):
+    return POLICIES.get(vocabName, Policy)(vocabName)
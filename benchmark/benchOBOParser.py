@@ -0,0 +1,233 @@
+#
+#  benchOBOParser.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Benchmark the OBOParser against the original (legacy) parser on a
+#      large synthetic OBO file and confirm that both produce the same
+#      terms.  The legacy parser is OBOParser.py as of the baseline commit
+#      (BASELINE), read from git, so this must be run in a git checkout.
+#
+#      The file has "relationship" lines for every vocabulary, so a run
+#      with -v 'Disease Ontology' checks that both parsers skip them.
+#
+#  Usage:
+#
+#      benchOBOParser.py [-t <terms>] [-v <vocab name>] [-w <workers>] [-k]
+#
+#      where
+#          -t is the number of [Term] stanzas to generate (default 200000)
+#
+#          -v is the VOCAB_NAME to parse as (default 'GO')
+#
+#          -w also times OBOParser.ParallelParser with 2, 4, ... up to
+#             this many workers (whatever the number of CPUs), and
+#             prints how many loadOBO would use (see getParseWorkers)
+#
+#          -k keeps the generated OBO file (its name is printed)
+#
+#  Outputs:
+#
+#      - stanzas/sec for each parser, written to stdout
+#
+#  Exit Codes:
+#
+#      0:  Successful completion, the parsers agree
+#      1:  The parsers produced different terms
+#
+###########################################################################
+
+import sys
+import os
+import getopt
+import random
+import subprocess
+import tempfile
+import time
+import types
+
+# adjust the path so that it will find the vocload modules one directory up
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+USAGE = 'Usage:  %s [-t <terms>] [-v <vocab name>] [-w <workers>] [-k]' % sys.argv[0]
+
+NAMESPACES = ['biological_process', 'molecular_function', 'cellular_component']
+SYNONYM_TYPES = ['EXACT', 'BROAD', 'NARROW', 'RELATED']
+RELATIONSHIPS = ['part_of', 'regulates', 'has_part']
+
+# the commit whose OBOParser.py is the legacy parser
+BASELINE = '20a5d62'
+
+# Purpose: Write a synthetic OBO file with the requested number of terms.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to fp
+# Throws: Nothing
+#
+def writeOBOFile (fp, numTerms):
+    rand = random.Random(numTerms)
+
+    fp.write('format-version: 1.2\n')
+    fp.write('default-namespace: biological_process\n')
+    fp.write('ontology: synthetic\n\n')
+
+    for i in range(1, numTerms + 1):
+        termID = 'GO:%07d' % i
+        fp.write('[Term]\n')
+        fp.write('id: %s\n' % termID)
+        fp.write('name: synthetic term %d\n' % i)
+        fp.write('namespace: %s\n' % NAMESPACES[i % len(NAMESPACES)])
+        if i % 7 == 0:
+            fp.write('alt_id: GO:%07d\n' % (numTerms + i))
+        fp.write('def: "Definition of term %d with a \\"quoted\\" word." [GOC:syn, PMID:%d]\n' % (i, i))
+        if i % 5 == 0:
+            fp.write('comment: Comment for term %d.\n' % i)
+        if i % 3 == 0:
+            fp.write('subset: goslim_generic\n')
+        for j in range(rand.randint(0, 4)):
+            fp.write('synonym: "synonym %d of term %d" %s [GOC:syn]\n' % \
+                (j, i, SYNONYM_TYPES[(i + j) % len(SYNONYM_TYPES)]))
+        if i % 4 == 0:
+            fp.write('xref: MESH:D%06d {source="syn:%d"}\n' % (i, i))
+        if i % 11 == 0:
+            fp.write('is_obsolete: true\n')
+        elif i > 1:
+            for j in range(rand.randint(1, 3)):
+                fp.write('is_a: GO:%07d ! parent\n' % rand.randint(1, i - 1))
+            if i % 2 == 0:
+                fp.write('relationship: %s GO:%07d ! other\n' % \
+                    (RELATIONSHIPS[i % len(RELATIONSHIPS)], rand.randint(1, i - 1)))
+        fp.write('\n')
+
+    fp.write('[Typedef]\n')
+    fp.write('id: part_of\n')
+    fp.write('name: part of\n')
+
+
+# Purpose: Load OBOParser.py as of the baseline commit.
+# Returns: module
+# Assumes: the benchmark is run in a git checkout of vocload
+# Effects: Runs 'git show'
+# Throws: subprocess.CalledProcessError if git cannot show the file
+#
+def loadLegacyParser ():
+    source = subprocess.check_output(['git', 'show', BASELINE + ':OBOParser.py'],
+        cwd = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    module = types.ModuleType('legacyOBOParser')
+    module.__file__ = '%s:OBOParser.py' % BASELINE
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+
+# Purpose: Parse the file with the given parser module.
+# Returns: Tuple of (number of stanzas, elapsed seconds, list of term dumps)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def runParser (module, oboFile, workers = 1):
+    fp = open(oboFile, 'r', encoding='utf-8')
+    dumps = []
+
+    start = time.perf_counter()
+    if workers > 1:
+        for term in module.ParallelParser(oboFile, None, workers):
+            dumps.append(term)
+    else:
+        parser = module.Parser(fp, None)
+        term = parser.nextTerm()
+        while term != None:
+            dumps.append(term.debug())
+            term = parser.nextTerm()
+    elapsed = time.perf_counter() - start
+
+    if workers > 1:
+        dumps = [OBOTerm.Term.debug(term) for term in dumps]
+
+    fp.close()
+    return len(dumps), elapsed, dumps
+
+
+#
+#  MAIN
+#
+
+try:
+    options, args = getopt.getopt(sys.argv[1:], 't:v:w:k')
+except:
+    print(USAGE)
+    sys.exit(1)
+
+numTerms = 200000
+vocabName = 'GO'
+maxWorkers = 1
+keepFile = 0
+for (option, value) in options:
+    if option == '-t':
+        numTerms = int(value)
+    elif option == '-v':
+        vocabName = value
+    elif option == '-w':
+        maxWorkers = int(value)
+    elif option == '-k':
+        keepFile = 1
+
+os.environ['VOCAB_NAME'] = vocabName
+
+import OBOParser
+import OBOTerm
+legacyOBOParser = loadLegacyParser()
+
+fd, oboFile = tempfile.mkstemp(suffix = '.obo')
+fp = os.fdopen(fd, 'w')
+writeOBOFile(fp, numTerms)
+fp.close()
+
+print('OBO file: %s (%d terms, VOCAB_NAME=%s)' % (oboFile, numTerms, vocabName))
+
+legacyCount, legacyTime, legacyDumps = runParser(legacyOBOParser, oboFile)
+print('legacy  : %8d stanzas in %7.3f sec = %10.0f stanzas/sec' % \
+    (legacyCount, legacyTime, legacyCount / legacyTime))
+
+newCount, newTime, newDumps = runParser(OBOParser, oboFile)
+print('current : %8d stanzas in %7.3f sec = %10.0f stanzas/sec' % \
+    (newCount, newTime, newCount / newTime))
+
+print('speedup : %.2fx' % (legacyTime / newTime))
+
+if maxWorkers > 1:
+    workers, reason = OBOParser.getParseWorkers(oboFile, maxWorkers)
+    print('loadOBO would parse with %d worker(s)%s' % (workers,
+        reason and ': ' + reason or ''))
+
+workers = 2
+parallelAgree = 1
+while workers <= maxWorkers:
+    count, elapsed, dumps = runParser(OBOParser, oboFile, workers)
+    print('%2d workers: %8d stanzas in %7.3f sec = %10.0f stanzas/sec' % \
+        (workers, count, elapsed, count / elapsed))
+    if dumps != newDumps:
+        print('FAILED: %d workers disagree with the serial parser' % workers)
+        parallelAgree = 0
+    workers = workers * 2
+
+if not keepFile:
+    os.remove(oboFile)
+
+if not parallelAgree:
+    sys.exit(1)
+
+if legacyDumps != newDumps:
+    for i in range(min(len(legacyDumps), len(newDumps))):
+        if legacyDumps[i] != newDumps[i]:
+            print('first difference at stanza %d:' % (i + 1))
+            print('  legacy : ' + legacyDumps[i])
+            print('  current: ' + newDumps[i])
+            break
+    print('FAILED: parsers disagree')
+    sys.exit(1)
+
+print('parsers agree')
+sys.exit(0)
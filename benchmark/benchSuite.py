@@ -0,0 +1,582 @@
+#
+#  benchSuite.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Time the parsing, sorting and loading code of the vocabulary loads
+#      on a synthetic ontology (see synthOntology.py) and report the
+#      throughput and peak memory of each as JSON.  A saved report can be
+#      used as a baseline that later runs are compared to.
+#
+#      The cases are:
+#
+#          OBOParser       OBOParser.Parser over the OBO file
+#          parseOBOFile    loadOBO.parseOBOFile (term records, DAG file)
+#          sortNode        loadTopSort.sortNode over the DAG
+#          convertTerm     OMIM.convertTerm over OMIM style titles, with
+#                          the OMIM.translation and OMIM.special files
+#          emapsExpansion  emapload.createFiles on an EMAPA style OBO
+#                          file (the EMAPA/EMAPS term and DAG files)
+#          termComparison  TermLoad.processRecordChanges of every term
+#                          against the rows of an earlier load, with the
+#                          local database (see localdb/db.py)
+#
+#      The load scripts run when they are imported, so the functions
+#      timed are compiled from their source, with the globals the
+#      scripts would set up.  The emapload queries for existing EMAPA
+#      IDs and GXD annotations are answered with no rows.  A case whose
+#      modules are not installed is reported as skipped.
+#
+#  Usage:
+#
+#      benchSuite.py [-t <terms>] [-d <depth>] [-f <fan-out>]
+#                    [-s <synonyms>] [-o <obsolete ratio>]
+#                    [-a <alt_id density>] [-x <xref density>]
+#                    [-r <repeats>] [-c <case>[,<case>...]]
+#                    [-j <results file>] [-b <baseline file>]
+#                    [-B <baseline file>] [-T <tolerance>]
+#
+#      where
+#          -t, -d, -f, -s, -o, -a and -x give the shape of the ontology
+#             (see synthOntology.py; default 20000 terms)
+#
+#          -r is the number of timed runs of each case; the fastest is
+#             reported (default 3)
+#
+#          -c runs only the named cases
+#
+#          -j writes the results to a file instead of stdout
+#
+#          -b compares the results to a baseline file
+#
+#          -B saves the results as a baseline file
+#
+#          -T is the fraction a case's throughput may drop (or its peak
+#             memory grow) from the baseline before it is reported as a
+#             regression (default 0.10)
+#
+#  Outputs:
+#
+#      - JSON results: the shape of the ontology and, for each case, the
+#        items processed, the seconds taken, the items per second and
+#        the peak memory allocated (in bytes); with -b, the ratio of
+#        each case to the baseline
+#      - a summary line per case, written to stderr
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  A case failed, or a case regressed from the baseline
+#
+###########################################################################
+
+import sys
+import os
+import io
+import re
+import gc
+import ast
+import json
+import time
+import string
+import getopt
+import platform
+import shutil
+import subprocess
+import tempfile
+import tracemalloc
+
+# adjust the path so that it will find the vocload modules one directory up
+VOCLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(VOCLOAD_DIR)
+
+import synthOntology
+
+USAGE = 'Usage:  %s [-t <terms>] [-d <depth>] [-f <fan-out>] [-s <synonyms>] [-o <obsolete ratio>] [-a <alt_id density>] [-x <xref density>] [-r <repeats>] [-c <case>[,<case>...]] [-j <results file>] [-b <baseline file>] [-B <baseline file>] [-T <tolerance>]' % sys.argv[0]
+
+# version of the results format
+RESULTS_VERSION = 1
+
+# the vocabulary the synthetic ontology is parsed as (the default policy)
+VOCAB_NAME = 'Synthetic Ontology'
+
+class BenchmarkError(Exception):
+    """
+    For all benchmark exceptions
+    """
+
+# Purpose: Compile functions and classes of a load script, which cannot
+#          be imported because it runs when it is imported.
+# Returns: Nothing
+# Assumes: namespace has the globals the definitions refer to when they
+#          are compiled (e.g. base classes)
+# Effects: Adds the definitions to namespace
+# Throws: BenchmarkError if a definition is not in the script
+#
+def scriptFunctions (fileName, names, namespace):
+    fileName = os.path.join(VOCLOAD_DIR, fileName)
+    fp = open(fileName, 'r')
+    tree = ast.parse(fp.read(), fileName)
+    fp.close()
+
+    nodes = [n for n in tree.body
+        if isinstance(n, (ast.FunctionDef, ast.ClassDef)) and n.name in names]
+
+    missing = set(names) - set([n.name for n in nodes])
+    if missing:
+        raise BenchmarkError('%s has no %s' % (fileName, ', '.join(sorted(missing))))
+
+    exec(compile(ast.Module(body = nodes, type_ignores = []), fileName, 'exec'),
+        namespace)
+
+
+# Purpose: Set environment variables.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Sets os.environ
+# Throws: Nothing
+#
+def setEnv (settings):
+    for (name, value) in list(settings.items()):
+        os.environ[name] = str(value)
+
+
+# CLASS: RowCounter
+# IS: A bulk writer that only counts its rows.
+# HAS: The number of rows written
+# DOES: Counts rows.
+#
+class RowCounter:
+
+    def __init__ (self):
+        self.rows = 0
+
+    def write (self, *values):
+        self.rows = self.rows + 1
+
+
+# CLASS: EmptyDB
+# IS: A database with no rows, for the emapload queries.
+# HAS: Nothing
+# DOES: Answers every query with no rows.
+#
+class EmptyDB:
+
+    def sql (self, cmd, parser = 'auto', **kwargs):
+        return []
+
+#
+# the cases: each is given the synthetic terms, the input files and a
+# work directory, and returns (unit, run), where run() does one timed run
+# and returns the number of units processed
+#
+
+# Purpose: OBOParser.Parser
+#
+def benchOBOParser (terms, files, workDir):
+    import OBOParser
+
+    def run ():
+        fp = open(files['obo'], 'r', encoding = 'utf-8')
+        count = 0
+        for term in OBOParser.Parser(fp, None):
+            count = count + 1
+        fp.close()
+        return count
+
+    return 'terms', run
+
+
+# Purpose: loadOBO.parseOBOFile
+#
+def benchParseOBOFile (terms, files, workDir):
+    import Log
+    import OBOParser
+    import OBOCache
+    import VocabPolicy
+    import inputFile
+
+    namespace = { 'os' : os, 'sys' : sys, 're' : re,
+        'OBOParser' : OBOParser, 'OBOCache' : OBOCache,
+        'VocabPolicy' : VocabPolicy, 'inputFile' : inputFile,
+        'TERM_ABBR' : '' }
+    scriptFunctions('loadOBO.py', ['exit', 'openFiles', 'closeFiles',
+        'addTermRecord', 'parseOBOFile'], namespace)
+
+    # what loadOBO.initialize() reads from the rcd file and the database
+    ns = terms[0]['namespace']
+    namespace['log'] = Log.Log(filename = os.path.join(workDir, 'parseOBOFile.log'), toStderr = 0)
+    namespace['config'] = { ns : { 'NAME' : ns, 'NAME_SPACE' : ns,
+        'LOAD_FILE' : os.path.join(workDir, 'dag.txt') } }
+    namespace['validNamespace'] = [ns]
+    namespace['validRelationshipType'] = { 'isa' : 'is-a',
+        'partof' : 'part-of', 'regulates' : 'regulates' }
+    namespace['validSynonymType'] = ['exact', 'broad', 'narrow', 'related']
+
+    setEnv({ 'OBO_FILE' : files['obo'],
+        'VALIDATION_LOG_FILE' : os.path.join(workDir, 'validation.txt'),
+        'TERM_FILE' : os.path.join(workDir, 'Termfile'),
+        'OBO_FILE_VERSION' : '1.2', 'DAG_ROOT_ID' : '',
+        'OBO_WRITE_TERM_FILE' : 0, 'OBO_PARSE_WORKERS' : 1,
+        'OBO_CACHE_SIZE' : 0 })
+
+    def run ():
+        if namespace['parseOBOFile']() != 0:
+            raise BenchmarkError('parseOBOFile failed')
+        return len(namespace['termRecords'])
+
+    return 'terms', run
+
+
+# Purpose: loadTopSort.sortNode
+#
+def benchSortNode (terms, files, workDir):
+    import DAG
+
+    namespace = {}
+    scriptFunctions('loadTopSort.py', ['Node', 'sortNode'], namespace)
+    Node = namespace['Node']
+
+    dag = DAG.DAG()
+    nodes = {}
+    for i in range(len(terms)):
+        t = terms[i]
+        if not t['obsolete']:
+            nodes[t['id']] = Node(i + 1, i + 1, t['name'])
+            dag.addNode(nodes[t['id']])
+
+    for t in terms:
+        for (parentID, relationship) in t['parents']:
+            dag.addEdge(nodes[parentID], nodes[t['id']])
+
+    namespace['dag'] = dag
+    root = nodes[terms[0]['id']]
+
+    def run ():
+        namespace['visitedNodes'] = {}
+        namespace['sequenceNum'] = 0
+        namespace['sortWriter'] = RowCounter()
+        namespace['sortNode'](root)
+        return namespace['sortWriter'].rows
+
+    return 'nodes', run
+
+
+# Purpose: OMIM.convertTerm
+#
+def benchConvertTerm (terms, files, workDir):
+    namespace = { 'string' : string, 'TERMTYPE' : 'T',
+        'mimTermToMGI' : {}, 'mimWordToMGI' : {},
+        'transTermFileName' : os.path.join(VOCLOAD_DIR, 'OMIM.translation'),
+        'transWordFileName' : os.path.join(VOCLOAD_DIR, 'OMIM.special') }
+    scriptFunctions('OMIM.py', ['cacheTranslations', 'convertTerm'], namespace)
+    namespace['cacheTranslations']()
+
+    convertTerm = namespace['convertTerm']
+    titles = synthOntology.omimTitles(terms)
+
+    def run ():
+        for (mim, title) in titles:
+            convertTerm(mim, title)
+        return len(titles)
+
+    return 'terms', run
+
+
+# Purpose: emapload.createFiles (the EMAPS expansion)
+#
+def benchEmapsExpansion (terms, files, workDir):
+    import Ontology
+
+    namespace = { 'os' : os, 'sys' : sys, 'Ontology' : Ontology,
+        'db' : EmptyDB(), 'TAB' : '\t', 'CRT' : '\n',
+        'STATUS' : 'current', 'OBSTATUS' : 'obsolete', 'SYNTYPE' : 'EXACT',
+        'TSSTART' : synthOntology.TS_START, 'TSEND' : synthOntology.TS_END,
+        'oboFile' : files['emapa'], 'debug' : 0 }
+    scriptFunctions(os.path.join('emap', 'emapload.py'),
+        ['EmapTerm', 'termCleanup', 'createFiles'], namespace)
+
+    def run ():
+        namespace['errorCount'] = 0
+        namespace['missingNameIdList'] = []
+        namespace['fpEmapaTerm'] = io.StringIO()
+        namespace['fpEmapaDag'] = io.StringIO()
+        namespace['fpEmapsTerm'] = io.StringIO()
+        namespace['fpEmapsDagDict'] = {}
+        for ts in range(synthOntology.TS_START, synthOntology.TS_END + 1):
+            namespace['fpEmapsDagDict'][ts] = io.StringIO()
+
+        namespace['createFiles']()
+        return namespace['fpEmapsTerm'].getvalue().count('\n')
+
+    return 'EMAPS terms', run
+
+
+# Purpose: TermLoad.processRecordChanges (the incremental comparison)
+#
+def benchTermComparison (terms, files, workDir):
+    import Log
+    import loadTerms
+    import keyAllocator
+    import stagingTables
+    import termIndex
+
+    setEnv({ 'MGITYPE' : 13, 'VOCAB_COMMENT_KEY' : 1000 })
+
+    records = synthOntology.termRecords(terms)
+    rows = synthOntology.databaseRows(terms)
+    log = Log.Log(filename = os.path.join(workDir, 'termComparison.log'), toStderr = 0)
+
+    load = loadTerms.TermLoad.__new__(loadTerms.TermLoad)
+    load.log = log
+    load.useSynonymType = 1
+    load.bulkWriting = 0
+    load.mgitype_key = 13
+    load.refs_key = 1
+    load.keyAllocator = keyAllocator.KeyAllocator(log)
+
+    def run ():
+        index = termIndex.buildIndex(*rows)
+        load.staged = stagingTables.StagingTables(loadTerms.STAGING_TABLES, log)
+        load.annotationDiscrepancies = []
+        for i in range(len(records)):
+            load.processRecordChanges(records[i], [index[i + 1]], i + 1)
+        return len(records)
+
+    return 'terms', run
+
+
+# the cases, in the order they are run
+CASES = [
+    ('OBOParser', benchOBOParser),
+    ('parseOBOFile', benchParseOBOFile),
+    ('sortNode', benchSortNode),
+    ('convertTerm', benchConvertTerm),
+    ('emapsExpansion', benchEmapsExpansion),
+    ('termComparison', benchTermComparison),
+    ]
+
+# Purpose: Create the local database the termComparison case uses, and
+#          put the local db module ahead of any other.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Creates the database in workDir; sets LOCAL_DB_FILE
+# Throws: BenchmarkError if the database cannot be created
+#
+def setupLocalDB (workDir):
+    localDir = os.path.join(VOCLOAD_DIR, 'localdb')
+    dbFile = os.path.join(workDir, 'localdb.sqlite')
+    setEnv({ 'LOCAL_DB_FILE' : dbFile, 'VOCAB_NAME' : VOCAB_NAME })
+
+    status = subprocess.call([sys.executable,
+        os.path.join(localDir, 'createLocalDB.py'), '-f', dbFile],
+        stdout = subprocess.DEVNULL)
+    if status != 0:
+        raise BenchmarkError('cannot create the local database')
+
+    sys.path.insert(0, localDir)
+
+
+# Purpose: Time a case.
+# Returns: Dictionary of results: 'unit', 'items', 'seconds' (fastest
+#          run), 'throughput' (items/second) and 'peakMemory' (bytes
+#          allocated during a run); 'skipped' if a module is missing, or
+#          'error'
+# Assumes: Nothing
+# Effects: Runs the case repeats + 1 times (the last to trace memory)
+# Throws: Nothing
+#
+def runCase (case, terms, files, workDir, repeats):
+    try:
+        unit, run = case(terms, files, workDir)
+    except ImportError as e:
+        return { 'skipped' : str(e) }
+    except Exception as e:
+        return { 'error' : '%s: %s' % (e.__class__.__name__, e) }
+
+    try:
+        times = []
+        for i in range(repeats):
+            gc.collect()
+            start = time.perf_counter()
+            items = run()
+            times.append(time.perf_counter() - start)
+
+        gc.collect()
+        tracemalloc.start()
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    except Exception as e:
+        tracemalloc.stop()
+        return { 'error' : '%s: %s' % (e.__class__.__name__, e) }
+
+    seconds = min(times)
+    return { 'unit' : unit, 'items' : items, 'seconds' : round(seconds, 6),
+        'throughput' : round(items / seconds, 1), 'peakMemory' : peak }
+
+
+# Purpose: Compare results to a baseline.
+# Returns: Dictionary of case -> {'throughputRatio', 'memoryRatio',
+#          'regression'}, for the cases timed in both
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def compareToBaseline (results, baseline, tolerance):
+    comparison = {}
+    for (name, result) in list(results['cases'].items()):
+        base = baseline.get('cases', {}).get(name)
+        if 'throughput' not in result or not base or 'throughput' not in base:
+            continue
+
+        throughputRatio = result['throughput'] / base['throughput']
+        memoryRatio = result['peakMemory'] / max(base['peakMemory'], 1)
+        comparison[name] = { 'throughputRatio' : round(throughputRatio, 3),
+            'memoryRatio' : round(memoryRatio, 3),
+            'regression' : throughputRatio < 1 - tolerance or \
+                memoryRatio > 1 + tolerance }
+
+    if baseline.get('shape') != results['shape']:
+        sys.stderr.write('warning: the baseline is for a different ontology shape\n')
+
+    return comparison
+
+
+# Purpose: Write results as JSON.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes the file (stdout if fileName is None)
+# Throws: propagates exceptions writing the file
+#
+def writeResults (results, fileName):
+    if fileName is None:
+        json.dump(results, sys.stdout, indent = 2, sort_keys = True)
+        sys.stdout.write('\n')
+        return
+
+    fp = open(fileName, 'w')
+    json.dump(results, fp, indent = 2, sort_keys = True)
+    fp.write('\n')
+    fp.close()
+
+
+#
+#  MAIN
+#
+
+try:
+    options, args = getopt.getopt(sys.argv[1:], 't:d:f:s:o:a:x:r:c:j:b:B:T:')
+except:
+    print(USAGE)
+    sys.exit(1)
+
+shape = synthOntology.Shape(terms = 20000)
+repeats = 3
+caseNames = [name for (name, case) in CASES]
+resultsFile = None
+baselineFile = None
+saveBaselineFile = None
+tolerance = 0.10
+
+for (option, value) in options:
+    if option == '-t':
+        shape.terms = int(value)
+    elif option == '-d':
+        shape.depth = int(value)
+    elif option == '-f':
+        shape.fanout = int(value)
+    elif option == '-s':
+        shape.synonyms = int(value)
+    elif option == '-o':
+        shape.obsoleteRatio = float(value)
+    elif option == '-a':
+        shape.altIDDensity = float(value)
+    elif option == '-x':
+        shape.xrefDensity = float(value)
+    elif option == '-r':
+        repeats = int(value)
+    elif option == '-c':
+        caseNames = str.split(value, ',')
+    elif option == '-j':
+        resultsFile = value
+    elif option == '-b':
+        baselineFile = value
+    elif option == '-B':
+        saveBaselineFile = value
+    elif option == '-T':
+        tolerance = float(value)
+
+for name in caseNames:
+    if name not in [n for (n, case) in CASES]:
+        print('unknown case: %s' % name)
+        print(USAGE)
+        sys.exit(1)
+
+# the parser modules read the vocabulary name when they are imported
+os.environ['VOCAB_NAME'] = VOCAB_NAME
+
+workDir = tempfile.mkdtemp(prefix = 'vocloadBench')
+
+terms = synthOntology.generate(shape)
+files = { 'obo' : os.path.join(workDir, 'ontology.obo'),
+          'emapa' : os.path.join(workDir, 'emapa.obo') }
+
+fp = open(files['obo'], 'w')
+synthOntology.writeOBO(fp, terms)
+fp.close()
+
+emapaShape = synthOntology.Shape(**shape.asDict())
+emapaShape.prefix = 'EMAPA'
+emapaShape.namespace = 'anatomical_structure'
+fp = open(files['emapa'], 'w')
+synthOntology.writeOBO(fp, synthOntology.generate(emapaShape), 1)
+fp.close()
+
+if 'termComparison' in caseNames:
+    setupLocalDB(workDir)
+
+results = { 'version' : RESULTS_VERSION, 'shape' : shape.asDict(),
+    'repeats' : repeats, 'python' : platform.python_version(),
+    'cases' : {} }
+
+failed = 0
+for (name, case) in CASES:
+    if name not in caseNames:
+        continue
+
+    result = runCase(case, terms, files, workDir, repeats)
+    results['cases'][name] = result
+
+    if 'skipped' in result:
+        sys.stderr.write('%-16s skipped (%s)\n' % (name, result['skipped']))
+    elif 'error' in result:
+        sys.stderr.write('%-16s FAILED (%s)\n' % (name, result['error']))
+        failed = 1
+    else:
+        sys.stderr.write('%-16s %10d %s in %8.3f sec = %12.0f/sec, peak %8.1f MB\n' % \
+            (name, result['items'], result['unit'], result['seconds'],
+            result['throughput'], result['peakMemory'] / 1048576.0))
+
+shutil.rmtree(workDir)
+
+if baselineFile:
+    fp = open(baselineFile, 'r')
+    baseline = json.load(fp)
+    fp.close()
+
+    results['baseline'] = baselineFile
+    results['comparison'] = compareToBaseline(results, baseline, tolerance)
+    for (name, comparison) in sorted(results['comparison'].items()):
+        if comparison['regression']:
+            sys.stderr.write('%-16s REGRESSION: throughput x%.3f, peak memory x%.3f\n' % \
+                (name, comparison['throughputRatio'], comparison['memoryRatio']))
+            failed = 1
+
+writeResults(results, resultsFile)
+
+if saveBaselineFile:
+    writeResults(results, saveBaselineFile)
+
+sys.exit(failed)
@@ -0,0 +1,151 @@
+#
+#  benchTermIndex.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Benchmark the lookup of existing terms in the incremental term load
+#      on a large synthetic vocabulary: a scan of all the terms for each
+#      input record (as RecordSet.find() did) against termIndex.buildIndex
+#      and a dictionary lookup.
+#
+#  Usage:
+#
+#      benchTermIndex.py [-t <terms>] [-s <sample>]
+#
+#      where
+#          -t is the number of terms in the vocabulary (default 100000)
+#
+#          -s is the number of scans timed; the time for all the terms
+#             is extrapolated from it (default 200)
+#
+#  Outputs:
+#
+#      - lookups/sec for each method, written to stdout
+#
+#  Exit Codes:
+#
+#      0:  Successful completion, both methods find the same terms
+#      1:  The methods found different terms
+#
+###########################################################################
+
+import sys
+import os
+import getopt
+import random
+import time
+
+# adjust the path so that it will find the vocload modules one directory up
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import termIndex
+
+USAGE = 'Usage:  %s [-t <terms>] [-s <sample>]' % sys.argv[0]
+
+SYNONYM_TYPES = ['exact', 'broad', 'narrow', 'related']
+
+# Purpose: Create the rows of the term, comment and synonym queries for a
+#          synthetic vocabulary.
+# Returns: Tuple of (terms, comments, synonyms) lists of rows
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def makeRows (numTerms):
+    rand = random.Random(numTerms)
+    terms = []
+    comments = []
+    synonyms = []
+    synonymKey = 0
+
+    for termKey in range(1, numTerms + 1):
+        terms.append({'_Term_key' : termKey,
+                      'term' : 'synthetic term %d' % termKey,
+                      'note' : 'Definition of term %d.' % termKey,
+                      'isObsolete' : int(termKey % 11 == 0)})
+        if termKey % 5 == 0:
+            comments.append({'_Object_key' : termKey,
+                             'note' : 'Comment for term %d.' % termKey})
+        for j in range(rand.randint(0, 4)):
+            synonymKey = synonymKey + 1
+            synonyms.append({'_Object_key' : termKey,
+                             '_Synonym_key' : synonymKey,
+                             'synonym' : 'synonym %d of term %d' % (j, termKey),
+                             'synonymType' : SYNONYM_TYPES[j]})
+
+    return terms, comments, synonyms
+
+
+# Purpose: Find the records with a field value by scanning all of them.
+# Returns: List of matching records
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def scanFind (records, fieldname, value):
+    found = []
+    for r in records:
+        if r[fieldname] == value:
+            found.append(r)
+    return found
+
+
+#
+#  MAIN
+#
+
+try:
+    options, args = getopt.getopt(sys.argv[1:], 't:s:')
+except:
+    print(USAGE)
+    sys.exit(1)
+
+numTerms = 100000
+sample = 200
+for (option, value) in options:
+    if option == '-t':
+        numTerms = int(value)
+    elif option == '-s':
+        sample = int(value)
+
+terms, comments, synonyms = makeRows(numTerms)
+keys = list(range(1, numTerms + 1))
+random.Random(0).shuffle(keys)
+
+print('%d terms, %d comments, %d synonyms' % (len(terms), len(comments), len(synonyms)))
+
+start = time.perf_counter()
+index = termIndex.buildIndex(terms, comments, synonyms)
+buildTime = time.perf_counter() - start
+print('build index : %7.3f sec' % buildTime)
+
+# the records the scan searches are the index entries themselves, so the
+# only difference timed is how a record is found
+records = list(index.values())
+
+start = time.perf_counter()
+for termKey in keys:
+    dbRecord = index.get(termKey)
+indexTime = time.perf_counter() - start
+print('index       : %8d lookups in %7.3f sec = %12.0f lookups/sec' % \
+    (len(keys), indexTime, len(keys) / indexTime))
+
+start = time.perf_counter()
+agree = 1
+for termKey in keys[:sample]:
+    if scanFind(records, '_Term_key', termKey) != [index.get(termKey)]:
+        agree = 0
+scanTime = time.perf_counter() - start
+print('scan        : %8d lookups in %7.3f sec = %12.0f lookups/sec' % \
+    (sample, scanTime, sample / scanTime))
+
+print('all %d terms: scan %.1f sec (extrapolated), index %.3f sec (with build)' % \
+    (numTerms, scanTime * numTerms / sample, indexTime + buildTime))
+
+if not agree:
+    print('FAILED: scan and index disagree')
+    sys.exit(1)
+
+print('scan and index agree')
+sys.exit(0)
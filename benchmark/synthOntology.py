@@ -0,0 +1,453 @@
+#
+#  synthOntology.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Generate a synthetic ontology of a given shape (number of terms,
+#      depth, fan-out, synonyms per term, obsolete ratio, alt_id and xref
+#      density) and write it in the formats the vocabulary loads read:
+#      an OBO file, a Termfile and a DAG file.  The same shape and seed
+#      always give the same ontology, so benchmark runs are comparable.
+#
+#  Usage:
+#
+#      synthOntology.py [-t <terms>] [-d <depth>] [-f <fan-out>]
+#                       [-s <synonyms>] [-o <obsolete ratio>]
+#                       [-a <alt_id density>] [-x <xref density>]
+#                       [-p <ID prefix>] [-e] <output directory>
+#
+#      where
+#          -t is the number of terms, including the root (default 10000)
+#
+#          -d is the number of levels below the root (default 12)
+#
+#          -f is the number of children per term before a level is full
+#             (default 4)
+#
+#          -s is the most synonyms a term has (default 4)
+#
+#          -o is the fraction of terms that are obsolete (default 0.05)
+#
+#          -a and -x are the alt_ids and xrefs per term (default 0.2, 0.5)
+#
+#          -p is the ID prefix (default SYN)
+#
+#          -e writes EMAPA style stanzas (the anatomical_structure
+#             namespace, starts_at/ends_at stages and an EMAPA:0 root)
+#
+#  Outputs:
+#
+#      - ontology.obo, Termfile and dag.txt in the output directory
+#
+###########################################################################
+
+import sys
+import os
+import getopt
+import random
+
+USAGE = 'Usage:  %s [-t <terms>] [-d <depth>] [-f <fan-out>] [-s <synonyms>] [-o <obsolete ratio>] [-a <alt_id density>] [-x <xref density>] [-p <ID prefix>] [-e] <output directory>' % sys.argv[0]
+
+SYNONYM_TYPES = ['EXACT', 'BROAD', 'NARROW', 'RELATED']
+RELATIONSHIPS = ['part_of', 'regulates']
+XREF_PREFIXES = ['MESH', 'NCI', 'UMLS_CUI', 'OMIM']
+
+# Theiler stages of EMAPA style terms
+TS_START = 1
+TS_END = 28
+
+# CLASS: Shape
+# IS: The shape of a synthetic ontology.
+# HAS: The number of terms, depth, fan-out, synonyms per term, obsolete
+#      ratio, alt_id and xref density, ID prefix, namespace and seed.
+# DOES: Nothing
+#
+class Shape:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self,
+        terms = 10000,          # number of terms, including the root
+        depth = 12,             # number of levels below the root
+        fanout = 4,             # children per term before a level is full
+        synonyms = 4,           # most synonyms a term has
+        obsoleteRatio = 0.05,   # fraction of obsolete terms
+        altIDDensity = 0.2,     # alt_ids per term
+        xrefDensity = 0.5,      # xrefs per term
+        prefix = 'SYN',         # ID prefix
+        namespace = 'synthetic_ontology',
+        seed = 0
+        ):
+        self.terms = terms
+        self.depth = depth
+        self.fanout = fanout
+        self.synonyms = synonyms
+        self.obsoleteRatio = obsoleteRatio
+        self.altIDDensity = altIDDensity
+        self.xrefDensity = xrefDensity
+        self.prefix = prefix
+        self.namespace = namespace
+        self.seed = seed
+
+
+    # Purpose: Get the shape as a dictionary (e.g. for a JSON report).
+    # Returns: Dictionary
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def asDict (self):
+        return dict(self.__dict__)
+
+
+# Purpose: Get the number of occurrences of something with a given
+#          average density (e.g. 0.2 alt_ids per term).
+# Returns: Integer
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def occurrences (rand, density):
+    count = int(density)
+    if rand.random() < density - count:
+        count = count + 1
+    return count
+
+
+# Purpose: Generate the terms of an ontology.
+# Returns: List of term dictionaries, parents before their children, with
+#          'id', 'name', 'namespace', 'definition', 'comment', 'obsolete',
+#          'parents' (list of (parent ID, relationship)), 'synonyms' (list
+#          of (synonym, type)), 'altIDs', 'xrefs' and 'stages' ((start,
+#          end) Theiler stages, within the stages of the first parent)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def generate (shape):
+    rand = random.Random(shape.seed)
+    terms = []
+    level = []
+
+    # terms that may have children: not obsolete, above the lowest level
+    inner = []
+
+    altIDNumber = shape.terms
+
+    for i in range(shape.terms):
+        termID = '%s:%07d' % (shape.prefix, i + 1)
+        name = 'synthetic term %d' % (i + 1)
+        parents = []
+        stages = (TS_START, TS_END)
+        obsolete = i > 0 and rand.random() < shape.obsoleteRatio
+
+        if i == 0:
+            level.append(0)
+        elif obsolete:
+            level.append(0)
+        else:
+            # fill the levels breadth first, fanout children at a time;
+            # below the lowest level, hang terms off any inner term
+            parent = (i - 1) // shape.fanout
+            if terms[parent]['obsolete'] or level[parent] >= shape.depth - 1:
+                parent = inner[rand.randrange(len(inner))]
+
+            parents.append((terms[parent]['id'], 'is_a'))
+            level.append(level[parent] + 1)
+
+            start, end = terms[parent]['stages']
+            start = min(start + rand.randint(0, 2), end)
+            end = max(end - rand.randint(0, 2), start)
+            stages = (start, end)
+
+            # a second parent makes it a DAG rather than a tree
+            if rand.random() < 0.2:
+                other = inner[rand.randrange(len(inner))]
+                if other != parent:
+                    parents.append((terms[other]['id'],
+                        RELATIONSHIPS[other % len(RELATIONSHIPS)]))
+
+        if not obsolete and level[i] < shape.depth:
+            inner.append(i)
+
+        synonyms = []
+        for j in range(rand.randint(0, shape.synonyms)):
+            synonyms.append(('synonym %d of term %d' % (j, i + 1),
+                SYNONYM_TYPES[(i + j) % len(SYNONYM_TYPES)]))
+
+        altIDs = []
+        for j in range(occurrences(rand, shape.altIDDensity)):
+            altIDNumber = altIDNumber + 1
+            altIDs.append('%s:%07d' % (shape.prefix, altIDNumber))
+
+        xrefs = []
+        for j in range(occurrences(rand, shape.xrefDensity)):
+            xrefs.append('%s:%06d' % (XREF_PREFIXES[j % len(XREF_PREFIXES)],
+                rand.randint(1, 999999)))
+
+        comment = ''
+        if i % 5 == 0:
+            comment = 'Comment for term %d.' % (i + 1)
+
+        terms.append({
+            'id' : termID,
+            'name' : name,
+            'namespace' : shape.namespace,
+            'definition' : 'Definition of term %d.' % (i + 1),
+            'comment' : comment,
+            'obsolete' : obsolete,
+            'parents' : parents,
+            'synonyms' : synonyms,
+            'altIDs' : altIDs,
+            'xrefs' : xrefs,
+            'stages' : stages,
+            })
+
+    return terms
+
+
+# Purpose: Get the term records of the terms, as loadOBO hands them to the
+#          term load (the columns of the Termfile).
+# Returns: List of dictionaries
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def termRecords (terms):
+    records = []
+    for t in terms:
+        if t['obsolete']:
+            status = 'obsolete'
+            synonyms = synonymTypes = ''
+        else:
+            status = 'current'
+            synonyms = '|'.join([s[0] for s in t['synonyms']])
+            synonymTypes = '|'.join([s[1] for s in t['synonyms']])
+
+        records.append({
+            'term' : t['name'],
+            'accID' : t['id'],
+            'status' : status,
+            'abbreviation' : '',
+            'note' : t['definition'],
+            'comment' : t['comment'],
+            'synonyms' : synonyms,
+            'synonymTypes' : synonymTypes,
+            'otherIDs' : '|'.join(t['altIDs']),
+            })
+    return records
+
+
+# Purpose: Get the rows the term queries of an incremental load (see
+#          loadTerms.getExistingTerms) would return after an earlier load
+#          of the terms, with some of the terms changed since.
+# Returns: Tuple of (terms, comments, synonyms) lists of rows, keyed by
+#          _Term_key = position of the term + 1
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def databaseRows (terms,
+    changeEvery = 10    # every changeEvery'th term has a changed
+                        # definition, synonym, name or status
+    ):
+    termRows = []
+    commentRows = []
+    synonymRows = []
+    synonymKey = 0
+
+    for i in range(len(terms)):
+        t = terms[i]
+        termKey = i + 1
+        changed = i % changeEvery == 0
+        change = (i // changeEvery) % 4
+
+        name = t['name']
+        definition = t['definition']
+        isObsolete = int(t['obsolete'])
+        synonyms = t['synonyms']
+        if t['obsolete']:
+            synonyms = []
+
+        if changed and change == 0:
+            definition = 'Old definition of term %d.' % termKey
+        elif changed and change == 1:
+            synonyms = synonyms[1:] + [('old synonym of term %d' % termKey, 'EXACT')]
+        elif changed and change == 2:
+            name = 'old name of term %d' % termKey
+        elif changed and change == 3:
+            isObsolete = 1 - isObsolete
+
+        termRows.append({'_Term_key' : termKey, 'term' : name,
+            'note' : definition, 'isObsolete' : isObsolete})
+
+        if t['comment']:
+            commentRows.append({'_Object_key' : termKey,
+                'note' : t['comment']})
+
+        for (synonym, synonymType) in synonyms:
+            synonymKey = synonymKey + 1
+            synonymRows.append({'_Object_key' : termKey,
+                '_Synonym_key' : synonymKey, 'synonym' : synonym,
+                'synonymType' : synonymType})
+
+    return termRows, commentRows, synonymRows
+
+
+# Purpose: Get OMIM style titles for the terms (upper case, with the
+#          punctuation and gene symbols OMIM.convertTerm handles).
+# Returns: List of (MIM ID, title) tuples
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def omimTitles (terms):
+    titles = []
+    for i in range(len(terms)):
+        title = terms[i]['name'].upper()
+        if i % 3 == 0:
+            title = title + ', TYPE %d-LIKE' % (i % 9)
+        if i % 4 == 0:
+            title = title + ' AND X-LINKED/AUTOSOMAL'
+        if i % 5 == 0:
+            title = title + '; SYN%d' % i
+        if i % 7 == 0:
+            title = title + ' WITH @MUTATION--SEVERE'
+        titles.append(('OMIM:%06d' % (100000 + i), title))
+    return titles
+
+
+# Purpose: Write the terms in OBO format.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to fp
+# Throws: Nothing
+#
+def writeOBO (fp, terms, emapa = 0):
+    fp.write('format-version: 1.2\n')
+    fp.write('default-namespace: %s\n' % terms[0]['namespace'])
+    fp.write('ontology: synthetic\n\n')
+
+    if emapa:
+        fp.write('[Term]\nid: EMAPA:0\nname: EMAPA root\n\n')
+
+    for t in terms:
+        fp.write('[Term]\n')
+        fp.write('id: %s\n' % t['id'])
+        fp.write('name: %s\n' % t['name'])
+        fp.write('namespace: %s\n' % t['namespace'])
+        for altID in t['altIDs']:
+            fp.write('alt_id: %s\n' % altID)
+        fp.write('def: "%s" [SYN:%s]\n' % (t['definition'], t['id']))
+        if t['comment']:
+            fp.write('comment: %s\n' % t['comment'])
+        for (synonym, synonymType) in t['synonyms']:
+            fp.write('synonym: "%s" %s []\n' % (synonym, synonymType))
+        for xref in t['xrefs']:
+            fp.write('xref: %s\n' % xref)
+        if t['obsolete']:
+            fp.write('is_obsolete: true\n')
+        for (parentID, relationship) in t['parents']:
+            if relationship == 'is_a':
+                fp.write('is_a: %s ! parent\n' % parentID)
+            else:
+                fp.write('relationship: %s %s ! parent\n' % (relationship, parentID))
+        if emapa and not t['obsolete']:
+            fp.write('relationship: starts_at TS%02d\n' % t['stages'][0])
+            fp.write('relationship: ends_at TS%02d\n' % t['stages'][1])
+        fp.write('\n')
+
+    fp.write('[Typedef]\nid: part_of\nname: part of\n')
+
+
+# Purpose: Write the term records as a Termfile.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to fp
+# Throws: Nothing
+#
+def writeTermfile (fp, terms):
+    columns = ['term', 'accID', 'status', 'abbreviation', 'note', 'comment',
+        'synonyms', 'synonymTypes', 'otherIDs']
+    for r in termRecords(terms):
+        fp.write('\t'.join([r[c] for c in columns]) + '\n')
+
+
+# Purpose: Write the edges of the terms as a DAG file (child, label,
+#          relationship, parent), as loadOBO does.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to fp
+# Throws: Nothing
+#
+def writeDAGFile (fp, terms):
+    fp.write('%s\t\t\t\n' % terms[0]['id'])
+    for t in terms:
+        for (parentID, relationship) in t['parents']:
+            fp.write('%s\t\t%s\t%s\n' % (t['id'],
+                relationship.replace('_', '-'), parentID))
+
+
+#
+#  MAIN
+#
+
+if __name__ == '__main__':
+
+    try:
+        options, args = getopt.getopt(sys.argv[1:], 't:d:f:s:o:a:x:p:e')
+    except:
+        print(USAGE)
+        sys.exit(1)
+
+    if len(args) != 1:
+        print(USAGE)
+        sys.exit(1)
+
+    shape = Shape()
+    emapa = 0
+    for (option, value) in options:
+        if option == '-t':
+            shape.terms = int(value)
+        elif option == '-d':
+            shape.depth = int(value)
+        elif option == '-f':
+            shape.fanout = int(value)
+        elif option == '-s':
+            shape.synonyms = int(value)
+        elif option == '-o':
+            shape.obsoleteRatio = float(value)
+        elif option == '-a':
+            shape.altIDDensity = float(value)
+        elif option == '-x':
+            shape.xrefDensity = float(value)
+        elif option == '-p':
+            shape.prefix = value
+        elif option == '-e':
+            emapa = 1
+
+    if emapa:
+        shape.prefix = 'EMAPA'
+        shape.namespace = 'anatomical_structure'
+
+    outputDir = args[0]
+    terms = generate(shape)
+
+    fp = open(os.path.join(outputDir, 'ontology.obo'), 'w')
+    writeOBO(fp, terms, emapa)
+    fp.close()
+
+    fp = open(os.path.join(outputDir, 'Termfile'), 'w')
+    writeTermfile(fp, terms)
+    fp.close()
+
+    fp = open(os.path.join(outputDir, 'dag.txt'), 'w')
+    writeDAGFile(fp, terms)
+    fp.close()
+
+    print('%d terms written to %s' % (len(terms), outputDir))
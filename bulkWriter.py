@@ -0,0 +1,212 @@
+#
+#  bulkWriter.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Stream rows into database tables with PostgreSQL "COPY ... FROM
+#      STDIN", in place of writing bcp files and loading them with
+#      db.bcp().
+#
+#      Rows are formatted in the COPY text format (tab delimited, with
+#      backslash escapes and \N for null), so values may contain "|",
+#      tabs or newlines.  As with db.bcp(), empty values are loaded as
+#      null.  Each writer keeps its rows in a memory buffer; when a
+#      buffer is full, the buffers of all the open writers are copied, in
+#      the order the writers were opened, so a table is never copied
+#      ahead of the tables it refers to.
+#
+#      The rows are copied on the shared connection of the db module
+#      (db.useOneConnection(1)), so they are part of the load's
+#      transaction: they are committed by db.commit() and discarded by a
+#      rollback.  Every loader that uses a writer opens the shared
+#      connection after vocloadlib.setupSql().  Nothing is copied in
+#      no-load mode.
+#
+#  Env Vars:
+#
+#      BULK_AUDIT_FILES  if 1, each writer also saves its rows (in the
+#                        COPY text format) to the file it is given
+#
+###########################################################################
+
+import os
+import io
+
+import db
+import vocloadlib
+import loadMetrics
+
+# size of a writer's buffer before the buffers are copied, in characters
+BUFFER_SIZE = 4 * 1024 * 1024
+
+# the open writers, in the order they were opened
+openWriters = []
+
+class BulkWriterError(Exception):
+    """
+    For all BulkWriter exceptions
+    """
+
+no_connection = 'no shared database connection to copy %s rows with ' + \
+    '(the loader must call db.useOneConnection(1) after vocloadlib.setupSql())'
+
+# Purpose: Format a value for the COPY text format.
+# Returns: str (\N for None or the empty string, which db.bcp() loaded
+#          as null)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def escape (value):
+    if value is None or value == '':
+        return '\\N'
+
+    value = str(value)
+    if '\\' in value:
+        value = value.replace('\\', '\\\\')
+    if '\t' in value or '\n' in value or '\r' in value:
+        value = value.replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return value
+
+
+# Purpose: Format a row for the COPY text format.
+# Returns: str (one line, with its newline)
+# Assumes: values are in the column order of the table
+# Effects: Nothing
+# Throws: Nothing
+#
+def formatRow (values):
+    return '\t'.join([escape(v) for v in values]) + '\n'
+
+
+# Purpose: Returns true if writers should save their rows to audit files.
+# Returns: 1 if BULK_AUDIT_FILES is set, 0 if not
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def isAuditOn ():
+    try:
+        return int(os.environ['BULK_AUDIT_FILES'])
+    except:
+        return 0
+
+
+# Purpose: Copy the buffered rows of all the open writers.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Copies rows into the database
+# Throws: propagates exceptions from BulkWriter.flush()
+#
+def flushAll ():
+    for writer in openWriters:
+        writer.flush()
+
+
+# CLASS: BulkWriter
+# IS: A stream of rows into one table.
+# HAS: The table, a buffer of formatted rows, the number of rows written
+#      and an (optional) audit file.
+# DOES: Formats rows and copies them into the table.
+#
+class BulkWriter:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Opens the audit file, if BULK_AUDIT_FILES is set
+    # Throws: BulkWriterError if there is no shared database connection;
+    #         propagates exceptions opening the audit file
+    #
+    def __init__ (self,
+        table,                  # table (or table (columns)) to copy into
+        auditFileName = None    # file to save the rows to, if auditing
+        ):
+        self.table = table
+        self.buffer = io.StringIO()
+        self.rows = 0
+
+        self.connection = None
+        if not vocloadlib.isNoLoad():
+            self.connection = getattr(db, 'sharedDbConnection', None)
+            if self.connection is None:
+                raise BulkWriterError(no_connection % table)
+
+        self.fpAudit = None
+        if auditFileName and isAuditOn():
+            self.fpAudit = open(auditFileName, 'w')
+
+        openWriters.append(self)
+
+
+    # Purpose: Add a row.
+    # Returns: Nothing
+    # Assumes: values are in the column order of the table
+    # Effects: Copies the buffered rows of all the writers if this
+    #          writer's buffer is full
+    # Throws: propagates exceptions from flushAll()
+    #
+    def write (self, *values):
+        self.writeFormatted(formatRow(values), 1)
+
+
+    # Purpose: Add rows that are already formatted (see formatRow).
+    # Returns: Nothing
+    # Assumes: text is a whole number of formatted rows
+    # Effects: Copies the buffered rows of all the writers if this
+    #          writer's buffer is full
+    # Throws: propagates exceptions from flushAll()
+    #
+    def writeFormatted (self,
+        text,   # formatted rows
+        rows    # number of rows in text
+        ):
+        self.buffer.write(text)
+        self.rows = self.rows + rows
+
+        if self.fpAudit:
+            self.fpAudit.write(text)
+
+        if self.buffer.tell() >= BUFFER_SIZE:
+            flushAll()
+
+
+    # Purpose: Copy the buffered rows into the table.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Copies rows into the database (unless in no-load mode)
+    # Throws: propagates database exceptions
+    #
+    def flush (self):
+        if not self.buffer.tell():
+            return
+
+        if self.connection is not None:
+            self.buffer.seek(0)
+            cursor = self.connection.cursor()
+            cursor.copy_expert('copy %s from stdin' % self.table, self.buffer)
+            cursor.close()
+
+        self.buffer = io.StringIO()
+
+
+    # Purpose: Copy the remaining rows and close the writer.
+    # Returns: Number of rows written
+    # Assumes: Nothing
+    # Effects: Copies rows into the database; closes the audit file;
+    #          adds the rows to the load metrics
+    # Throws: propagates exceptions from flushAll()
+    #
+    def close (self):
+        flushAll()
+        openWriters.remove(self)
+
+        if self.fpAudit:
+            self.fpAudit.close()
+            self.fpAudit = None
+
+        if self.connection is not None:
+            loadMetrics.addRowsWritten(self.table, self.rows)
+
+        return self.rows
@@ -0,0 +1,77 @@
+#
+#  dbHooks.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Instrument db.sql() and db.bcp() in one place.  The modules that
+#      watch the SQL of a load (loadMetrics, sqlProfiler) register hooks
+#      here instead of wrapping db.sql() themselves, so each call is
+#      wrapped and timed once, however many of them are on.
+#
+#      db.sql() is replaced when the first sql hook is added, db.bcp()
+#      when the first bcp hook is added.  After each call returns, the
+#      hooks are called in the order they were added:
+#
+#          sql hooks:  hook(cmd, results, seconds)
+#          bcp hooks:  hook(bcpFile, table, seconds)
+#
+#      Calls that raise an exception are not passed to the hooks.
+#
+###########################################################################
+
+import time
+
+import db
+
+# the hooks of db.sql() and db.bcp(), in the order they were added
+sqlHooks = []
+bcpHooks = []
+
+# Purpose: Add a hook for the calls of db.sql().
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Replaces db.sql the first time it is called
+# Throws: Nothing
+#
+def addSqlHook (hook):
+    if not sqlHooks:
+        sql = db.sql
+
+        def hookedSql (cmd, *args, **kwargs):
+            startTime = time.time()
+            results = sql(cmd, *args, **kwargs)
+            seconds = time.time() - startTime
+            for h in sqlHooks:
+                h(cmd, results, seconds)
+            return results
+
+        db.sql = hookedSql
+
+    sqlHooks.append(hook)
+
+# Purpose: Add a hook for the calls of db.bcp().
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Replaces db.bcp the first time it is called; does nothing if
+#          the db module has no bcp()
+# Throws: Nothing
+#
+def addBcpHook (hook):
+    if not hasattr(db, 'bcp'):
+        return
+
+    if not bcpHooks:
+        bcp = db.bcp
+
+        def hookedBcp (bcpFile, table, *args, **kwargs):
+            startTime = time.time()
+            results = bcp(bcpFile, table, *args, **kwargs)
+            seconds = time.time() - startTime
+            for h in bcpHooks:
+                h(bcpFile, table, seconds)
+            return results
+
+        db.bcp = hookedBcp
+
+    bcpHooks.append(hook)
@@ -10,14 +10,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from loadTerms import TermLoad, CREATEDBY_KEY, CDATE
 import db
 import vocloadlib
+import bulkWriter
 
 ###--- Constants ---###
 DELETE_EMAPA = '''delete from VOC_Term_EMAPA'''
 DELETE_EMAPS = '''delete from VOC_Term_EMAPS'''
 
-BCP_INSERT_EMAPA = '''%%s|%%s|%%s|%%s|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-        
 EMAPA_BCP_FILE_NAME = os.environ['TERM_EMAPA_TS_BCP_FILE']
 EMAPS_BCP_FILE_NAME      = os.environ['TERM_EMAPS_TS_BCP_FILE']
 
@@ -51,7 +49,8 @@ class EMAPALoad(TermLoad):
     
     def loadEMAPABCP(self, bcpFileName):
         """
-        Create VOC_Term_EMAPA BCP file and load into database
+        Copy VOC_Term_EMAPA rows into database
+        (and the BCP file, if BULK_AUDIT_FILES is set)
         
         VOC_Term_EMAPA will be a full drop and reload,
             even though VOC_Term is incremental
@@ -75,8 +74,8 @@ class EMAPALoad(TermLoad):
         for r in results:
             emapaTermDict[r['accid']] = r['_Object_key']
         
-        # Write the BCP file
-        emapaBcpFile = open(bcpFileName, 'w')
+        # Copy the rows into the database
+        emapaWriter = bulkWriter.BulkWriter('VOC_Term_EMAPA', bcpFileName)
         
         try:
             for record in self.datafile:
@@ -98,18 +97,16 @@ class EMAPALoad(TermLoad):
                     continue
         
                 # set _defaultparent_key
-                parentKey = ''
+                parentKey = None
                 if defaultParent in emapaTermDict:
                     parentKey = emapaTermDict[defaultParent]
     
-                emapaBcpFile.write(BCP_INSERT_EMAPA % (termKey, parentKey, start, end))
+                emapaWriter.write(termKey, parentKey, start, end,
+                    CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
                 
                 
         finally: 
-            emapaBcpFile.close()
-            
-        # load BCP into database
-        db.bcp(bcpFileName, 'VOC_Term_EMAPA', delimiter='|')
+            emapaWriter.close()
     
     
 class EMAPSLoad(TermLoad):
@@ -117,6 +114,9 @@ class EMAPSLoad(TermLoad):
     EMAPS customization of TermLoad
     Also loads VOC_Term_EMAPS
     """
+
+    # postProcess() reads the new terms from the live tables
+    useShadowTables = 0
     
     def loadDataFile(self, filename):
         """
@@ -141,7 +141,8 @@ class EMAPSLoad(TermLoad):
     
     def loadEMAPSBCP(self, bcpFileName):
         """
-        Create VOC_Term_EMAPS BCP file and load into database
+        Copy VOC_Term_EMAPS rows into database
+        (and the BCP file, if BULK_AUDIT_FILES is set)
         
         VOC_Term_EMAPS will be a full drop and reload,
             even though VOC_Term is incremental
@@ -166,8 +167,8 @@ class EMAPSLoad(TermLoad):
             emapTermDict[r['accid']] = r['_Object_key']
     
         
-        # Write the BCP file
-        emapsBcpFile = open(bcpFileName, 'w')
+        # Copy the rows into the database
+        emapsWriter = bulkWriter.BulkWriter('VOC_Term_EMAPS', bcpFileName)
         
         try:
             for record in self.datafile:
@@ -197,15 +198,13 @@ class EMAPSLoad(TermLoad):
                     continue
         
                 # set _defaultparent_key
-                parentKey = ''
+                parentKey = None
                 if defaultParent in emapTermDict:
                     parentKey = emapTermDict[defaultParent]
     
-                emapsBcpFile.write(BCP_INSERT_EMAPA % (termKey, stage, parentKey, emapaKey))
+                emapsWriter.write(termKey, stage, parentKey, emapaKey,
+                    CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
                 
         finally: 
-            emapsBcpFile.close()
-                
-        # load BCP into database
-        db.bcp(bcpFileName, 'VOC_Term_EMAPS', delimiter='|')
+            emapsWriter.close()
         
@@ -1279,8 +1279,11 @@ if errorCount > 0:
 
 # if this is a live run, load the terms and dags
 if liveRun == '1':
-    # run the term and DAG loads
+    # run the term and DAG loads (the term loads' bulk writers copy on
+    # the shared connection)
+    db.useOneConnection(1)
     runLoads()
     db.commit()
+    db.useOneConnection(0)
 
 sys.exit(0)
@@ -30,7 +30,7 @@
 #
 #  Inputs:
 #
-#	EMAPA.obo
+#	EMAPA.obo (may be gzip, bzip2 or xz compressed)
 #
 #  Outputs:
 #
@@ -64,6 +64,10 @@ import os
 import Set
 import db
 
+# adjust the path so that it will find inputFile.py one directory up
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import inputFile
+
 #
 #  CONSTANTS
 #
@@ -180,7 +184,7 @@ def openFiles ():
         sys.exit(1)
 
     try:
-        fpObo = open(oboFile, 'r')
+        fpObo = inputFile.openInput(oboFile)
     except:
         print('Preprocess cannot open obo file: %s' % oboFile)
         sys.exit(1)
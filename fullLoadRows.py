@@ -0,0 +1,235 @@
+#
+#  fullLoadRows.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Generate the bulk rows (VOC_Term, MGI_Note, MGI_NoteChunk,
+#      MGI_Synonym, ACC_Accession) of a full term load in parallel.
+#
+#      The term records are split into partitions of consecutive records.
+#      The load counts the keys each partition needs and hands it exactly
+#      those keys (in record order) from its reserved blocks, so a worker
+#      can build its rows without the database.  The formatted rows of the
+#      partitions are returned in partition order, so the rows (and their
+#      keys) are the same whatever the number of workers, and the same as
+#      the rows the load builds one term at a time.
+#
+###########################################################################
+
+import concurrent.futures
+
+import accessionlib
+import bulkWriter
+
+# the tables rows are generated for, in the order they are copied
+TABLES = [ 'VOC_Term', 'MGI_Note', 'MGI_NoteChunk', 'MGI_Synonym',
+    'ACC_Accession' ]
+
+# partitions per worker, so a slow partition does not hold up the others
+PARTITIONS_PER_WORKER = 4
+
+# CLASS: RowGenerator
+# IS: The row layout of the bulk tables of one full term load.
+# HAS: The vocabulary-wide values of the rows (vocabulary, MGI type,
+#      reference, logical database, ...) and the synonym type keys.
+# DOES: Counts the keys a term record needs and formats the rows of a
+#       partition of term records.
+#
+class RowGenerator:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: synonymTypeKeys has every synonym type of the records
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self,
+        vocabKey,           # _Vocab_key of the terms
+        mgiTypeKey,         # _MGIType_key of terms (synonyms, accessions)
+        noteMGITypeKey,     # _MGIType_key of the comment notes
+        noteTypeKey,        # _NoteType_key of the comment notes
+        refsKey,            # _Refs_key of the synonyms
+        logicalDBkey,       # _LogicalDB_key of the accession IDs
+        isPrivate,          # private bit of the accession IDs
+        useSynonymType,     # records have a synonymTypes field
+        synonymTypeKeys,    # synonym type -> _SynonymType_key
+        logicalDBResolver,  # logicalDBResolver.LogicalDBResolver, or None
+        createdByKey,       # _CreatedBy_key/_ModifiedBy_key of the rows
+        cdate,              # creation/modification date of the rows
+        otherIDDelimiter,   # delimiter of the otherIDs field
+        synonymDelimiter,   # delimiter of the synonyms field
+        synonymTypeDelimiter # delimiter of the synonymTypes field
+        ):
+        self.vocabKey = vocabKey
+        self.mgiTypeKey = mgiTypeKey
+        self.noteMGITypeKey = noteMGITypeKey
+        self.noteTypeKey = noteTypeKey
+        self.refsKey = refsKey
+        self.logicalDBkey = logicalDBkey
+        self.isPrivate = isPrivate
+        self.useSynonymType = useSynonymType
+        self.synonymTypeKeys = synonymTypeKeys
+        self.logicalDBResolver = logicalDBResolver
+        self.createdByKey = createdByKey
+        self.cdate = cdate
+        self.otherIDDelimiter = otherIDDelimiter
+        self.synonymDelimiter = synonymDelimiter
+        self.synonymTypeDelimiter = synonymTypeDelimiter
+
+
+    # Purpose: Get the synonyms of a term record and their types.
+    # Returns: List of (synonym, synonym type) tuples, for the non-blank
+    #          synonyms
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def getSynonyms (self, record):
+        synonyms = str.split(record['synonyms'], self.synonymDelimiter)
+
+        if self.useSynonymType:
+            synonymTypes = str.split(record['synonymTypes'], self.synonymTypeDelimiter)
+        else:
+            synonymTypes = ['exact'] * len(synonyms)
+
+        return [(synonyms[i], synonymTypes[i]) for i in range(len(synonyms))
+                if synonyms[i]]
+
+
+    # Purpose: Get the accession IDs of a term record.
+    # Returns: List of (accID, preferred) tuples; the primary ID first
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def getAccIDs (self, record):
+        accIDs = []
+
+        if record['accID']:
+            accIDs.append((record['accID'], int(self.logicalDBkey > 1)))
+
+        otherIDs = str.strip(record['otherIDs'])
+        if otherIDs:
+            for id in str.split(otherIDs, self.otherIDDelimiter):
+                accIDs.append((str.strip(id), 0))
+
+        return accIDs
+
+
+    # Purpose: Count the keys a term record needs.
+    # Returns: Dictionary of table -> number of keys
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def countKeys (self, record):
+        return {
+            'VOC_Term' : 1,
+            'MGI_Note' : int(len(record['comment']) > 0),
+            'MGI_Synonym' : len(self.getSynonyms(record)),
+            'ACC_Accession' : len(self.getAccIDs(record)),
+            }
+
+
+    # Purpose: Format the rows of a partition of term records.
+    # Returns: Tuple of (dictionary of table -> (formatted rows, number of
+    #          rows), dictionary of unresolved logical database prefix ->
+    #          number of IDs)
+    # Assumes: keys has, for each table, the keys of the partition's rows
+    #          in record order (see countKeys)
+    # Effects: Nothing
+    # Throws: propagates exceptions from accessionlib.split_accnum()
+    #
+    def generate (self,
+        records,    # list of term records
+        isObsolete, # list of isObsolete bits, one per record
+        seqNums,    # list of sequence numbers (None for complex vocabs)
+        keys        # dictionary of table -> list of keys
+        ):
+        lines = {}
+        for table in TABLES:
+            lines[table] = []
+
+        termKeys = iter(keys['VOC_Term'])
+        noteKeys = iter(keys['MGI_Note'])
+        synonymKeys = iter(keys['MGI_Synonym'])
+        accessionKeys = iter(keys['ACC_Accession'])
+
+        if self.logicalDBResolver is not None:
+            self.logicalDBResolver.unresolved = {}
+
+        stamp = (self.createdByKey, self.createdByKey, self.cdate, self.cdate)
+
+        for i in range(len(records)):
+            record = records[i]
+            termKey = next(termKeys)
+
+            lines['VOC_Term'].append(bulkWriter.formatRow((termKey,
+                self.vocabKey, record['term'], record['abbreviation'],
+                record['note'], seqNums[i], int(isObsolete[i])) + stamp))
+
+            comment = record['comment']
+            if len(comment) > 0:
+                noteKey = next(noteKeys)
+                comment = ''.join([c if ord(c) < 128 else ' ' for c in comment])
+                lines['MGI_Note'].append(bulkWriter.formatRow((noteKey,
+                    termKey, self.noteMGITypeKey, self.noteTypeKey) + stamp))
+                lines['MGI_NoteChunk'].append(bulkWriter.formatRow((noteKey,
+                    1, comment) + stamp))
+
+            for (synonym, synonymType) in self.getSynonyms(record):
+                lines['MGI_Synonym'].append(bulkWriter.formatRow((
+                    next(synonymKeys), termKey, self.mgiTypeKey,
+                    self.synonymTypeKeys[synonymType], self.refsKey,
+                    synonym) + stamp))
+
+            for (accID, preferred) in self.getAccIDs(record):
+                prefixPart, numericPart = accessionlib.split_accnum(accID)
+
+                logicalDBkey = self.logicalDBkey
+                if self.logicalDBResolver is not None:
+                    logicalDBkey = self.logicalDBResolver.getKey(prefixPart,
+                        logicalDBkey, not preferred)
+
+                lines['ACC_Accession'].append(bulkWriter.formatRow((
+                    next(accessionKeys), accID, prefixPart, numericPart,
+                    logicalDBkey, termKey, self.mgiTypeKey, self.isPrivate,
+                    preferred) + stamp))
+
+        rows = {}
+        for table in TABLES:
+            rows[table] = (''.join(lines[table]), len(lines[table]))
+
+        if self.logicalDBResolver is not None:
+            unresolved = self.logicalDBResolver.unresolved
+        else:
+            unresolved = {}
+
+        return rows, unresolved
+
+
+# Purpose: Format the rows of one partition (run by the worker processes).
+# Returns: see RowGenerator.generate()
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: propagates exceptions from RowGenerator.generate()
+#
+def generatePartition (task):
+    generator, records, isObsolete, seqNums, keys = task
+    return generator.generate(records, isObsolete, seqNums, keys)
+
+
+# Purpose: Format the rows of the term records with a pool of workers.
+# Returns: Generator of the results of RowGenerator.generate() for each
+#          partition, in record order
+# Assumes: Each partition's keys were taken in record order
+# Effects: Starts (and stops) the worker processes
+# Throws: propagates exceptions raised by the workers
+#
+def generateRows (generator, partitions, workers):
+    tasks = [(generator,) + tuple(partition) for partition in partitions]
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        for result in executor.map(generatePartition, tasks):
+            yield result
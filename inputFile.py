@@ -0,0 +1,71 @@
+#
+#  inputFile.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Open an input file for reading as text, decompressing it on the fly
+#      if it is a gzip, bzip2 or xz file.  The compression format is
+#      determined from the first bytes of the file (not its name), so
+#      downloads can be read as-is without a separate decompression step.
+#
+###########################################################################
+
+import io
+import gzip
+import bz2
+import lzma
+
+# size of the buffer between the decompressor and the text decoder
+BUFFER_SIZE = 1024 * 1024
+
+# magic bytes -> function that opens a (binary) decompressing stream
+MAGIC = [
+    (b'\x1f\x8b', gzip.GzipFile),
+    (b'BZh', bz2.BZ2File),
+    (b'\xfd7zXZ\x00', lzma.LZMAFile),
+]
+
+# Purpose: Determine the compression format of a file.
+# Returns: The function that opens a decompressing stream for the file,
+#          or None if the file is not compressed
+# Assumes: Nothing
+# Effects: Reads the first bytes of the file
+# Throws: propagates exceptions opening the file
+#
+def getDecompressor (fileName):
+    fp = open(fileName, 'rb')
+    magic = fp.read(6)
+    fp.close()
+
+    for (prefix, decompressor) in MAGIC:
+        if magic.startswith(prefix):
+            return decompressor
+
+    return None
+
+
+# Purpose: Returns true if the file is compressed.
+# Returns: 1 if the file is compressed, 0 if not
+# Assumes: Nothing
+# Effects: Reads the first bytes of the file
+# Throws: propagates exceptions opening the file
+#
+def isCompressed (fileName):
+    return getDecompressor(fileName) is not None
+
+
+# Purpose: Open a (possibly compressed) file for reading as text.
+# Returns: Text file object
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: propagates exceptions opening the file
+#
+def openInput (fileName, encoding = None):
+    decompressor = getDecompressor(fileName)
+
+    if decompressor is None:
+        return open(fileName, 'r', encoding = encoding)
+
+    stream = io.BufferedReader(decompressor(fileName, 'rb'), BUFFER_SIZE)
+    return io.TextIOWrapper(stream, encoding = encoding)
@@ -0,0 +1,183 @@
+#
+#  keyAllocator.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Hand out primary keys for the tables a term load inserts into.
+#      Keys are reserved in blocks sized from the input, so the load does
+#      not query the database for each new row.
+#
+#      Each table has a sequence, and a block is reserved with one
+#      nextval() query over generate_series(), so the keys cannot be given
+#      to another load that reserves its keys here (or with nextval()) at
+#      the same time; no lock is taken, and nothing is held until the end
+#      of the transaction.  At the end of the load, unused keys are given
+#      back by setting the sequence to the last key used, unless another
+#      load has taken keys since.
+#
+#      Writers that do not use the sequences are NOT covered: loads that
+#      take max(key) + 1 (e.g. loadNote.py, through vocloadlib.getMax(),
+#      and the other MGI loads that add notes or accession IDs that way)
+#      may pick a key this module has reserved, if they run at the same
+#      time.  Before each block is reserved, the sequence is moved up to
+#      max(key) of its table, so rows those writers committed earlier are
+#      not given out again.
+#
+###########################################################################
+
+import collections
+
+import db
+import vocloadlib
+
+# table -> (key column, sequence)
+TABLES = {
+    'VOC_Term' : ('_Term_key', 'voc_term_seq'),
+    'MGI_Synonym' : ('_Synonym_key', 'mgi_synonym_seq'),
+    'MGI_Note' : ('_Note_key', 'mgi_note_seq'),
+    'ACC_Accession' : ('_Accession_key', 'acc_accession_seq'),
+}
+
+# moves a sequence up to max(key) of its table, if it is behind
+CATCH_UP_SEQUENCE = '''select setval('%s', m.maxKey)
+    from %s s, (select max(%s) as maxKey from %s) m
+    where s.last_value <= m.maxKey'''
+
+# smallest block reserved at a time
+MIN_BLOCK_SIZE = 100
+
+# CLASS: KeyAllocator
+# IS: A source of new primary keys for a set of tables.
+# HAS: The keys reserved (and not yet used) for each table, the last key
+#      handed out for each table and a log.
+# DOES: Reserves blocks of keys, hands out keys and gives back the unused
+#       keys.
+#
+class KeyAllocator:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self, log):
+        self.log = log
+        self.keys = {}      # table -> deque of reserved keys
+        self.first = {}     # table -> first key reserved
+        self.last = {}      # table -> last key reserved
+        self.used = {}      # table -> last key handed out
+        self.blockSize = {} # table -> size of the last block reserved
+
+        for table in list(TABLES.keys()):
+            self.keys[table] = collections.deque()
+
+
+    # Purpose: Reserve a block of keys for a table.
+    # Returns: Nothing
+    # Assumes: The table is in TABLES
+    # Effects: Moves the table's sequence up to max(key), then advances it
+    #          past the block
+    # Throws: propagates exceptions from db.sql()
+    #
+    def reserve (self, table, count):
+        count = max(count, MIN_BLOCK_SIZE)
+        column, sequence = TABLES[table]
+
+        db.sql(CATCH_UP_SEQUENCE % (sequence, sequence, column, table), 'auto')
+
+        results = db.sql('''select nextval('%s') as key from generate_series(1, %d)''' % \
+            (sequence, count), 'auto')
+        keys = sorted([r['key'] for r in results])
+
+        self.keys[table].extend(keys)
+        if table not in self.first:
+            self.first[table] = keys[0]
+        self.last[table] = keys[-1]
+        self.blockSize[table] = count
+
+        self.log.writeline('Reserved %d %s keys (%d - %d)' % \
+            (count, column, keys[0], keys[-1]))
+
+
+    # Purpose: Hand out the next key for a table.
+    # Returns: Integer key
+    # Assumes: The table is in TABLES
+    # Effects: Reserves another block if the reserved keys are used up
+    # Throws: propagates exceptions from reserve()
+    #
+    def nextKey (self, table):
+        keys = self.keys[table]
+        if not keys:
+            self.reserve(table, self.blockSize.get(table, MIN_BLOCK_SIZE))
+
+        key = keys.popleft()
+        self.used[table] = key
+        return key
+
+
+    # Purpose: Hand out the next count keys for a table.
+    # Returns: List of integer keys, in the order nextKey() would give them
+    # Assumes: The table is in TABLES
+    # Effects: Reserves more keys if the reserved keys are used up
+    # Throws: propagates exceptions from reserve()
+    #
+    def takeKeys (self, table, count):
+        keys = self.keys[table]
+        if len(keys) < count:
+            self.reserve(table, max(count - len(keys),
+                self.blockSize.get(table, MIN_BLOCK_SIZE)))
+
+        taken = [keys.popleft() for i in range(count)]
+        if taken:
+            self.used[table] = taken[-1]
+        return taken
+
+
+    # Purpose: Note that the rows using the keys handed out so far have
+    #          been committed (by a load that commits in chunks).
+    # Returns: Nothing
+    # Assumes: The transaction has just been committed
+    # Effects: The keys handed out are no longer given back by finish(0)
+    # Throws: Nothing
+    #
+    def commit (self):
+        for table in list(self.used.keys()):
+            if table in self.first:
+                self.first[table] = self.used[table] + 1
+
+
+    # Purpose: Give back the sequence keys that were reserved but not used.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Sets sequences back to the last key used (or, if the keys
+    #          used were not kept, to before the first key reserved) if no
+    #          other load has taken keys from them since
+    # Throws: propagates exceptions from db.sql()
+    #
+    def finish (self,
+        keepUsed = 1    # 0 if the rows were rolled back (or not loaded)
+        ):
+        for table in list(self.last.keys()):
+            column, sequence = TABLES[table]
+
+            if not keepUsed or vocloadlib.isNoLoad() or table not in self.used:
+                lastKey = self.first[table] - 1
+            else:
+                lastKey = self.used[table]
+
+            if lastKey == self.last[table]:
+                continue
+
+            # setval() does not accept 0, so the sequence is marked as not
+            # called instead
+            if lastKey >= 1:
+                isCalled = 'true'
+            else:
+                isCalled = 'false'
+
+            db.sql('''select setval('%s', %d, %s) from %s where last_value = %d''' % \
+                (sequence, max(lastKey, 1), isCalled, sequence, self.last[table]), None)
+
+            self.keys[table].clear()
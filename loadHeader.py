@@ -46,6 +46,8 @@ import os
 import vocloadlib
 import mgi_utils
 import db
+import loadMetrics
+import sqlProfiler
 
 # init database connection
 server = os.environ['DBSERVER']
@@ -56,6 +58,8 @@ fp = open(passwordFileName, 'r')
 password = str.strip(fp.readline())
 fp.close()
 vocloadlib.setupSql (server, database, username, password)
+loadMetrics.start()
+sqlProfiler.start()
 
 # get vocabName, mgiTypeKey, jNumber and userKey from environment
 vocabName = os.environ['VOCAB_NAME']
@@ -77,6 +81,7 @@ if len(sys.argv) < 2:
         headerAnnotTypeKey = sys.argv[2]
 
 print("loading header file %s" % headerFile)
+loadMetrics.startPhase('Read Header File')
 headerRecords = set([])
 fp = open(headerFile, 'r')
 for line in fp.readlines():
@@ -86,6 +91,10 @@ for line in fp.readlines():
 fp.close()
 
 headerIDs = list(headerRecords)
+loadMetrics.addRecordsRead(len(headerIDs))
+loadMetrics.endPhase()
+
+loadMetrics.startPhase('Load Headers')
 
 vocabKey = vocloadlib.getVocabKey(vocabName)
 
@@ -173,4 +182,5 @@ if headerAnnotTypeKey:
         db.sql('''select %s(%s);''' % (procName, headerAnnotTypeKey))
 
 db.commit()
+loadMetrics.endPhase()
 sys.exit(0)
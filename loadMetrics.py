@@ -0,0 +1,454 @@
+#
+#  loadMetrics.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Record metrics for the phases of a vocabulary load and save them
+#      to one JSON metrics file per run (LOAD_METRICS_FILE).
+#
+#      Each program of the run (loadOBO.py, loadTopSort.py, ...) calls
+#      start(), which hooks db.sql() and db.bcp() (see dbHooks.py) to
+#      count what they do,
+#      and marks its phases with startPhase()/endPhase() or phase().
+#      Phases may be nested; the counts of a phase include those of the
+#      phases inside it.  For each phase we record:
+#
+#          program       the program the phase ran in
+#          phase         the phase name
+#          parent        the name of the enclosing phase (or null)
+#          start, end    local time stamps
+#          seconds       the duration
+#          rowsRead      rows returned by db.sql()
+#          recordsRead   records read from the input files
+#          rowsWritten   rows written per table: rows copied by the bulk
+#                        writers and db.bcp(), and the value tuples of
+#                        "insert ... values" statements run by db.sql()
+#                        (vocloadlib.nl_sqlog() runs its statements with
+#                        db.sql(), so they are counted unless the run is
+#                        no-load).  Rows written by "insert ... select",
+#                        updates and deletes are not counted
+#          statements    statements executed by db.sql(), and bcp loads
+#          peakRSS       peak resident set size of the program so far,
+#                        and of its finished child processes (the
+#                        worker pools), in bytes
+#          complete      0 if the phase was still open when the program
+#                        exited (e.g. it failed)
+#
+#      When a program exits, its phases are added to the metrics file
+#      (under a lock, as the file is shared by the programs of the run):
+#
+#          {"version": 1, "programs": [
+#              {"program": ..., "pid": ..., "start": ..., "end": ...,
+#               "vocabName": ..., "phases": [...]}, ...]}
+#
+#      VOClib.config's setUp() removes the file at the start of a run.
+#
+#  Env Vars:
+#
+#      LOAD_METRICS_FILE  the metrics file; if not set (or ""), no
+#                         metrics are kept and the functions here do
+#                         nothing
+#      VOCAB_NAME         recorded with each program
+#
+###########################################################################
+
+import sys
+import os
+import re
+import time
+import json
+import fcntl
+import atexit
+import resource
+import contextlib
+
+import dbHooks
+
+VERSION = 1
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# an insert of value tuples: 'insert into <table> ... values (...), ...'
+VALUES_INSERT = re.compile(r'^\s*insert\s+into\s+(\w+)[^;]*?\bvalues\b',
+    re.IGNORECASE | re.DOTALL)
+
+# a quoted string, which may hold parentheses
+QUOTED = re.compile(r"'(?:[^']|'')*'")
+
+# the program being measured, once start() has been called
+program = None
+
+# the open phases, outermost first
+openPhases = []
+
+# the phases of this program, in the order they were started
+phases = []
+
+# CLASS: Phase
+# IS: One phase of a program.
+# HAS: The name, the times and the counts of the phase.
+# DOES: Counts the work done during the phase.
+#
+class Phase:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self,
+        name,       # phase name
+        parent      # the enclosing Phase, or None
+        ):
+        self.name = name
+        self.parent = parent
+        self.startTime = time.time()
+        self.endTime = None
+        self.rowsRead = 0
+        self.recordsRead = 0
+        self.rowsWritten = {}
+        self.statements = 0
+        self.peakRSS = 0
+        self.peakChildRSS = 0
+
+    # Purpose: End the phase.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Records the end time and the peak RSS
+    # Throws: Nothing
+    #
+    def end (self):
+        self.endTime = time.time()
+        (self.peakRSS, self.peakChildRSS) = getPeakRSS()
+
+    # Purpose: Get the phase as a dictionary for the metrics file.
+    # Returns: dictionary
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def asDict (self):
+        complete = 1
+        if self.endTime is None:
+            complete = 0
+            self.end()
+
+        parent = None
+        if self.parent:
+            parent = self.parent.name
+
+        return {
+            'program' : program['program'],
+            'phase' : self.name,
+            'parent' : parent,
+            'start' : formatTime(self.startTime),
+            'end' : formatTime(self.endTime),
+            'seconds' : round(self.endTime - self.startTime, 3),
+            'rowsRead' : self.rowsRead,
+            'recordsRead' : self.recordsRead,
+            'rowsWritten' : self.rowsWritten,
+            'statements' : self.statements,
+            'peakRSS' : self.peakRSS,
+            'peakChildRSS' : self.peakChildRSS,
+            'complete' : complete,
+            }
+
+# Purpose: Format a time for the metrics file.
+# Returns: str
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def formatTime (seconds):
+    return time.strftime(TIME_FORMAT, time.localtime(seconds))
+
+# Purpose: Get the peak resident set size of this process and of its
+#          finished child processes.
+# Returns: tuple (self bytes, children bytes)
+# Assumes: ru_maxrss is in kilobytes (Linux)
+# Effects: Nothing
+# Throws: Nothing
+#
+def getPeakRSS ():
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024)
+
+# Purpose: Get the name of the metrics file.
+# Returns: str, or None if no metrics are kept
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getMetricsFile ():
+    try:
+        return os.environ['LOAD_METRICS_FILE'] or None
+    except:
+        return None
+
+# Purpose: Returns true if metrics are being kept for this program.
+# Returns: boolean
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def isOn ():
+    return program is not None
+
+# Purpose: Start keeping metrics for this program.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Hooks db.sql() and db.bcp(); the phases are saved to the
+#          metrics file when the program exits.  Does nothing if
+#          LOAD_METRICS_FILE is not set or if metrics are already kept.
+# Throws: Nothing
+#
+def start (
+    name = None     # program name (default: the name of the script)
+    ):
+    global program
+
+    if program is not None or not getMetricsFile():
+        return
+
+    if not name:
+        name = os.path.basename(sys.argv[0])
+
+    try:
+        vocabName = os.environ['VOCAB_NAME']
+    except:
+        vocabName = None
+
+    program = {
+        'program' : name,
+        'pid' : os.getpid(),
+        'vocabName' : vocabName,
+        'startTime' : time.time(),
+        }
+
+    instrumentDB()
+    atexit.register(save)
+
+# Purpose: Hook db.sql() and db.bcp() so they are counted.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds hooks (see dbHooks.py)
+# Throws: Nothing
+#
+def instrumentDB ():
+
+    def sqlHook (cmd, results, seconds):
+        if openPhases:
+            countSql(cmd, results)
+
+    def bcpHook (bcpFile, table, seconds):
+        if openPhases:
+            addStatements(1)
+            addRowsWritten(table, countLines(bcpFile))
+
+    dbHooks.addSqlHook(sqlHook)
+    dbHooks.addBcpHook(bcpHook)
+
+# Purpose: Count the statements, rows read and rows written of a
+#          db.sql() call.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds to the counts of the open phases
+# Throws: Nothing
+#
+def countSql (cmd, results):
+    if type(cmd) == list:
+        commands = cmd
+        resultList = results or []
+    else:
+        commands = [cmd]
+        resultList = [results]
+
+    addStatements(len(commands))
+
+    rowsRead = 0
+    for result in resultList:
+        if type(result) == list:
+            rowsRead = rowsRead + len(result)
+    addRowsRead(rowsRead)
+
+    for command in commands:
+        if type(command) == str:
+            match = VALUES_INSERT.match(command)
+            if match:
+                addRowsWritten(match.group(1),
+                    countTuples(command[match.end():]))
+
+# Purpose: Count the value tuples of the values list of an insert.
+# Returns: integer
+# Assumes: values is the text after 'values'
+# Effects: Nothing
+# Throws: Nothing
+#
+def countTuples (values):
+    count = 0
+    depth = 0
+    for c in QUOTED.sub("''", values):
+        if c == '(':
+            if depth == 0:
+                count = count + 1
+            depth = depth + 1
+        elif c == ')':
+            depth = depth - 1
+        elif c == ';' and depth == 0:
+            break
+    return count
+
+# Purpose: Count the lines of a bcp file.
+# Returns: integer (0 if the file cannot be read)
+# Assumes: Nothing
+# Effects: Reads the file
+# Throws: Nothing
+#
+def countLines (fileName):
+    try:
+        fp = open(fileName, 'r')
+    except:
+        return 0
+
+    count = 0
+    for line in fp:
+        count = count + 1
+    fp.close()
+    return count
+
+# Purpose: Start a phase.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: The phase is nested inside the open phases
+# Throws: Nothing
+#
+def startPhase (name):
+    if program is None:
+        return
+
+    parent = None
+    if openPhases:
+        parent = openPhases[-1]
+
+    current = Phase(name, parent)
+    openPhases.append(current)
+    phases.append(current)
+
+# Purpose: End the innermost open phase.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def endPhase ():
+    if openPhases:
+        openPhases.pop().end()
+
+# Purpose: Run the body of a 'with' statement as a phase.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: The phase is left open if the body raises an exception, so
+#          it is saved as incomplete
+# Throws: propagates exceptions from the body
+#
+@contextlib.contextmanager
+def phase (name):
+    startPhase(name)
+    yield
+    endPhase()
+
+# Purpose: Add to the statements executed.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds to the counts of the open phases
+# Throws: Nothing
+#
+def addStatements (count):
+    for p in openPhases:
+        p.statements = p.statements + count
+
+# Purpose: Add to the rows read.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds to the counts of the open phases
+# Throws: Nothing
+#
+def addRowsRead (count):
+    for p in openPhases:
+        p.rowsRead = p.rowsRead + count
+
+# Purpose: Add to the records read from the input files.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds to the counts of the open phases
+# Throws: Nothing
+#
+def addRecordsRead (count):
+    for p in openPhases:
+        p.recordsRead = p.recordsRead + count
+
+# Purpose: Add to the rows written to a table.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds to the counts of the open phases
+# Throws: Nothing
+#
+def addRowsWritten (
+    table,      # table name (or table (columns))
+    count       # number of rows
+    ):
+    table = table.split('(')[0].strip()
+    for p in openPhases:
+        p.rowsWritten[table] = p.rowsWritten.get(table, 0) + count
+
+# Purpose: Add this program's phases to the metrics file.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Rewrites the metrics file, under a lock on '<file>.lock'.
+#          Phases still open are saved as incomplete.  Problems writing
+#          the file are reported on stderr; they do not fail the load.
+# Throws: Nothing
+#
+def save ():
+    metricsFile = getMetricsFile()
+    if program is None or not metricsFile or not phases:
+        return
+
+    record = {
+        'program' : program['program'],
+        'pid' : program['pid'],
+        'vocabName' : program['vocabName'],
+        'start' : formatTime(program['startTime']),
+        'end' : formatTime(time.time()),
+        'phases' : [p.asDict() for p in phases],
+        }
+
+    try:
+        lockFile = open(metricsFile + '.lock', 'w')
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+        try:
+            metrics = {'version' : VERSION, 'programs' : []}
+            if os.path.exists(metricsFile):
+                fp = open(metricsFile, 'r')
+                try:
+                    metrics = json.load(fp)
+                except ValueError:
+                    pass
+                fp.close()
+
+            metrics['programs'].append(record)
+
+            fp = open(metricsFile + '.tmp', 'w')
+            json.dump(metrics, fp, indent = 1)
+            fp.close()
+            os.replace(metricsFile + '.tmp', metricsFile)
+        finally:
+            fcntl.flock(lockFile, fcntl.LOCK_UN)
+            lockFile.close()
+    except (IOError, OSError) as e:
+        sys.stderr.write('cannot write load metrics to %s: %s\n' % \
+            (metricsFile, e))
+
+    del phases[:]
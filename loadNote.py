@@ -44,6 +44,9 @@ import os
 import vocloadlib
 import mgi_utils
 import db
+import bulkWriter
+import loadMetrics
+import sqlProfiler
 
 # init database connection
 server = os.environ['DBSERVER']
@@ -54,6 +57,9 @@ fp = open(passwordFileName, 'r')
 password = str.strip(fp.readline())
 fp.close()
 vocloadlib.setupSql (server, database, username, password)
+db.useOneConnection(1)
+loadMetrics.start()
+sqlProfiler.start()
 
 # get vocabName, mgiTypeKey, jNumber and userKey from environment
 vocabName = os.environ['VOCAB_NAME']
@@ -70,6 +76,7 @@ cdate = mgi_utils.date("%m/%d/%Y")
 noteFile = sys.argv[1]
 
 print("loading note file %s" % noteFile)
+loadMetrics.startPhase('Read Note File')
 noteRecords = []
 fp = open(noteFile, 'r')
 for line in fp.readlines():
@@ -77,6 +84,10 @@ for line in fp.readlines():
         if line:
                 noteRecords.append(line.split('\t'))
 fp.close()
+loadMetrics.addRecordsRead(len(noteRecords))
+loadMetrics.endPhase()
+
+loadMetrics.startPhase('Load Notes')
 
 #
 #  Get the vocabulary key for the current vocabulary.
@@ -176,19 +187,17 @@ print('Number of notes to add: %d' % len(noteBcpRecords))
 #
 #  Add the records to the MGI_Note + MGI_NoteChunk tables.
 #
-fp = open(noteBcpFile, 'w')
+noteWriter = bulkWriter.BulkWriter('MGI_Note', noteBcpFile)
+noteChunkWriter = bulkWriter.BulkWriter('MGI_NoteChunk', noteChunkBcpFile)
 for r in noteBcpRecords:
-        fp.write('%s\n' % '|'.join([str(c) for c in r]))
-fp.close()
-
-fp = open(noteChunkBcpFile, 'w')
+        noteWriter.write(*r)
 for r in noteChunkBcpRecords:
-        fp.write('%s\n' % '|'.join([str(c) for c in r]))
-fp.close()
-
-db.bcp(noteBcpFile, 'MGI_Note', delimiter='|')
-db.bcp(noteChunkBcpFile, 'MGI_NoteChunk', delimiter='|')
+        noteChunkWriter.write(*r)
+noteWriter.close()
+noteChunkWriter.close()
 
 db.commit()
+db.useOneConnection(0)
+loadMetrics.endPhase()
 
 sys.exit(0)
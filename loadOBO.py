@@ -27,12 +27,12 @@
 #
 #  Inputs:
 #
-#      - An OBO format input file
+#      - An OBO format input file (may be gzip, bzip2 or xz compressed)
 #
 #  Outputs:
 #
 #      - Log file
-#      - File of terms (Termfile)
+#      - File of terms (Termfile), unless OBO_WRITE_TERM_FILE is 0
 #      - 1 or more DAG files (one for each namespace)
 #      - Bcp files
 #
@@ -48,9 +48,12 @@
 #      This script will perform following steps:
 #
 #      1) Use the OBOParser module to parse the input file and create
-#         the Termfile and DAG file(s).
+#         the term records and DAG file(s).
 #
-#      2) Invoke the loadVOC module to load the vocabulary.
+#      2) Invoke the loadVOC module to load the vocabulary.  The term
+#         records are handed to the term load in memory; the Termfile is
+#         still written (as an audit copy of those records) unless
+#         OBO_WRITE_TERM_FILE is 0.
 #
 #  Notes:  None
 #
@@ -73,8 +76,13 @@ import getopt
 import rcdlib
 import Log
 import OBOParser
+import OBOCache
+import VocabPolicy
+import inputFile
 import vocloadlib
 import loadVOC
+import loadMetrics
+import sqlProfiler
 import db
 
 USAGE = 'Usage:  %s [-n] [-f|-i] [-l <log file>] <RcdFile>' % sys.argv[0]
@@ -156,16 +164,21 @@ def initialize():
 #
 def openFiles():
     global fpOBO, fpValid, fpTerm, fpDAG
-    global fpDOmgislim, fpDOgxdslim
+    global fpSubset
 
     oboFile = os.environ['OBO_FILE']
     validFile = os.environ['VALIDATION_LOG_FILE']
     termFile = os.environ['TERM_FILE']
 
-    # Open the OBO input file.
+    try:
+        writeTermFile = int(os.environ['OBO_WRITE_TERM_FILE'])
+    except:
+        writeTermFile = 1
+
+    # Open the OBO input file (it may be gzip/bzip2/xz compressed).
     #
     try:
-        fpOBO = open(oboFile, 'r', encoding='utf-8')
+        fpOBO = inputFile.openInput(oboFile, 'utf-8')
     except:
         log.writeline('Cannot open OBO file: ' + oboFile)
         exit(1)
@@ -178,16 +191,19 @@ def openFiles():
         log.writeline('Cannot open validation log: ' + validFile)
         exit(1)
 
-    # Open the Termfile.
+    # Open the Termfile, if an audit copy of the term records is wanted.
     #
-    try:
-        fpTerm = open(termFile, 'w')
-    except:
-        log.writeline('Cannot open term file: ' + termFile)
-        exit(1)
+    fpTerm = None
+    if writeTermFile:
+        try:
+            fpTerm = open(termFile, 'w')
+        except:
+            log.writeline('Cannot open term file: ' + termFile)
+            exit(1)
 
     log.writeline('OBO File = ' + oboFile)
-    log.writeline('Termfile = ' + termFile)
+    if fpTerm:
+        log.writeline('Termfile = ' + termFile)
 
     # Open a DAG file for each namespace.
     #
@@ -203,16 +219,16 @@ def openFiles():
 
         log.writeline('DAG file = ' + dagFile)
 
-    # Open the DO_MGI_slim file.
+    # Open a file for each subset that the vocabulary policy lists the
+    # terms of (e.g. DO_MGI_slim/DO_GXD_slim for Disease Ontology).
     #
-    if vocabName == 'Disease Ontology':
+    fpSubset = {}
+    for (subset, envName) in list(policy.subsetFiles.items()):
         try:
-            domgislimFile = os.environ['DO_MGI_SLIM_FILE']
-            dogxdslimFile = os.environ['DO_GXD_SLIM_FILE']
-            fpDOmgislim = open(domgislimFile, 'w')
-            fpDOgxdslim = open(dogxdslimFile, 'w')
+            subsetFile = os.environ[envName]
+            fpSubset[subset] = open(subsetFile, 'w')
         except:
-            log.writeline('Cannot open DO_MGI_slim/DO_GXD_slim files: ' + domgislimFile)
+            log.writeline('Cannot open %s file (%s)' % (subset, envName))
             exit(1)
 
 # Purpose: Close all the input and output files.
@@ -225,29 +241,64 @@ def closeFiles():
 
     fpOBO.close()
     fpValid.close()
-    fpTerm.close()
+
+    if fpTerm:
+        fpTerm.close()
 
     for i in list(fpDAG.values()):
         i.close()
 
-    try:
-        fpDOmgislim.close()
-        fpDOgxdslim.close()
-    except:
-        pass
+    for i in list(fpSubset.values()):
+        i.close()
+
+# Purpose: Add a term to the term records that are passed to the term load
+#          and, if it is open, write it to the Termfile.
+# Returns: Nothing
+# Assumes: The values do not contain tabs or newlines
+# Effects: Nothing
+# Throws: Nothing
+#
+def addTermRecord(term, accID, status, note, comment, synonyms, synonymTypes, otherIDs):
+
+    # The keys are the Termfile columns, as read by loadTerms.TermLoad.
+    #
+    termRecords.append({
+        'term' : term,
+        'accID' : accID,
+        'status' : status,
+        'abbreviation' : TERM_ABBR,
+        'note' : note,
+        'comment' : comment,
+        'synonyms' : synonyms,
+        'synonymTypes' : synonymTypes,
+        'otherIDs' : otherIDs,
+    })
+
+    if fpTerm:
+        fpTerm.write(term + '\t' + \
+                     accID + '\t' + \
+                     status + '\t' + \
+                     TERM_ABBR + '\t' + \
+                     note + '\t' + \
+                     comment + '\t' + \
+                     synonyms + '\t' + \
+                     synonymTypes + '\t' + \
+                     otherIDs + '\n')
 
 # Purpose: Use an OBOParser object to get header/term attributes from the
-#          OBO input file and use this information to create the Termfile
-#          and DAG file(s).
+#          OBO input file and use this information to create the term
+#          records (termRecords) and DAG file(s).
 # Returns: Nothing
 # Assumes: Nothing
 # Effects: Nothing
 # Throws: Nothing
 #
 def parseOBOFile():
-    global vocabName
+    global vocabName, policy, termRecords
 
+    termRecords = []
     vocabName = os.environ['VOCAB_NAME']
+    policy = VocabPolicy.getPolicy(vocabName)
     expectedVersion = os.environ['OBO_FILE_VERSION']
     dagRootID = os.environ['DAG_ROOT_ID']
     # default node label
@@ -262,44 +313,84 @@ def parseOBOFile():
     # will not have any relationships defined, so it would not get added
     # to the DAG file when the term is process below.
     #
-    if dagRootID:
-        # ignore the 'real' root for Feature Relationship vocab
-        if vocabName == 'Feature Relationship':
-            pass
-        elif vocabName in ['Marker Category']:
-             fpDAG[validNamespace[0]].write(dagRootID + '\t' + 'show' + '\t' + '\t' + '\n') 
+    if dagRootID and policy.writeRoot:
+        if policy.rootNodeLabel is not None:
+            fpDAG[validNamespace[0]].write(dagRootID + '\t' + policy.rootNodeLabel + '\t' + '\t' + '\n')
         else:
             for i in validNamespace:
                 fpDAG[i].write(dagRootID + '\t' + '\t' + '\t' + '\n')
 
-    # If the GO vocabulary is being loaded, add the parent obsolete term to
-    # the Termfile and associate it to the root ID in the obsolete DAG file.
+    # If the vocabulary (GO) has an obsolete parent, add the parent obsolete
+    # term to the term records and associate it to the root ID in the obsolete
+    # DAG file.
     #
-    if vocabName == 'GO':
+    if policy.obsoleteParent:
         obsoleteTerm = os.environ['OBSOLETE_TERM']
         obsoleteID = os.environ['OBSOLETE_ID']
         obsoleteDefinition = os.environ['OBSOLETE_DEFINITION']
         obsoleteComment = os.environ['OBSOLETE_COMMENT']
         obsoleteNamespace = os.environ['OBSOLETE_NAMESPACE']
 
-        fpTerm.write(obsoleteTerm + '\t' + obsoleteID + '\t' + \
-                     'obsolete' + '\t' + TERM_ABBR + '\t' + \
-                     obsoleteDefinition + '\t' + obsoleteComment + '\t' + \
-                     '\t' + '\t' + '\n')
+        addTermRecord(obsoleteTerm, obsoleteID, 'obsolete',
+                      obsoleteDefinition, obsoleteComment, '', '', '')
 
         fpDAG[obsoleteNamespace].write(obsoleteID + '\t' + '\t' + 'is-a' + \
                                        '\t' + dagRootID + '\n')
 
     log.writeline('Parse OBO file')
 
-    # Create an OBO parser that will return attributes from the OBO
-    # input file.
+    # If the same OBO file (and configuration) has been parsed before, use
+    # the cached terms instead of parsing the file again.
     #
-    parser = OBOParser.Parser(fpOBO, log)
+    cache = OBOCache.getCache(log)
+    cacheKey = None
+    parser = None
+    terms = None
+
+    if cache:
+        cacheKey = cache.getKey(os.environ['OBO_FILE'], vocabName, validNamespace)
+        cached = cache.load(cacheKey)
+        if cached:
+            header, terms = cached
+
+    if terms is None:
+
+        # Create an OBO parser that will return attributes from the OBO
+        # input file.  If more than one worker is configured, the file is
+        # parsed in chunks by a pool of processes; the terms are still
+        # returned in file order, so the output files are the same.
+        #
+        try:
+            parseWorkers = int(os.environ['OBO_PARSE_WORKERS'])
+        except:
+            parseWorkers = 1
+
+        # A compressed file cannot be split into chunks.
+        #
+        if parseWorkers > 1 and inputFile.isCompressed(os.environ['OBO_FILE']):
+            log.writeline('OBO file is compressed; parsing without workers')
+            parseWorkers = 1
 
-    # Get the header from the parser and save its attributes.
+        # Workers only pay with more than one CPU and a large file.
+        #
+        if parseWorkers > 1:
+            parseWorkers, reason = OBOParser.getParseWorkers(os.environ['OBO_FILE'], parseWorkers)
+            if reason:
+                log.writeline('OBO_PARSE_WORKERS reduced to %d: %s' % (parseWorkers, reason))
+
+        if parseWorkers > 1:
+            log.writeline('Parse OBO file using %d workers' % parseWorkers)
+            parser = OBOParser.ParallelParser(os.environ['OBO_FILE'], log, parseWorkers)
+        else:
+            parser = OBOParser.Parser(fpOBO, log)
+
+        # Get the header from the parser.
+        #
+        header = parser.getHeader()
+        terms = parser
+
+    # Save the header attributes.
     #
-    header = parser.getHeader()
     version = header.getVersion()
     defaultNamespace = header.getDefaultNamespace()
 
@@ -312,13 +403,28 @@ def parseOBOFile():
         closeFiles()
         return 1
 
-    # Get the first term from the parser.
+    # Parse the whole file into the cache before processing the terms.
     #
-    term = parser.nextTerm()
+    if cache and parser:
+        terms = list(parser)
+        cache.save(cacheKey, header, terms)
 
-    # Process each term returned by the parser.
+    # Copy the policy switches to locals for the term loop.
+    #
+    skipRootTerm = policy.skipRootTerm
+    skipNoNamespace = policy.skipNoNamespace
+    requiredIDText = policy.requiredIDText
+    policyNamespace = policy.namespace
+    requireNamespace = policy.requireNamespace
+    writeDAG = policy.writeDAG
+    subsetNodeLabel = policy.subsetNodeLabel
+    skipObsolete = policy.skipObsolete
+    namespaceTermAsRoot = policy.namespaceTermAsRoot
+    obsoleteParent = policy.obsoleteParent
+
+    # Process each term returned by the parser (or the cache).
     #
-    while term != None:
+    for term in terms:
 
         # Get the attributes of the term.
         #
@@ -338,26 +444,19 @@ def parseOBOFile():
         subset = term.getSubset()
         isValid = 1
 
-        if termID == dagRootID and vocabName == 'Feature Relationship':
-            # skip this term
-            term = parser.nextTerm()
+        # Feature Relationship: skip the 'real' root term
+        #
+        if skipRootTerm and termID == dagRootID:
             continue
-            #isValid = 0
 
+        # EMAPA/EMAPS: skip terms without a namespace
         #
-        # for EMAPA/EMAPS
-        #
-        if vocabName == 'EMAPA' and namespace == '':
-            # skip this term
-            term = parser.nextTerm()
+        if skipNoNamespace and namespace == '':
             continue
 
+        # Disease Ontology: skip terms that are not DOID: terms
         #
-        # for Disease Ontology
-        #
-        if vocabName == 'Disease Ontology' and termID.find('DOID:') < 0:
-            # skip this term
-            term = parser.nextTerm()
+        if requiredIDText and termID.find(requiredIDText) < 0:
             continue
 
         #
@@ -368,16 +467,14 @@ def parseOBOFile():
         # each term, so the default namespace from the header is used.
         #
 
-        if vocabName == 'Cell Ontology':
-            namespace = 'cell'
-        elif vocabName == 'Evidence Code Ontology':
-            namespace = 'eco'
+        if policyNamespace is not None:
+            namespace = policyNamespace
         elif namespace != '':
             if namespace not in validNamespace:
                 fpValid.write('(' + termID + ') Invalid namespace: ' + namespace + '\n')
                 isValid = 0
         else:
-            if vocabName == 'GO' or vocabName == 'Feature Relationship':
+            if requireNamespace:
                 log.writeline('Missing namespace for term: ' + termID)
                 closeFiles()
                 return 1
@@ -390,7 +487,7 @@ def parseOBOFile():
         # the database.  This will allow a match on relationship types such
         # "is_a" vs "is-a".
         #
-        if vocabName not in ('Cell Ontology'):
+        if writeDAG:
                 for r in relationshipType:
                         label = re.sub('[^a-zA-Z0-9]','',r)
                         if label not in validRelationshipType:
@@ -406,7 +503,7 @@ def parseOBOFile():
 
         # If this is the MCV, validate the subset aka Node Label; description of the Node
         dag_child_label = ''
-        if vocabName == 'Marker Category' and len(subset) > 0:
+        if subsetNodeLabel and len(subset) > 0:
             if len(subset) > 1:
                 fpValid.write('(%s) More than one MCV Node Label: \n' % (termID, subset))
                 isValid = 0
@@ -424,11 +521,11 @@ def parseOBOFile():
         if isValid:
 
             # Remove any tabs from the definition, so it does not mess up
-            # the formatting of the Termfile.
+            # the formatting of the Termfile (or the loaded note).
             #
             definition = re.sub('\t', '', definition)
 
-            # Determine what status to use in the Termfile.
+            # Determine what status to use in the term record.
             # if symbol is obsolete, do not load synonyms (03/16/2017/TR12540)
             #
             if obsolete:
@@ -440,21 +537,13 @@ def parseOBOFile():
                 includeSynonym = '|'.join(synonym)
                 includeSynonymType = '|'.join(synonymType)
 
-            if vocabName == 'Human Phenotype Ontology' and status == 'obsolete':
-                term = parser.nextTerm()
+            if skipObsolete and obsolete:
                 continue
 
-            # Write the term information to the Termfile.
+            # Add the term information to the term records.
             #
-            fpTerm.write(name + '\t' + \
-                         termID + '\t' + \
-                         status + '\t' + \
-                         TERM_ABBR + '\t' + \
-                         definition + '\t' + \
-                         comment + '\t' + \
-                         includeSynonym + '\t' + \
-                         includeSynonymType + '\t' + \
-                         '|'.join(altID) + '\n')
+            addTermRecord(name, termID, status, definition, comment,
+                          includeSynonym, includeSynonymType, '|'.join(altID))
 
             # If the term name is the same as the namespace AND there is a
             # root ID, write a record to the DAG file that relates this
@@ -464,11 +553,10 @@ def parseOBOFile():
             #log.writeline('parseOBOFile:namespace:' + str(namespace) + '\n')
             #log.writeline('parseOBOFile:dagRootID:' + str(dagRootID) + '\n')
 
-            if vocabName not in ('Cell Ontology'):
+            if writeDAG:
                 if name == namespace and dagRootID:
-                        if vocabName == 'Feature Relationship':
+                        if namespaceTermAsRoot:
                                 fpDAG[namespace].write(termID + '\t' + '\t' + '\t' +'\n')
-                                term = parser.nextTerm()
                                 continue
                         else:
                                 #log.writeline('parseOBOFile:fpDAG:1\n')
@@ -486,28 +574,22 @@ def parseOBOFile():
                 # If it is an obsolete GO or term 
                 # and not the root ID, write it to the obsolete DAG file.
                 #
-                if (vocabName == 'GO') and \
+                if obsoleteParent and \
                         status == 'obsolete' and termID != dagRootID:
                         #log.writeline('parseOBOFile:fpDAG[obsoleteNamespace]\n')
                         fpDAG[obsoleteNamespace].write(termID + '\t' + '\t' + 'is-a' + '\t' + obsoleteID + '\n')
             #
             # TR12427/Disease Ontology/subset DO_MGI_slim
             #
-            if vocabName == 'Disease Ontology' and len(subset) > 0:
+            if fpSubset:
                 for s in subset:
-                        if s == 'DO_MGI_slim':
-                                fpDOmgislim.write(termID + '\t\n')
-                        if s == 'DO_GXD_slim':
-                                fpDOgxdslim.write(termID + '\t\n')
+                        if s in fpSubset:
+                                fpSubset[s].write(termID + '\t\n')
 
 #	else:
 #	    print(term.getTermID())
 #	    print("isValid error")
 
-        # Get the next term from the parser.
-        #
-        term = parser.nextTerm()
-
     closeFiles()
     return 0
 
@@ -562,19 +644,30 @@ config = rcdlib.RcdFile (rcdFile, rcdlib.Rcd, 'NAME')
 
 # Perform initialization tasks.
 #
+# Keep the load metrics of this run (see loadMetrics.py) and profile its
+# SQL statements, if asked to (see sqlProfiler.py).
+#
+loadMetrics.start()
+sqlProfiler.start()
+
 print('initialize')
+loadMetrics.startPhase('Initialize')
 initialize()
+loadMetrics.endPhase()
 
 # Parse the OBO input file.
 #
 print('parseOBOFile()')
+loadMetrics.startPhase('Parse OBO File')
 if parseOBOFile() != 0:
     exit(1)
+loadMetrics.addRecordsRead(len(termRecords))
+loadMetrics.endPhase()
 
 # Invoke the loadVOC module to load the terms and build the DAG(s).
 #
 print('loadVOC.VOCLoad()')
-vocload = loadVOC.VOCLoad(config, mode, log)
+vocload = loadVOC.VOCLoad(config, mode, log, termRecords)
 vocload.go()
 
 db.commit()
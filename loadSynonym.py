@@ -52,6 +52,9 @@ import os
 import vocloadlib
 import mgi_utils
 import db
+import bulkWriter
+import loadMetrics
+import sqlProfiler
 
 # init database connection
 server = os.environ['DBSERVER']
@@ -62,6 +65,9 @@ fp = open(passwordFileName, 'r')
 password = str.strip(fp.readline())
 fp.close()
 vocloadlib.setupSql (server, database, username, password)
+db.useOneConnection(1)
+loadMetrics.start()
+sqlProfiler.start()
 
 
 # get vocabName, mgiTypeKey, jNumber and userKey from environment
@@ -79,6 +85,7 @@ cdate = mgi_utils.date("%m/%d/%Y")
 synonymFile = sys.argv[1]
 
 print("loading synonym file %s" % synonymFile)
+loadMetrics.startPhase('Read Synonym File')
 synonymRecords = []
 fp = open(synonymFile, 'r')
 for line in fp.readlines():
@@ -86,6 +93,10 @@ for line in fp.readlines():
         if line:
                 synonymRecords.append(line.split('\t'))
 fp.close()
+loadMetrics.addRecordsRead(len(synonymRecords))
+loadMetrics.endPhase()
+
+loadMetrics.startPhase('Load Synonyms')
 
 #
 #  Get the vocabulary key for the current vocabulary.
@@ -170,16 +181,16 @@ print('Number of synonyms to add: %d' % len(bcpRecords))
 #
 #  Add the records to the MGI_Synonym table.
 #
-fp = open(bcpFile, 'w')
+writer = bulkWriter.BulkWriter('MGI_Synonym', bcpFile)
 for r in bcpRecords:
-        fp.write('%s\n' % '|'.join([str(c) for c in r]))
-fp.close()
-
-db.bcp(bcpFile, 'MGI_Synonym', delimiter='|')
+        writer.write(*r)
+writer.close()
 db.commit()
 
 # update mgi_synonym_seq auto-sequence
 db.sql(''' select setval('mgi_synonym_seq', (select max(_Synonym_key) from MGI_Synonym)) ''', None)
 db.commit()
+db.useOneConnection(0)
+loadMetrics.endPhase()
 
 sys.exit(0)
@@ -86,14 +86,25 @@ import sys
 import types
 import getopt
 import os
+import time
 
 import Log          # MGI-written Python libraries
 import vocloadlib
 import accessionlib
-import Set
 import voc_html
 import mgi_utils
 import db
+import stagingTables
+import termIndex
+import synonymDiff
+import logicalDBResolver
+import keyAllocator
+import bulkWriter
+import fullLoadRows
+import termFingerprint
+import termCheckpoint
+import loadMetrics
+import sqlProfiler
 
 USAGE = '''Usage: %s [-f|-i][-n][-l <file>] <server> <db> <user> <pwd> <key> <input>
     -f | -i : full load or incremental load? (default is full)
@@ -107,10 +118,10 @@ USAGE = '''Usage: %s [-f|-i][-n][-l <file>] <server> <db> <user> <pwd> <key> <in
     input   : term input file
 ''' % sys.argv[0]
 
-# constant for today's date, to be used in BCP files
+# constant for today's date, to be used in bulk loaded records
 CDATE = mgi_utils.date("%m/%d/%Y")
 
-# constant for _createdby_key, to be used in BCP files
+# constant for _createdby_key, to be used in bulk loaded records
 CREATEDBY_KEY = 1001
 
 ###--- Exceptions ---###
@@ -127,7 +138,7 @@ full_only = 'simple vocabulary (%s) may only use mode "full"'
 has_refs = 'cannot do a full load on vocab %s which has cross references'
 
 ########################################################################
-###--- SQL/BCP INSERT Statements ---###
+###--- SQL INSERT Statements ---###
 ########################################################################
 
 # templates placed here for readability of the code and
@@ -136,55 +147,48 @@ has_refs = 'cannot do a full load on vocab %s which has cross references'
 INSERT_TERM = '''insert into VOC_Term (_Term_key, _Vocab_key, term, abbreviation, note, sequenceNum, isObsolete)
     values (%d, %d, '%s', '%s', '%s', %s, %d)'''
 
-BCP_INSERT_TERM = '''%%d|%%d|%%s|%%s|%%s|%%s|%%d|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-
 INSERT_NOTE = '''insert into MGI_Note (_Note_key, _Object_key, _MGIType_key, _NoteType_key)
     values (%d, %d, %s, %s)'''
 
-BCP_INSERT_NOTE = '''%%d|%%d|%%s|%%s|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-
 INSERT_NOTECHUNK = '''insert into MGI_NoteChunk (_Note_key, sequenceNum, note)
     values (%d, 1, '%s')'''
 
-BCP_INSERT_NOTECHUNK = '''%%d|1|%%s|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-
 INSERT_SYNONYM ='''insert into MGI_Synonym (_Synonym_key, _Object_key, _MGIType_key, _SynonymType_key, _Refs_key, synonym)
     values (%d, %d, %d, %d, %d, '%s')'''
 
-BCP_INSERT_SYNONYM ='''%%d|%%d|%%d|%%d|%%d|%%s|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-
 INSERT_ACCESSION = '''insert into ACC_Accession (_Accession_key, accID, prefixPart, numericPart, _LogicalDB_key, _Object_key, _MGIType_key, private, preferred)
     values (%d, '%s', '%s', %s, %d, %d, %d, %d, %d)'''
 
-BCP_INSERT_ACCESSION_NULL_NUMPART = '''%%d|%%s|%%s||%%d|%%d|%%d|%%d|%%d|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-
-BCP_INSERT_ACCESSION_NUMPART = '''%%d|%%s|%%s|%%s|%%d|%%d|%%d|%%d|%%d|%d|%d|%s|%s\n''' % \
-        (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
-
 #
 # note : using 'delete' will fire triggers; truncate will not
 #
 
 DELETE_NOTE = '''delete from MGI_Note where _Object_key = %d and _NoteType_key = %s'''
 
-DELETE_ALL_SYNONYMS ='''delete from MGI_Synonym where _Object_key = %d and _MGIType_key = %d'''
+DELETE_SYNONYM ='''delete from MGI_Synonym where _Synonym_key = %d'''
+
+UPDATE_SYNONYMTYPE = '''update MGI_Synonym 
+        set _SynonymType_key = %d, modification_date = now(), _ModifiedBy_key = 1001
+        where _Synonym_key = %d '''
 
 #
 # specific delete for Disease Ontology only
 #
-DELETE_DO_XREF = '''delete from ACC_Accession a
-USING VOC_Term t
-WHERE a.preferred = 0
+DO_XREF_WHERE = '''WHERE a.preferred = 0
 AND a._LogicalDB_key in (15, 180, 192, 193, 194, 195, 196, 197, 198, 201)
 and a._Object_key = t._Term_key
 AND t._Vocab_key = 125
 '''
 
+DELETE_DO_XREF = '''delete from ACC_Accession a
+USING VOC_Term t
+''' + DO_XREF_WHERE
+
+# the DO xrefs, which a chunked load deletes one chunk at a time
+SELECT_DO_XREF = '''select a.accID, a._Object_key
+from ACC_Accession a, VOC_Term t
+''' + DO_XREF_WHERE
+
 UPDATE_TERM = '''update VOC_Term 
         set term = '%s', modification_date = now(), _ModifiedBy_key = 1001
         where _Term_key = %d '''
@@ -200,6 +204,146 @@ UPDATE_STATUS = '''update VOC_Term
 
 MERGE_TERMS = '''select * from VOC_mergeTerms(%d, %d);'''
 
+# the terms of a vocabulary whose records (the term, its synonyms or its
+# notes) were modified in the database since a time; they are dropped
+# from the fingerprint snapshot (see termFingerprint.py)
+SELECT_TERMS_MODIFIED_SINCE = '''select t._Term_key
+    from VOC_Term t
+    where t._Vocab_key = %(vocabKey)d
+    and t.modification_date >= '%(since)s'
+    union
+    select t._Term_key
+    from VOC_Term t, MGI_Synonym s
+    where t._Vocab_key = %(vocabKey)d
+    and s._Object_key = t._Term_key
+    and s._MGIType_key = %(mgiTypeKey)d
+    and s.modification_date >= '%(since)s'
+    union
+    select t._Term_key
+    from VOC_Term t, MGI_Note n, MGI_NoteChunk c
+    where t._Vocab_key = %(vocabKey)d
+    and n._Object_key = t._Term_key
+    and n._MGIType_key = %(mgiTypeKey)d
+    and c._Note_key = n._Note_key
+    and (n.modification_date >= '%(since)s' or c.modification_date >= '%(since)s')'''
+
+#
+# the existing terms of the vocabulary, for the incremental load (see
+# termIndex.buildIndex)
+#
+
+SELECT_TERMS = '''select t._Term_key, t.term, t.note, t.isObsolete
+    from VOC_Term t
+    where t._Vocab_key = %d%s'''
+
+SELECT_TERM_COMMENTS = '''select n._Object_key, c.note
+    from VOC_Term t, MGI_Note n, MGI_NoteChunk c
+    where t._Vocab_key = %d
+    and t._Term_key = n._Object_key
+    and n._MGIType_key = %s
+    and n._NoteType_key = %s
+    and n._Note_key = c._Note_key%s
+    order by n._Object_key, n._Note_key, c.sequenceNum'''
+
+SELECT_TERM_SYNONYMS = '''select s._Object_key, s._Synonym_key, s.synonym, st.synonymType
+    from VOC_Term t, MGI_Synonym s, MGI_SynonymType st
+    where t._Vocab_key = %d
+    and t._Term_key = s._Object_key
+    and s._MGIType_key = %d
+    and s._SynonymType_key = st._SynonymType_key%s
+    order by s._Object_key, s._Synonym_key'''
+
+# restricts the queries above to some of the terms of the vocabulary
+TERM_KEY_RESTRICTION = '''
+    and t._Term_key in (%s)'''
+
+# number of term keys in each restricted query
+TERM_KEY_BATCH_SIZE = 1000
+
+# the symbols of the markers annotated to a set of terms, for the
+# discrepancy report
+SELECT_TERM_MARKER_SYMBOLS = '''select distinct a._Term_key, m.symbol
+    from VOC_Annot a, MRK_Marker m
+    where a._Term_key in (%s)
+    and a._AnnotType_key = %s
+    and a._Object_key = m._Marker_key
+    order by a._Term_key, m.symbol'''
+
+#
+# incremental loads stage their changes to existing terms (and the notes/
+# synonyms of new terms) in these temporary tables, then apply each kind
+# of change with one statement (see TermLoad.applyStagedChanges)
+#
+
+STAGING_TABLES = [
+    ('tmp_termnote', '_Term_key int not null, note text null'),
+    ('tmp_termstatus', '_Term_key int not null, isObsolete smallint not null'),
+    ('tmp_term', '_Term_key int not null, term text not null'),
+    ('tmp_deletenote', '_Term_key int not null'),
+    ('tmp_deletesynonym', '_Synonym_key int not null'),
+    ('tmp_synonymtype', '_Synonym_key int not null, _SynonymType_key int not null'),
+    ('tmp_note', '_Note_key int not null, _Object_key int not null, note text not null'),
+    ('tmp_synonym', '_Synonym_key int not null, _Object_key int not null, _SynonymType_key int not null, synonym text not null'),
+]
+
+# (staging table, statement) in the order they must be applied: all
+# deletes before the inserts that replace the deleted rows
+APPLY_STAGED_CHANGES = [
+    ('tmp_termnote', '''update VOC_Term t
+        set note = s.note, modification_date = now(), _ModifiedBy_key = 1001
+        from tmp_termnote s
+        where t._Term_key = s._Term_key'''),
+    ('tmp_termstatus', '''update VOC_Term t
+        set isObsolete = s.isObsolete, modification_date = now(), _ModifiedBy_key = 1001
+        from tmp_termstatus s
+        where t._Term_key = s._Term_key'''),
+    ('tmp_term', '''update VOC_Term t
+        set term = s.term, modification_date = now(), _ModifiedBy_key = 1001
+        from tmp_term s
+        where t._Term_key = s._Term_key'''),
+    ('tmp_deletenote', '''delete from MGI_Note n
+        using tmp_deletenote s
+        where n._Object_key = s._Term_key and n._NoteType_key = %(noteTypeKey)s'''),
+    ('tmp_deletesynonym', '''delete from MGI_Synonym n
+        using tmp_deletesynonym s
+        where n._Synonym_key = s._Synonym_key'''),
+    ('tmp_synonymtype', '''update MGI_Synonym n
+        set _SynonymType_key = s._SynonymType_key, modification_date = now(), _ModifiedBy_key = 1001
+        from tmp_synonymtype s
+        where n._Synonym_key = s._Synonym_key'''),
+    ('tmp_note', '''insert into MGI_Note (_Note_key, _Object_key, _MGIType_key, _NoteType_key)
+        select _Note_key, _Object_key, %(noteMGITypeKey)s, %(noteTypeKey)s from tmp_note'''),
+    ('tmp_note', '''insert into MGI_NoteChunk (_Note_key, sequenceNum, note)
+        select _Note_key, 1, note from tmp_note'''),
+    ('tmp_synonym', '''insert into MGI_Synonym (_Synonym_key, _Object_key, _MGIType_key, _SynonymType_key, _Refs_key, synonym)
+        select _Synonym_key, _Object_key, %(mgiTypeKey)d, _SynonymType_key, %(refsKey)d, synonym from tmp_synonym'''),
+]
+
+#
+# a full load with shadow tables (FULL_LOAD_SWAP) copies its rows into
+# these temporary tables, then swaps them into the live tables just before
+# it commits, so the live tables are not written (or locked) while the rows
+# are built.  The swap is not a rename: it deletes the vocabulary's terms
+# and DAGs and copies the shadow tables with "insert ... select", so it
+# takes time in proportion to the size of the vocabulary (see
+# TermLoad.swapShadowTables for why, and what it costs)
+#
+
+# (live table, shadow table), parent tables first
+SHADOW_TABLES = [
+    ('VOC_Term', 'shadow_voc_term'),
+    ('MGI_Note', 'shadow_mgi_note'),
+    ('MGI_NoteChunk', 'shadow_mgi_notechunk'),
+    ('MGI_Synonym', 'shadow_mgi_synonym'),
+    ('ACC_Accession', 'shadow_acc_accession'),
+]
+
+CREATE_SHADOW_TABLE = '''create temporary table %s (like %s including defaults)'''
+
+SWAP_SHADOW_TABLE = '''insert into %s select * from %s'''
+
+DROP_SHADOW_TABLE = '''drop table %s'''
+
 ########################################################################
 ########################################################################
 
@@ -219,16 +363,42 @@ MGI_LOGICALDB_KEY = 1		# compared to self.logicalDBkey
 
 ###--- Classes ---###
 
+# Purpose: tell whether full loads copy their rows into shadow tables and
+#          swap them into the live tables at the end (FULL_LOAD_SWAP);
+#          only bcp full loads which load the database can
+# Returns: 1 - true, 0 - false
+# Assumes: nothing
+# Effects: nothing
+# Throws:  nothing
+
+def isShadowSwapOn():
+    try:
+        swap = int(os.environ['FULL_LOAD_SWAP'])
+        loader = os.environ['FULL_MODE_DATA_LOADER']
+    except:
+        return 0
+
+    if swap and loader == 'bcp' and not vocloadlib.isNoLoad():
+        return 1
+    return 0
+
 class TermLoad:
     # IS: a data load of vocabulary terms into the database
     # HAS: the following attributes, encompassing both the vocabulary
     #   and the load itself:
     #   vocab_key, vocab_name, isPrivate, isSimple, mode, filename,
     #   datafile, log, max_term_key, max_synonym_key,
-    #   max_accession_key, self.id2key
+    #   max_accession_key, self.id2key, staged (changes waiting to be
+    #   applied during an incremental load), bulkWriting (records are
+    #   being sent to the bulk writers)
     # DOES: reads from an input data file of term info to load it into
     #   the MGI database
 
+    # 0 in a sub class whose postProcess() needs the new rows in the live
+    # tables; its full loads do not use shadow tables, as postProcess()
+    # runs before the swap (see go())
+    useShadowTables = 1
+
     def __init__(self,
         filename,    # str. path to input file of term info
         mode,        # str. do a 'full' or 'incremental' load?
@@ -236,12 +406,16 @@ class TermLoad:
                      # which vocabulary to load terms for
         refs_key,    # integer key for the load reference;
         log,         # Log.Log object; used for logging progress
-        passwordFile # password file for use with bcp
+        passwordFile, # password file for use with bcp
+        records = None # list of term dictionaries (keyed by the
+                     # Termfile column names) to load instead of
+                     # reading 'filename'
         ):
         # Purpose: constructor
         # Returns: nothing
-        # Assumes: 'filename' is readable
+        # Assumes: 'filename' is readable, unless 'records' is given
         # Effects: instantiates the object, reads from 'filename'
+        #   (if 'records' is not given)
         # Throws: 1. error if the 'mode' is invalid, if we try to
         #   do an incremental load on a simple vocabulary, or
         #   if try to do a full load on a vocabulary which has
@@ -255,8 +429,6 @@ class TermLoad:
 
         self.log = log
         self.passwordFile = passwordFile
-        self.primaryAccIDFileList = {}
-        self.secondaryAccIDFileList = Set.Set()
 
         # find vocab key and name (propagate vocloadlib.error if invalid)
 
@@ -271,6 +443,7 @@ class TermLoad:
         self.log.writeline('=' * 40)
         self.log.writeline('Loading %s Vocabulary Terms...' % self.vocab_name)
         self.log.writeline(vocloadlib.timestamp('Init Start:'))
+        loadMetrics.startPhase('Term Load Init')
 
         # find whether this vocab is private and/or simple,
         # and what its logical db key is
@@ -287,6 +460,33 @@ class TermLoad:
         # or performing on-line updates
         self.isBCPLoad = self.setFullModeDataLoader()
 
+        # determine if the terms added by an incremental load are
+        # copied by the bulk writers
+        self.isNewTermBCPLoad = self.setNewTermDataLoader()
+
+        # a full load may copy its rows into shadow tables and swap
+        # them into the live tables at the end; live table -> the table
+        # the bulk writers copy into
+        self.bulkTables = {}
+        if not self.isIncrementalLoad() and isShadowSwapOn() and \
+                self.useShadowTables:
+            self.bulkTables = dict(SHADOW_TABLES)
+
+        # functions called by the swap before the existing terms are
+        # deleted, in the same transaction (loadVOC deletes the DAGs)
+        self.swapCallbacks = []
+
+        # set while records are being sent to the bulk writers (for all
+        # of a bcp full load, or for the new terms of an incremental load)
+        self.bulkWriting = 0
+
+        # number of processes used to generate the rows of a bcp full
+        # load (1 = no pool)
+        try:
+            self.fullLoadWorkers = int(os.environ['FULL_LOAD_WORKERS'])
+        except:
+            self.fullLoadWorkers = 1
+
         # 01/09/2019 ; fixed but in getMax() for simple vocabularies
         # and now we can allow isSimple/incremental
         # validity checks...
@@ -300,15 +500,14 @@ class TermLoad:
         if mode == 'full' and vocloadlib.anyTermsCrossReferenced(self.vocab_key):
                 raise TermLoadError(has_refs % vocab)
 
-        # when we actually do the load, we'll look up the current
-        # maximum keys for various tables...  For now, we'll just
-        # initialize them to None
-        self.max_term_key = None    # to be filled in once at the
-        self.max_synonym_key = None # start of the load
+        # when we actually do the load, we'll reserve blocks of keys for
+        # the various tables (see reserveKeys()); these hold the last
+        # key used in each table
+        self.keyAllocator = None
+        self.max_term_key = None
+        self.max_synonym_key = None
         self.max_note_key = None
-
-        # Need to look up this number immediately and only once for BCP
-        self.max_accession_key = vocloadlib.getMax('_Accession_key', 'ACC_Accession')
+        self.max_accession_key = None
 
         # **** FOR BACKWARD COMPATIBILITY ****
         # Determine if the load should expect to find a synonym type column
@@ -332,9 +531,57 @@ class TermLoad:
 
         self.id2key = {}    # maps term IDs to term keys
 
-        # initialize and load term datafile
-        self.loadDataFile(filename)
+        # fingerprints of the terms loaded (_Term_key -> fingerprint),
+        # saved to the snapshot file when the load is committed; if
+        # there is no snapshot file, no fingerprints are kept
+        try:
+            self.fingerprintFile = os.environ['TERM_FINGERPRINT_FILE']
+        except:
+            self.fingerprintFile = None
+        self.fingerprints = {}
+
+        # the database time the load started, saved with the fingerprints;
+        # snapshotInvalid is set if the load changes terms in ways their
+        # fingerprints do not show (e.g. merges), so no snapshot is kept
+        self.fingerprintTime = None
+        self.snapshotInvalid = 0
+
+        # an incremental load may commit its changes every chunkSize
+        # input records, keeping its progress in the checkpoint file so
+        # a rerun resumes after the last chunk committed (see
+        # isChunked()); 0 means the load is one transaction
+        try:
+            self.chunkSize = int(os.environ['INCREMENTAL_CHUNK_SIZE'])
+        except:
+            self.chunkSize = 0
+        try:
+            self.checkpointFile = os.environ['INCREMENTAL_CHECKPOINT_FILE']
+        except:
+            self.checkpointFile = None
+
+        # staging tables for incremental changes; None means each change
+        # is sent to the database as soon as it is found
+        self.staged = None
+
+        # TR12427/Disease Ontology
+        # the xrefs of a DO term are loaded with the logical database
+        # named by their prefix; ACC_LogicalDB is read once for all of them
+        if self.vocab_name == 'Disease Ontology':
+            self.logicalDBResolver = logicalDBResolver.LogicalDBResolver()
+        else:
+            self.logicalDBResolver = None
+
+        # initialize and load term datafile, unless the caller has
+        # already handed us the term records (e.g. loadOBO), in which
+        # case the Termfile is not read at all
+        if records is not None:
+            self.datafile = records
+            self.log.writeline('Using %d term records from memory' % len(records))
+        else:
+            self.loadDataFile(filename)
+        loadMetrics.addRecordsRead(len(self.datafile))
 
+        loadMetrics.endPhase()
         self.log.writeline(vocloadlib.timestamp('Init Stop:'))
 
         return
@@ -370,11 +617,18 @@ class TermLoad:
         self.openDiscrepancyFiles()
 
         # unless this is reset to 0, transaction will be committed
-        # (or, in the case of bcp, bcp files will be loaded);
+        # (records copied by the bulk writers included);
         # only major discrepancies cause this variable to be reset
 
         self.commitTransaction = 1 
 
+        # find all the duplicate IDs of the input file before any changes
+        # are made (raises TermLoadError if there are any)
+        self.checkForDuplicates()
+
+        if self.fingerprintFile:
+            self.fingerprintTime = db.sql('select now() as now', 'auto')[0]['now']
+
         if self.isIncrementalLoad():
            # Incremental loads perform on-line updates
            self.goIncremental()
@@ -382,58 +636,67 @@ class TermLoad:
            # Full loads employ BCP *OR* On-line SQL
            self.goFull()
 
+        if self.logicalDBResolver is not None:
+            self.logicalDBResolver.report(self.log)
+
         self.log.writeline('=' * 40)       # end of the load
         self.closeDiscrepancyFiles()
         
-        # call any post-processing defined by sub class
+        # call any post-processing defined by sub class (with shadow
+        # tables, before the swap, so the live tables are not locked
+        # while it runs)
         self.postProcess()
 
         if not self.commitTransaction:
             db.sql('rollback')
+            self.keyAllocator.finish(0)
             self.log.writeline('Rolling Back Transaction...') 
             msg = "Loading Terms FAILED! Please check %s for errant terms which caused failure" % self.accDiscrepFileName
             self.log.writeline(msg)
             raise TermLoadError(msg)
 
-        # update mgi_synonym_seq and voc_term_seq auto-sequence
-        db.sql(''' select setval('mgi_synonym_seq', (select max(_Synonym_key) from MGI_Synonym)) ''', None)
-        db.sql(''' select setval('voc_term_seq', (select max(_Term_key) from VOC_Term)) ''', None)
+        if self.bulkTables:
+            self.swapShadowTables()
+
+        # give back the keys we reserved and did not use
+        self.keyAllocator.finish()
         db.commit()
 
+        # the next load starts from the beginning of its input
+        if self.isChunked():
+            termCheckpoint.removeCheckpoint(self.checkpointFile)
+
+        self.saveFingerprints()
+
         return
 
-    def openBCPFiles(self):
-        # Purpose: opens BCP files
+    def openBulkWriters(self):
+        # Purpose: opens the bulk writers which copy the new records
+        #          into the database
         # Returns: nothing
-        # Assumes: user executing program has write access in output directory;
-        #          this routine only runs if bcp is the method for loading
-        #          data
-        # Effects: bcp files are open for writing
-        # Throws: propagates all exceptions opening files
-
-        # these variables are used to track whether the applicable BCP
-        # file has been created
-
-        self.loadTermBCP      = 0
-        self.loadNoteBCP      = 0
-        self.loadNoteChunkBCP = 0
-        self.loadSynonymBCP   = 0
-        self.loadAccessionBCP = 0
-            
-        self.termTermBCPFileName      = os.environ['TERM_TERM_BCP_FILE']
-        self.termNoteBCPFileName      = os.environ['TERM_NOTE_BCP_FILE']
-        self.termNoteChunkBCPFileName = os.environ['TERM_NOTECHUNK_BCP_FILE']
-        self.termSynonymBCPFileName   = os.environ['TERM_SYNONYM_BCP_FILE']
-        self.accAccessionBCPFileName  = os.environ['ACCESSION_BCP_FILE']
-
-        #
-        # open files for write
-        #
-        self.termTermBCPFile      = open(self.termTermBCPFileName, 'w')
-        self.termNoteBCPFile      = open(self.termNoteBCPFileName, 'w')
-        self.termNoteChunkBCPFile = open(self.termNoteChunkBCPFileName, 'w')
-        self.termSynonymBCPFile   = open(self.termSynonymBCPFileName, 'w')
-        self.accAccessionBCPFile  = open(self.accAccessionBCPFileName, 'w')
+        # Assumes: this routine only runs if bcp is the method for loading
+        #          data; if BULK_AUDIT_FILES is set, user executing program
+        #          has write access in output directory
+        # Effects: bulk writers are open; the BCP files are open for
+        #          writing if BULK_AUDIT_FILES is set
+        # Throws: propagates all exceptions opening the writers
+
+        # parent tables are opened before the tables which refer to them,
+        # so their rows are copied first; with shadow tables, the rows
+        # are copied into those
+
+        tables = self.bulkTables
+
+        self.termWriter      = bulkWriter.BulkWriter(tables.get('VOC_Term', 'VOC_Term'),
+                                    os.environ['TERM_TERM_BCP_FILE'])
+        self.noteWriter      = bulkWriter.BulkWriter(tables.get('MGI_Note', 'MGI_Note'),
+                                    os.environ['TERM_NOTE_BCP_FILE'])
+        self.noteChunkWriter = bulkWriter.BulkWriter(tables.get('MGI_NoteChunk', 'MGI_NoteChunk'),
+                                    os.environ['TERM_NOTECHUNK_BCP_FILE'])
+        self.synonymWriter   = bulkWriter.BulkWriter(tables.get('MGI_Synonym', 'MGI_Synonym'),
+                                    os.environ['TERM_SYNONYM_BCP_FILE'])
+        self.accessionWriter = bulkWriter.BulkWriter(tables.get('ACC_Accession', 'ACC_Accession'),
+                                    os.environ['ACCESSION_BCP_FILE'])
 
         return
 
@@ -479,45 +742,18 @@ class TermLoad:
 
         return
 
-    def closeBCPFiles(self):
-        # Purpose: closes BCP files
+    def closeBulkWriters(self):
+        # Purpose: copies the remaining records and closes the bulk writers
         # Returns: nothing
-        # Assumes: BCP files are open
-        # Effects: bcp files are closed
-        # Throws:  propagates all exceptions closing files
-
-        self.termTermBCPFile.close()    
-        self.termNoteBCPFile.close()    
-        self.termNoteChunkBCPFile.close()    
-        self.termSynonymBCPFile.close() 
-        self.accAccessionBCPFile.close() 
+        # Assumes: bulk writers are open
+        # Effects: database is loaded (in the open transaction);
+        #          BCP files are closed
+        # Throws:  propagates all exceptions copying the records
 
-        return
-
-    def loadBCPFiles(self):
-        # Purpose: if the load flags are set, calls vocloadlib
-        #          which in turn loads the BCP files
-        # Returns: nothing
-        # Assumes: bcp is in the path
-        # Effects: database is loaded
-        # Throws:  propagates all bcp exceptions
-
-        if not vocloadlib.NO_LOAD:
-
-           if self.loadTermBCP:
-              db.bcp(self.termTermBCPFileName, 'VOC_Term', delimiter='|')
-                                                                   
-           if self.loadNoteBCP:
-              db.bcp(self.termNoteBCPFileName, 'MGI_Note', delimiter='|')
-                                                                   
-           if self.loadNoteChunkBCP:
-              db.bcp(self.termNoteChunkBCPFileName, 'MGI_NoteChunk', delimiter='|')
-                                                                   
-           if self.loadSynonymBCP:                                 
-              db.bcp(self.termSynonymBCPFileName, 'MGI_Synonym', delimiter='|')
-                                                                   
-           if self.loadAccessionBCP:                               
-              db.bcp(self.accAccessionBCPFileName, 'ACC_Accession', delimiter='|')
+        for writer in [self.termWriter, self.noteWriter, self.noteChunkWriter,
+                       self.synonymWriter, self.accessionWriter]:
+            rows = writer.close()
+            self.log.writeline('%s: %d rows copied' % (writer.table, rows))
 
         return
 
@@ -533,24 +769,24 @@ class TermLoad:
         # Throws: propagates all exceptions
 
         self.log.writeline(vocloadlib.timestamp('Full Term Load Start:'))
+        loadMetrics.startPhase('Full Term Load')
 
-        # open the bcp files if using bcp
+        # with shadow tables, the new rows are copied into them, and the
+        # existing terms are deleted when they are swapped in (by go())
+        if self.bulkTables:
+            self.createShadowTables()
+
+        # open the bulk writers if using bcp
         if self.isBCPLoad:
-            self.openBCPFiles()
+            self.openBulkWriters()
+            self.bulkWriting = 1
 
         # delete the existing terms, and report how many were deleted.
-        count = vocloadlib.countTerms(self.vocab_key)
-        vocloadlib.deleteVocabTerms(self.vocab_key, self.log)
-        self.log.writeline('deleted all (%d) remaining terms' % count)
-
-        # look up the maximum keys for remaining items in VOC_Term and MGI_Synonym.
-        results = db.sql(''' select nextval('voc_term_seq') as termKey ''', 'auto')
-        self.max_term_key = results[0]['termKey']
+        if not self.bulkTables:
+            self.deleteTerms()
 
-        self.max_note_key = vocloadlib.getMax('_Note_key', 'MGI_Note')
-
-        results = db.sql(''' select nextval('mgi_synonym_seq') as synKey ''', 'auto')
-        self.max_synonym_key = results[0]['synKey']
+        # reserve the keys for the new records
+        self.reserveKeys()
 
         # if this is a simple vocabulary, provide sequence numbers for the terms.  
         # if it isn't simple, the sequence number is null.
@@ -562,39 +798,242 @@ class TermLoad:
 
         # each record in the data file should be added as a new term:
 
-        for record in self.datafile:
+        if self.isBCPLoad and self.fullLoadWorkers > 1:
+            self.addTermsInParallel()
 
-            if record['accID'] != DAG_ROOT_ID:
-               # Check for duplication on the primary term
-               duplicate = self.checkForDuplication(record['accID'], record['term'], \
-                        "Primary", self.getIsObsolete(record['status']))
-               if duplicate:
-                   self.log.writeline('Duplicate Primary Term')
-                   self.commitTransaction = 0
+        else:
+            for record in self.datafile:
 
-            if self.isSimple:
-               termSeqNum = termSeqNum + 1
+                if self.isSimple:
+                   termSeqNum = termSeqNum + 1
 
-            self.addTerm(record, termSeqNum)
-            self.addSecondaryTerms(record, self.max_term_key)
+                self.addTerm(record, termSeqNum)
+                self.addSecondaryTerms(record, self.max_term_key)
 
         # if we're running as no-load, we need to pass the ID to key
         # mapping to vocloadlib in case the DAG load needs it
         if vocloadlib.isNoLoad():
             vocloadlib.setTermIDs(self.id2key)
 
-        # if commitTransaction == 1, either BCP in the data
-        # or commit the transaction; otherwise, rollback
-        # the transaction (or don't load BCP files)
-        if self.commitTransaction:
-           if self.isBCPLoad:
-              self.closeBCPFiles()
-              self.loadBCPFiles()
+        if self.fingerprintFile:
+            for record in self.datafile:
+                if record['accID'] in self.id2key:
+                    self.fingerprints[self.id2key[record['accID']]] = self.getFingerprint(record)
+
+        # copy the rest of the records; if commitTransaction == 0,
+        # go() rolls back the transaction, records copied included
+        if self.isBCPLoad:
+           self.bulkWriting = 0
+           self.closeBulkWriters()
 
+        loadMetrics.endPhase()
         self.log.writeline(vocloadlib.timestamp('Full Term Load Stop:'))
 
         return
 
+    def deleteTerms(self):
+        # Purpose: delete the existing terms of this vocabulary (and,
+        #   through the database triggers, their notes, synonyms,
+        #   accession IDs and DAG nodes)
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: deletes records from the database
+        # Throws: propagates all exceptions
+
+        count = vocloadlib.countTerms(self.vocab_key)
+        vocloadlib.deleteVocabTerms(self.vocab_key, self.log)
+        self.log.writeline('deleted all (%d) remaining terms' % count)
+
+        return
+
+    def createShadowTables(self):
+        # Purpose: create the shadow tables a full load copies its rows
+        #   into (see SHADOW_TABLES)
+        # Returns: nothing
+        # Assumes: the tables do not exist
+        # Effects: creates temporary tables
+        # Throws: propagates all exceptions
+
+        for (table, shadow) in SHADOW_TABLES:
+            vocloadlib.nl_sqlog(CREATE_SHADOW_TABLE % (shadow, table), self.log)
+
+        return
+
+    def swapShadowTables(self):
+        # Purpose: replace the existing terms of this vocabulary with
+        #   the rows copied into the shadow tables; this is the only
+        #   part of a full load with shadow tables that writes to (and
+        #   locks) the live tables, until go() commits
+        # Returns: nothing
+        # Assumes: the bulk writers are closed; postProcess() has run
+        # Effects: calls self.swapCallbacks, deletes the existing terms,
+        #   copies the shadow tables into the live tables and drops the
+        #   shadow tables, all in the load's transaction; logs how long
+        #   the swap took
+        # Throws: propagates all exceptions
+        # Notes: the swap deletes and copies rows; it cannot rename the
+        #   shadow tables into place.  VOC_Term holds the terms of every
+        #   vocabulary, and ACC_Accession, MGI_Synonym and MGI_Note the
+        #   rows of every kind of MGI object, so a table renamed into
+        #   place would need a copy of all of them.  Other tables' foreign
+        #   keys and views refer to the live tables.  Attaching partitions
+        #   would need those tables partitioned by vocabulary, which is a
+        #   change to the MGD schema, not to this load.
+        #
+        #   The cost: from the delete until go() commits, the rows of this
+        #   vocabulary are locked.  Readers are not blocked (they see the
+        #   old rows until the commit), but writers that touch those rows,
+        #   or insert rows that refer to them, wait.  That takes time in
+        #   proportion to the size of the vocabulary: on the local SQLite
+        #   database (localdb/), with 2 synonyms and 1 accession ID a
+        #   term, it was 0.17 sec for 10,000 terms, 1.0 sec for 50,000
+        #   and 3.8 sec for 200,000.  Each load logs its own time
+        #   ("Shadow Table Swap: ... sec").
+
+        self.log.writeline(vocloadlib.timestamp('Shadow Table Swap Start:'))
+        loadMetrics.startPhase('Shadow Table Swap')
+        swapStart = time.time()
+
+        for callback in self.swapCallbacks:
+            callback()
+
+        self.deleteTerms()
+
+        for (table, shadow) in SHADOW_TABLES:
+            vocloadlib.nl_sqlog(SWAP_SHADOW_TABLE % (table, shadow), self.log)
+
+        for (table, shadow) in SHADOW_TABLES:
+            vocloadlib.nl_sqlog(DROP_SHADOW_TABLE % shadow, self.log)
+
+        self.log.writeline('Shadow Table Swap: %.3f sec (the terms stay locked until the commit)' % \
+            (time.time() - swapStart))
+        loadMetrics.endPhase()
+        self.log.writeline(vocloadlib.timestamp('Shadow Table Swap Stop:'))
+
+        return
+
+    def addTermsInParallel(self):
+        # Purpose: add the terms of a bcp full load, generating their
+        #   rows with a pool of self.fullLoadWorkers processes
+        # Returns: nothing
+        # Assumes: the bulk writers are open and the keys reserved
+        # Effects: copies the same rows, with the same keys, that
+        #   addTerm() and addSecondaryTerms() would
+        # Throws: propagates all exceptions
+
+        synonymTypeKeys = {}
+
+        generator = fullLoadRows.RowGenerator(self.vocab_key,
+                self.mgitype_key,
+                os.environ['MGITYPE'],
+                os.environ['VOCAB_COMMENT_KEY'],
+                self.refs_key,
+                self.logicalDBkey,
+                self.isPrivate,
+                self.useSynonymType,
+                synonymTypeKeys,
+                self.logicalDBResolver,
+                CREATEDBY_KEY,
+                CDATE,
+                OTHER_ID_DELIMITER,
+                SYNONYM_DELIMITER,
+                SYNONYM_TYPE_DELIMITER)
+
+        # split the records into partitions, and give each partition the
+        # keys of its rows, in record order
+
+        numPartitions = self.fullLoadWorkers * fullLoadRows.PARTITIONS_PER_WORKER
+        size = max(1, (len(self.datafile) + numPartitions - 1) // numPartitions)
+        termSeqNum = 0
+        partitions = []
+
+        for start in range(0, len(self.datafile), size):
+            records = self.datafile[start:start + size]
+            isObsolete = []
+            seqNums = []
+            counts = {}
+
+            for record in records:
+                isObsolete.append(self.getIsObsolete(record['status']))
+
+                if self.isSimple:
+                    termSeqNum = termSeqNum + 1
+                    seqNums.append(termSeqNum)
+                else:
+                    seqNums.append(None)
+
+                for (synonym, synonymType) in generator.getSynonyms(record):
+                    if synonymType not in synonymTypeKeys:
+                        synonymTypeKeys[synonymType] = vocloadlib.getSynonymTypeKey(synonymType)
+
+                for (table, count) in list(generator.countKeys(record).items()):
+                    counts[table] = counts.get(table, 0) + count
+
+            keys = {}
+            for table in list(counts.keys()):
+                keys[table] = self.keyAllocator.takeKeys(table, counts[table])
+
+            for i in range(len(records)):
+                if records[i]['accID']:
+                    self.id2key[records[i]['accID']] = keys['VOC_Term'][i]
+
+            if keys['VOC_Term']:
+                self.max_term_key = keys['VOC_Term'][-1]
+
+            partitions.append((records, isObsolete, seqNums, keys))
+
+        self.log.writeline('Generating rows for %d terms in %d partitions with %d workers' % \
+                (len(self.datafile), len(partitions), self.fullLoadWorkers))
+
+        writers = {
+            'VOC_Term' : self.termWriter,
+            'MGI_Note' : self.noteWriter,
+            'MGI_NoteChunk' : self.noteChunkWriter,
+            'MGI_Synonym' : self.synonymWriter,
+            'ACC_Accession' : self.accessionWriter,
+            }
+
+        for (rows, unresolved) in fullLoadRows.generateRows(generator,
+                partitions, self.fullLoadWorkers):
+            for table in fullLoadRows.TABLES:
+                text, count = rows[table]
+                writers[table].writeFormatted(text, count)
+
+            if self.logicalDBResolver is not None:
+                self.logicalDBResolver.addUnresolved(unresolved)
+
+        return
+
+    def reserveKeys(self):
+        # Purpose: reserve blocks of keys for the records this load
+        #   may add, sized from the input file
+        # Returns: nothing
+        # Assumes: self.datafile has been loaded
+        # Effects: creates self.keyAllocator; reserves keys in the
+        #   database (see keyAllocator.KeyAllocator)
+        # Throws: propagates all exceptions
+
+        terms = len(self.datafile)
+        notes = 0
+        synonyms = 0
+        accessions = terms
+
+        for record in self.datafile:
+            if record['comment']:
+                notes = notes + 1
+            if record['synonyms']:
+                synonyms = synonyms + record['synonyms'].count(SYNONYM_DELIMITER) + 1
+            if record['otherIDs']:
+                accessions = accessions + record['otherIDs'].count(OTHER_ID_DELIMITER) + 1
+
+        self.keyAllocator = keyAllocator.KeyAllocator(self.log)
+        self.keyAllocator.reserve('VOC_Term', terms)
+        self.keyAllocator.reserve('MGI_Note', notes)
+        self.keyAllocator.reserve('MGI_Synonym', synonyms)
+        self.keyAllocator.reserve('ACC_Accession', accessions)
+
+        return
+
     def addTerm(self,
         record,     # dictionary of fieldname -> value pairs
         termSeqNum  # integer sequence number for a simple vocab's
@@ -611,22 +1050,23 @@ class TermLoad:
         #   fieldnames- term, abbreviation, status, definition,
         #   comment, synonyms, accID, otherIDs
 
-        self.max_term_key = self.max_term_key + 1
+        self.max_term_key = self.keyAllocator.nextKey('VOC_Term')
         #self.log.writeline('------ Term: %s ------' % record['term'])
 
         # add record to VOC_Term:
-        if self.isBCPLoad:
+        if self.bulkWriting:
 
-           self.loadTermBCP = 1
+           if termSeqNum == 'null':
+              termSeqNum = None
 
-           self.termTermBCPFile.write(BCP_INSERT_TERM % \
-                                       (self.max_term_key,
-                                       self.vocab_key,
-                                       record['term'],
-                                       record['abbreviation'],
-                                       record['note'],
-                                       vocloadlib.setNull(termSeqNum),
-                                       self.getIsObsolete(record['status'])))
+           self.termWriter.write(self.max_term_key,
+                                 self.vocab_key,
+                                 record['term'],
+                                 record['abbreviation'],
+                                 record['note'],
+                                 termSeqNum,
+                                 int(self.getIsObsolete(record['status'])),
+                                 CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
 
         else: # asserts self.isIncrementalLoad() or full load with on-line sql:
 
@@ -690,10 +1130,6 @@ class TermLoad:
         # add the secondary IDs, if there are any:
         if otherIDs:
             for id in str.split(otherIDs, OTHER_ID_DELIMITER):
-                # now check for duplication on secondary terms
-                duplicate = self.checkForDuplication(id, record['term'], "Secondary", 0)
-                if duplicate:
-                    self.commitTransaction = 0
                 self.addAccID(str.strip(id), associatedTermKey)
 
         return
@@ -708,27 +1144,30 @@ class TermLoad:
        if len(commentRecord) == 0:
            return
 
-       self.max_note_key = self.max_note_key + 1
+       self.max_note_key = self.keyAllocator.nextKey('MGI_Note')
        commentRecord = ''.join([i if ord(i) < 128 else ' ' for i in commentRecord])
 
-       if self.isBCPLoad:
-           self.loadNoteBCP = 1
-           self.termNoteBCPFile.write(BCP_INSERT_NOTE % (self.max_note_key, 
-               termKey, os.environ['MGITYPE'], os.environ['VOCAB_COMMENT_KEY']))
-       else:
-           vocloadlib.nl_sqlog(INSERT_NOTE % \
-                      (self.max_note_key, 
-                       termKey, 
-                       os.environ['MGITYPE'], 
-                       os.environ['VOCAB_COMMENT_KEY']), 
-                       self.log)
+       if self.bulkWriting:
+           self.noteWriter.write(self.max_note_key, termKey,
+               os.environ['MGITYPE'], os.environ['VOCAB_COMMENT_KEY'],
+               CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
+           self.noteChunkWriter.write(self.max_note_key, 1, commentRecord,
+               CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
+           return
 
-       if self.isBCPLoad:
-           self.loadNoteChunkBCP = 1
-           self.termNoteChunkBCPFile.write(BCP_INSERT_NOTECHUNK % (self.max_note_key, commentRecord))
+       if self.staged is not None:
+           self.staged.add('tmp_note', self.max_note_key, termKey,
+               "'" + commentRecord.replace('\'','\'\'') + "'")
+           return
 
-       else: # asserts self.isIncrementalLoad() or full load with on-line sql:
-           vocloadlib.nl_sqlog(INSERT_NOTECHUNK % (self.max_note_key, commentRecord.replace('\'','\'\'')), self.log)
+       # asserts full load with on-line sql:
+       vocloadlib.nl_sqlog(INSERT_NOTE % \
+                  (self.max_note_key, 
+                   termKey, 
+                   os.environ['MGITYPE'], 
+                   os.environ['VOCAB_COMMENT_KEY']), 
+                   self.log)
+       vocloadlib.nl_sqlog(INSERT_NOTECHUNK % (self.max_note_key, commentRecord.replace('\'','\'\'')), self.log)
 
        return
 
@@ -745,11 +1184,9 @@ class TermLoad:
         # Throws: propagates any exceptions raised by vocloadlib's
         #   nl_sqlog() function
 
-        self.max_accession_key = self.max_accession_key + 1
+        self.max_accession_key = self.keyAllocator.nextKey('ACC_Accession')
 
         prefixPart, numericPart = accessionlib.split_accnum(accID)
-        if numericPart == None:
-           numericPart = 'null'
 
         useLogicalDBkey = self.logicalDBkey
 
@@ -762,33 +1199,28 @@ class TermLoad:
         # that is:
         # if prefixPart = 'OMIM:xxx', then search database for ACC_LogicalDB.name = 'OMIM'
         #
-        if (self.vocab_name == 'Disease Ontology'):
-            if prefixPart.find('OMIM:PS') >= 0:
-                findLDB = 'OMIM:PS'
-            else:
-                xrefs = prefixPart.split(':')
-                findLDB = xrefs[0]
-            results = db.sql('''select _LogicalDB_key from ACC_LogicalDB where name = '%s' ''' % (findLDB), 'auto')
-            if len(results) > 0:
-                useLogicalDBkey = results[0]['_LogicalDB_key']
-
-        if self.isBCPLoad:
-
-           self.loadAccessionBCP = 1
-
-           self.accAccessionBCPFile.write(BCP_INSERT_ACCESSION_NUMPART % \
-                                          (self.max_accession_key,
-                                          accID,
-                                          prefixPart,
-                                          numericPart,
-                                          useLogicalDBkey,
-                                          associatedTermKey,
-                                          self.mgitype_key,
-                                          self.isPrivate,
-                                          preferred)) 
+        if self.logicalDBResolver is not None:
+            useLogicalDBkey = self.logicalDBResolver.getKey(prefixPart,
+                    useLogicalDBkey, not preferred)
+
+        if self.bulkWriting:
+
+           self.accessionWriter.write(self.max_accession_key,
+                                      accID,
+                                      prefixPart,
+                                      numericPart,
+                                      useLogicalDBkey,
+                                      associatedTermKey,
+                                      self.mgitype_key,
+                                      self.isPrivate,
+                                      int(preferred),
+                                      CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
 
         else: # asserts self.isIncrementalLoad() or full load with on-line sql:
 
+           if numericPart == None:
+              numericPart = 'null'
+
            vocloadlib.nl_sqlog(INSERT_ACCESSION % \
                    (self.max_accession_key, 
                    accID,
@@ -814,15 +1246,29 @@ class TermLoad:
         # Throws: propagates all exceptions
 
         self.log.writeline(vocloadlib.timestamp('Incremental Term Load Start:'))
-
-        # look up the maximum keys for remaining items in VOC_Term and MGI_Synonym.
-        results = db.sql(''' select nextval('voc_term_seq') as termKey ''', 'auto')
-        self.max_term_key = results[0]['termKey']
-
-        self.max_note_key = vocloadlib.getMax('_Note_key', 'MGI_Note')
-
-        results = db.sql(''' select nextval('mgi_synonym_seq') as synKey ''', 'auto')
-        self.max_synonym_key = results[0]['synKey']
+        loadMetrics.startPhase('Incremental Term Load')
+
+        # a chunked load resumes after the records committed by an
+        # earlier (failed) run on the same input
+        # changed terms to report if they have annotations, and the
+        # report messages for those found so far (see
+        # reportAnnotationDiscrepancies); a resumed load gets the messages
+        # of the records already committed from the checkpoint
+        self.annotationDiscrepancies = []
+        self.annotationMessages = []
+
+        recordsDone = 0
+        if self.isChunked():
+            self.inputDigest = termCheckpoint.digest(self.datafile)
+            recordsDone, self.annotationMessages = termCheckpoint.readCheckpoint(
+                self.checkpointFile, self.vocab_key, self.inputDigest)
+            if recordsDone:
+                self.log.writeline('Resuming after %d of %d records (see %s)' % \
+                    (recordsDone, len(self.datafile), self.checkpointFile))
+                self.invalidateSnapshot('the load resumed a failed run')
+
+        # reserve the keys for the new records
+        self.reserveKeys()
 
         # if this is a simple vocabulary, we provide sequence numbers
         # for the terms.  if it isn't simple, the sequence number is
@@ -837,8 +1283,15 @@ class TermLoad:
 
         #
         # DELETE_DO_XREF
+        # a chunked load deletes the xrefs of each chunk's terms in the
+        # chunk's transaction, before they are added again (see
+        # deleteDOXrefs()), so no committed term is left without them
         #
+        self.doXrefTermKeys = None
         if (self.vocab_name == 'Disease Ontology'):
+            if self.isChunked():
+                self.doXrefTermKeys = set()
+            else:
                 vocloadlib.nl_sqlog(DELETE_DO_XREF, self.log)
 
         # get the existing Accession IDs/Terms from the database
@@ -846,11 +1299,71 @@ class TermLoad:
         primaryTermIDs = vocloadlib.getTermIDs(self.vocab_key)
         secondaryTermIDs = vocloadlib.getSecondaryTermIDs(self.vocab_key)
 
+        # the DO xrefs still in the database are left out, as if they had
+        # been deleted, so the input's xrefs are added again
+        if self.doXrefTermKeys is not None:
+            for r in db.sql(SELECT_DO_XREF, 'auto'):
+                self.doXrefTermKeys.add(r['_Object_key'])
+                if r['accID'] in secondaryTermIDs and \
+                        secondaryTermIDs[r['accID']][0] == r['_Object_key']:
+                    del secondaryTermIDs[r['accID']]
+
+        # terms whose fingerprint matches the last load have not changed
+        # in the input file, so only the other terms are read from the
+        # database and compared
+        snapshot = {}
+        if self.fingerprintFile:
+            snapshotTime, snapshot = termFingerprint.readSnapshot(self.fingerprintFile, self.vocab_key)
+            if snapshot:
+                self.dropModifiedTerms(snapshot, snapshotTime)
+
+        fingerprints = []
+        existingTermCount = 0
+        changedTermKeys = []
+        for (i, record) in enumerate(self.datafile):
+            if self.fingerprintFile:
+                fingerprints.append(self.getFingerprint(record))
+            else:
+                fingerprints.append(None)
+
+            if i >= recordsDone and record['accID'] in primaryTermIDs:
+                existingTermCount = existingTermCount + 1
+                termKey = primaryTermIDs[record['accID']][0]
+                if snapshot.get(termKey) != fingerprints[-1] or fingerprints[-1] is None:
+                    changedTermKeys.append(termKey)
+
+        if snapshot:
+            self.log.writeline('%d of %d existing terms changed since the last load' % \
+                (len(changedTermKeys), existingTermCount))
+
         #get the existing terms for the database
         print("Getting Existing Vocabulary Terms...")
-        recordSet = vocloadlib.getTerms(self.vocab_key)
+        if snapshot or recordsDone:
+            existingTerms = self.getExistingTerms(changedTermKeys)
+        else:
+            existingTerms = self.getExistingTerms()
 
-        for record in self.datafile:
+        # collect the changes in staging tables and apply them in bulk
+        self.staged = stagingTables.StagingTables(STAGING_TABLES, self.log)
+
+        # new terms (and their notes, synonyms and IDs) are copied by the
+        # bulk writers, in the same transaction as the changes
+        if self.isNewTermBCPLoad:
+            self.openBulkWriters()
+
+        for (i, (record, fingerprint)) in enumerate(zip(self.datafile, fingerprints)):
+
+            if i < recordsDone:
+                self.skipCommittedRecord(record, fingerprint, primaryTermIDs, secondaryTermIDs)
+                continue
+
+            if self.isChunked() and (i == recordsDone or i % self.chunkSize == 0):
+                if i > recordsDone:
+                    self.commitChunk(i)
+                if self.doXrefTermKeys is not None:
+                    chunkEnd = (i // self.chunkSize + 1) * self.chunkSize
+                    self.deleteDOXrefs([primaryTermIDs[r['accID']][0]
+                        for r in self.datafile[i:chunkEnd] if r['accID'] in primaryTermIDs])
 
             # Cross reference input file records to database records
             # Check for duplication on the primary term - primary accIDs
@@ -858,14 +1371,6 @@ class TermLoad:
 
             self.crossReferenceFileToDB(record['accID'], primaryTermIDs, secondaryTermIDs)
 
-            if record['accID'] != DAG_ROOT_ID:
-                duplicate = self.checkForDuplication(record['accID'], record['term'], "Primary", self.getIsObsolete(record['status']))
-                if duplicate:
-                    # this is considered a serious error, so data will not
-                    # be loaded; however, processing will continue so that
-                    # we may identify ALL problems with the input file
-                    self.commitTransaction = 0
-
             # Check to see if term exists in the database
             # if term doesn't exist, add it and process
             # its secondary terms; if it does exist
@@ -876,15 +1381,24 @@ class TermLoad:
 
                [termKey, isObsolete, term, termFound] = primaryTermIDs[record['accID']]
 
-               dbRecord = recordSet.find('_Term_key', termKey)
+               if fingerprint is not None:
+                  self.fingerprints[termKey] = fingerprint
 
-               if dbRecord == []:
+               if fingerprint is not None and snapshot.get(termKey) == fingerprint:
+
+                  # unchanged since the last load
+                  self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, termKey)
+                  continue
+
+               dbRecord = existingTerms.get(termKey)
+
+               if dbRecord is None:
                   raise TermLoadError('AccID in ACC_Accession does not exist in VOC tables for _Object/_Term_Key: "%d"' % termKey)
 
                else: # Existing record found in VOC tables.  
                
                   # check if record changed
-                  recordChanged = self.processRecordChanges(record, dbRecord, termKey)
+                  recordChanged = self.processRecordChanges(record, [dbRecord], termKey)
                   self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, termKey)
 
             else: # New term
@@ -893,11 +1407,235 @@ class TermLoad:
                if self.isSimple:
                   termSeqNum = termSeqNum + 1
 
+               self.bulkWriting = self.isNewTermBCPLoad
                self.addTerm(record, termSeqNum)
                self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, self.max_term_key)
+               self.bulkWriting = 0
+
+               if fingerprint is not None:
+                  self.fingerprints[self.max_term_key] = fingerprint
+
+        if self.isNewTermBCPLoad:
+            self.closeBulkWriters()
+
+        # the xrefs of the terms not in the input file
+        if self.doXrefTermKeys:
+            self.deleteDOXrefs(list(self.doXrefTermKeys))
+
+        self.reportAnnotationDiscrepancies()
+
+        self.applyStagedChanges()
+        self.staged = None
 
         self.checkForMissingTermsInInputFile(primaryTermIDs, secondaryTermIDs)
 
+        loadMetrics.endPhase()
+        return
+
+    def getExistingTerms(self, termKeys = None):
+        # Purpose: get the terms of this vocabulary that are in the
+        #          database, with their comments and synonyms
+        # Returns: dictionary of _Term_key -> term dictionary (see
+        #          termIndex.buildIndex)
+        # Assumes: nothing
+        # Effects: queries the database; if termKeys is given, only
+        #          those terms are read, TERM_KEY_BATCH_SIZE at a time
+        # Throws:  propagates any exceptions raised by db.sql()
+
+        if termKeys is None:
+            batches = ['']
+        else:
+            termKeys = sorted(termKeys)
+            batches = []
+            for i in range(0, len(termKeys), TERM_KEY_BATCH_SIZE):
+                batches.append(TERM_KEY_RESTRICTION % \
+                    ','.join([str(k) for k in termKeys[i:i + TERM_KEY_BATCH_SIZE]]))
+
+        terms = []
+        comments = []
+        synonyms = []
+
+        for restriction in batches:
+            results = db.sql([SELECT_TERMS % (self.vocab_key, restriction),
+                    SELECT_TERM_COMMENTS % (self.vocab_key, os.environ['MGITYPE'], os.environ['VOCAB_COMMENT_KEY'], restriction),
+                    SELECT_TERM_SYNONYMS % (self.vocab_key, self.mgitype_key, restriction)], 'auto')
+            terms = terms + results[0]
+            comments = comments + results[1]
+            synonyms = synonyms + results[2]
+
+        return termIndex.buildIndex(terms, comments, synonyms)
+
+    def getFingerprint(self, record):
+        # Purpose: get the fingerprint of the fields of a term record
+        #          which processRecordChanges() compares to the database
+        # Returns: str. (see termFingerprint.fingerprint)
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws:  nothing
+
+        synonyms = str.split(record['synonyms'], SYNONYM_DELIMITER)
+        if synonyms == ['']:
+            synonyms = []
+
+        if self.useSynonymType:
+            synonymTypes = str.split(record['synonymTypes'], SYNONYM_TYPE_DELIMITER)
+            if synonymTypes == ['']:
+                synonymTypes = []
+        else:
+            synonymTypes = None
+
+        return termFingerprint.fingerprint(record['term'],
+            self.getIsObsolete(record['status']), record['note'],
+            record['comment'], synonyms, synonymTypes)
+
+    def isChunked(self):
+        # Purpose: tell whether this load commits its changes in chunks
+        # Returns: 1 - true, 0 - false
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws:  nothing
+
+        return self.isIncrementalLoad() and self.chunkSize > 0 and \
+            not vocloadlib.isNoLoad()
+
+    def commitChunk(self, recordsDone):
+        # Purpose: commit the changes for the input records processed so
+        #          far, so a failure later in the load does not lose them
+        #          and the locks they hold are released
+        # Returns: nothing
+        # Assumes: the load is chunked (see isChunked()); the first
+        #          'recordsDone' input records have been processed
+        # Effects: copies the rows of the bulk writers, applies the staged
+        #          changes, commits the transaction and saves the progress
+        #          (and the annotation discrepancies found so far) to the
+        #          checkpoint file; nothing is committed once the
+        #          load is to be rolled back (commitTransaction == 0)
+        # Throws:  propagates all exceptions
+
+        if not self.commitTransaction:
+            return
+
+        if self.isNewTermBCPLoad:
+            bulkWriter.flushAll()
+        self.applyStagedChanges()
+        self.collectAnnotationDiscrepancies()
+
+        db.commit()
+        self.keyAllocator.commit()
+
+        if self.checkpointFile:
+            termCheckpoint.writeCheckpoint(self.checkpointFile, self.vocab_key,
+                self.inputDigest, recordsDone, self.annotationMessages)
+
+        self.log.writeline(vocloadlib.timestamp('Committed %d of %d records:' % \
+            (recordsDone, len(self.datafile))))
+
+        return
+
+    def deleteDOXrefs(self, termKeys):
+        # Purpose: delete the Disease Ontology xrefs of some terms (for a
+        #          chunked load; see DELETE_DO_XREF)
+        # Returns: nothing
+        # Assumes: self.doXrefTermKeys holds the terms with xrefs not yet
+        #          deleted
+        # Effects: deletes ACC_Accession records, TERM_KEY_BATCH_SIZE
+        #          terms at a time; removes the terms from
+        #          self.doXrefTermKeys
+        # Throws:  propagates any exceptions raised by vocloadlib's nl_sqlog() function
+
+        termKeys = sorted(set(termKeys) & self.doXrefTermKeys)
+        self.doXrefTermKeys.difference_update(termKeys)
+
+        for i in range(0, len(termKeys), TERM_KEY_BATCH_SIZE):
+            vocloadlib.nl_sqlog(DELETE_DO_XREF + TERM_KEY_RESTRICTION % \
+                ','.join([str(k) for k in termKeys[i:i + TERM_KEY_BATCH_SIZE]]), self.log)
+
+        return
+
+    def skipCommittedRecord(self, record, fingerprint, primaryTermIDs, secondaryTermIDs):
+        # Purpose: account for an input record whose changes were
+        #          committed by the load this one resumes
+        # Returns: nothing
+        # Assumes: the record's term is in the database
+        # Effects: flags the record's IDs as found in the input file (see
+        #          crossReferenceFileToDB) and keeps its fingerprint
+        # Throws:  nothing
+
+        self.crossReferenceFileToDB(record['accID'], primaryTermIDs, secondaryTermIDs)
+
+        otherIDs = str.strip(record['otherIDs'])
+        if otherIDs:
+            for id in str.split(otherIDs, OTHER_ID_DELIMITER):
+                self.crossReferenceFileToDB(str.strip(id), primaryTermIDs, secondaryTermIDs)
+
+        if fingerprint is not None and record['accID'] in primaryTermIDs:
+            self.fingerprints[primaryTermIDs[record['accID']][0]] = fingerprint
+
+        return
+
+    def dropModifiedTerms(self, snapshot, snapshotTime):
+        # Purpose: drop the terms modified in the database since the load
+        #          that saved the fingerprint snapshot, so they are
+        #          compared again
+        # Returns: nothing
+        # Assumes: snapshotTime is the database time that load started
+        # Effects: queries the database; removes terms from snapshot
+        # Throws:  propagates any exceptions raised by db.sql()
+
+        values = {
+           'vocabKey' : self.vocab_key,
+           'mgiTypeKey' : self.mgitype_key,
+           'since' : snapshotTime,
+           }
+
+        dropped = 0
+        for r in db.sql(SELECT_TERMS_MODIFIED_SINCE % values, 'auto'):
+            if r['_Term_key'] in snapshot:
+                del snapshot[r['_Term_key']]
+                dropped = dropped + 1
+
+        self.log.writeline('%d terms modified in the database since %s' % \
+            (dropped, snapshotTime))
+
+        return
+
+    def invalidateSnapshot(self, reason):
+        # Purpose: note that the fingerprints of this load may not match
+        #          the database, so no snapshot is kept
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: saveFingerprints() removes the snapshot file instead
+        #          of replacing it
+        # Throws:  nothing
+
+        if self.fingerprintFile and not self.snapshotInvalid:
+            self.log.writeline('Not keeping term fingerprints: %s' % reason)
+        self.snapshotInvalid = 1
+
+        return
+
+    def saveFingerprints(self):
+        # Purpose: save the fingerprints of the terms of this load, so
+        #          the next incremental load can skip unchanged terms
+        # Returns: nothing
+        # Assumes: the load has been committed
+        # Effects: replaces the fingerprint snapshot file (or removes it,
+        #          see invalidateSnapshot()), unless there is none or this
+        #          is a no-load run
+        # Throws:  propagates any exceptions writing the file
+
+        if not self.fingerprintFile or vocloadlib.isNoLoad():
+            return
+
+        if self.snapshotInvalid:
+            termFingerprint.removeSnapshot(self.fingerprintFile)
+            return
+
+        termFingerprint.writeSnapshot(self.fingerprintFile, self.vocab_key,
+            self.fingerprintTime, self.fingerprints)
+        self.log.writeline('Saved %d term fingerprints to %s' % \
+            (len(self.fingerprints), self.fingerprintFile))
+
         return
 
     def crossReferenceFileToDB(self, accID, primaryTermIDs, secondaryTermIDs):
@@ -952,71 +1690,113 @@ class TermLoad:
 
         return
 
-    def checkForDuplication(self, accID, term, termType, isObsolete):
-        # Purpose: Check to see if id is duplicated across primary
+    def findDuplicates(self):
+        # Purpose: Find the IDs which are duplicated across primary
         #          or secondary terms within the input file (note 
         #          that some "duplication" may legitimately occur
         #          in the case of merges, but that duplication
         #          is between the database and the file, not
         #          within the file, which is what this method checks)
-        # Returns: 1 - true, duplication exists, or 0 - false, not a duplicate
+        # Returns: list of (accID, term) of the duplicates, in file order
         # Assumes: A primary terms should only appear once in the
         #          primary set and not in the secondary 
         #          set and vice versa for secondary terms
         #          UNLESS it is a secondary terms being evaluated
         #          and the primary term is obsolete
-        # Effects: writes duplicates to the discrepancy report
+        # Effects: nothing
         # Throws:  propagates any exceptions raised 
 
-        duplicate = 0
+        duplicates = []
 
         # only check if using actual accession ids (mgi ids will be blank in the Termfile)
 
-        if self.logicalDBkey != MGI_LOGICALDB_KEY and self.logicalDBkey != -1:
+        if self.logicalDBkey == MGI_LOGICALDB_KEY or self.logicalDBkey == -1:
+            return duplicates
+
+        # an incremental load of 'Disease Ontology' allows duplicate
+        # secondary ids
 
-           # the primaryAccIDFileList and secondaryAccIDFileList are simply individual
-           # lists of accIDs contained in the input file; if duplicates are found
-           # either within a list or across both lists, the record is a potential 
-           # duplicate
+        checkSecondary = not (self.isIncrementalLoad() and \
+            self.vocab_name == 'Disease Ontology')
 
-           if accID in self.primaryAccIDFileList or self.secondaryAccIDFileList.contains(accID):
+        # the accIDs of the input file seen so far: primary accID ->
+        # isObsolete, and the set of secondary accIDs; if duplicates are
+        # found either within a list or across both lists, the record is
+        # a potential duplicate
 
-              # if it is a secondary term that is also an obsolete primary term
-              # it is permissible for it to appear on the list
-              # otherwise it is a duplicate
+        primaryIDs = {}
+        secondaryIDs = set()
 
-              if termType == SECONDARY:
+        for record in self.datafile:
+            accID = record['accID']
+
+            if accID != DAG_ROOT_ID:
+                if accID in primaryIDs or accID in secondaryIDs:
+                    duplicates.append((accID, record['term']))
+                else:
+                    primaryIDs[accID] = self.getIsObsolete(record['status'])
+
+            otherIDs = str.strip(record['otherIDs'])
+            if not otherIDs or not checkSecondary:
+                continue
+
+            for id in str.split(otherIDs, OTHER_ID_DELIMITER):
+                id = str.strip(id)
 
-                 if accID in self.primaryAccIDFileList:
+                # if it is a secondary term that is also an obsolete
+                # primary term it is permissible for it to appear on the
+                # list; otherwise it is a duplicate
 
-                    isObsolete = self.primaryAccIDFileList[accID]
+                if id in primaryIDs:
+                    if primaryIDs[id] == 0:
+                        duplicates.append((id, record['term']))
+                elif id in secondaryIDs:
+                    duplicates.append((id, record['term']))
+                else:
+                    secondaryIDs.add(id)
 
-                    if isObsolete == 0:
-                       self.writeDiscrepancyFile(accID, term, PRIMARY_SECONDARY_COLLISION_MSG)
-                       duplicate = 1
+        return duplicates
 
-                 else: # accID already appears in secondary list
-                    self.writeDiscrepancyFile(accID, term, PRIMARY_SECONDARY_COLLISION_MSG)
-                    duplicate = 1
+    def checkForDuplicates(self):
+        # Purpose: Check the whole input file for duplicate IDs (see
+        #          findDuplicates()) before any changes are made to the
+        #          database, so a bad input file fails at once
+        # Returns: nothing
+        # Assumes: discrepancy file is open and writeable
+        # Effects: writes all the duplicates to the discrepancy report;
+        #          if there are any, closes the report and rolls back the
+        #          transaction
+        # Throws:  TermLoadError if there are duplicates (unless the
+        #          vocabulary is 'Disease Ontology', whose duplicates
+        #          are reported only)
 
-              else: # duplicate primary term
-                 self.writeDiscrepancyFile(accID, term, PRIMARY_SECONDARY_COLLISION_MSG)
-                 duplicate = 1
+        loadMetrics.startPhase('Duplicate ID Check')
+        duplicates = self.findDuplicates()
+        loadMetrics.endPhase()
 
-           else: # new term - add to list
-              if termType == PRIMARY:
-                 self.primaryAccIDFileList[accID] = isObsolete
-              else:
-                 self.secondaryAccIDFileList.add(accID)
+        for (accID, term) in duplicates:
+            self.writeDiscrepancyFile(accID, term, PRIMARY_SECONDARY_COLLISION_MSG)
+
+        if not duplicates:
+            return
+
+        self.log.writeline('%d duplicate primary/secondary IDs in the input file' % \
+            len(duplicates))
 
         #
         # DO: print the discrepency but do not process as a duplicate
         # at some point, perhaps just entirely skip this entire check for DO?
         #
         if (self.vocab_name == 'Disease Ontology'):
-            duplicate = 0
+            return
 
-        return duplicate
+        self.commitTransaction = 0
+        self.closeDiscrepancyFiles()
+        db.sql('rollback')
+        self.log.writeline('Rolling Back Transaction...') 
+        msg = "Loading Terms FAILED! Please check %s for errant terms which caused failure" % self.accDiscrepFileName
+        self.log.writeline(msg)
+        raise TermLoadError(msg)
 
     def writeDiscrepancyFile(self, accID, term, msg):
         # Purpose: write a record to the discrepancy file
@@ -1053,18 +1833,11 @@ class TermLoad:
                 id = str.strip(id)
                 self.crossReferenceFileToDB(id, primaryTermIDs, secondaryTermIDs)
 
-                # Check to see if secondary term is a duplicated
-                # For 'Disease Ontology', skip this step as duplicate secondary ids are allowed
-
-                duplicate = 0
-
-                if (self.vocab_name != 'Disease Ontology'):
-                    duplicate = self.checkForDuplication(id, record['term'], "Secondary", 0)
+                # secondary IDs duplicated in the input file were found
+                # by checkForDuplicates() (for 'Disease Ontology', duplicate
+                # secondary ids are allowed)
 
-                    if duplicate:
-                        self.commitTransaction = 0
-
-                if id in primaryTermIDs and not duplicate:
+                if id in primaryTermIDs:
 
                     # If the secondary term is in the primaryTermIDs 
                     # structure of existing database records, that means
@@ -1086,7 +1859,12 @@ class TermLoad:
                     # logicalDBs and both preferred ids
 
                     if oldKey != newKey:
+                        # the merge must see the changes found so far,
+                        # and the new terms copied so far
+                        bulkWriter.flushAll()
+                        self.applyStagedChanges()
                         vocloadlib.nl_sqlog((MERGE_TERMS %(oldKey, newKey)), self.log)
+                        self.invalidateSnapshot('terms were merged')
 
                 else:
 
@@ -1098,9 +1876,6 @@ class TermLoad:
                        # The secondary term doesn't exist, so add the term to the
                        # database and point it to the primary term
 
-                       if not self.isBCPLoad:
-                          self.max_accession_key = vocloadlib.getMax('_Accession_key', 'ACC_Accession')
-
                        self.addAccID(id, associatedTermKey, 0)
 
         return
@@ -1134,10 +1909,10 @@ class TermLoad:
        dbDefinition = dbRecord[0]['note']
 
        if dbDefinition == None:
-          vocloadlib.nl_sqlog(UPDATE_TERMNOTE % ('null', termKey), self.log)
+          self.updateTermNote('null', termKey)
           recordChanged = 1
        elif (str.strip(record['note']) != str.strip(dbDefinition)):
-          vocloadlib.nl_sqlog(UPDATE_TERMNOTE % ("'" + record['note'].replace("'", "''") + "'", termKey), self.log)
+          self.updateTermNote("'" + record['note'].replace("'", "''") + "'", termKey)
           recordChanged = 1
           # Now write report record if the DB record is not null or blank
           # and the term has annotations associated with it
@@ -1162,7 +1937,10 @@ class TermLoad:
           # can't do simple update because of 255 size limit; therefore, do a delete and insert
           # no longer true...this should be rewritten to use UPDATE
 
-          vocloadlib.nl_sqlog(DELETE_NOTE % (termKey, os.environ['VOCAB_COMMENT_KEY']), self.log)
+          if self.staged is not None:
+             self.staged.add('tmp_deletenote', termKey)
+          else:
+             vocloadlib.nl_sqlog(DELETE_NOTE % (termKey, os.environ['VOCAB_COMMENT_KEY']), self.log)
           self.generateCommentSQL(record['comment'], termKey)
           recordChanged = 1
 
@@ -1189,41 +1967,15 @@ class TermLoad:
            for i in range(len(fileSynonyms)):
                fileSynonymTypes.append("exact")
 
-       dbSynonyms = dbRecord[0]['synonyms']
-       dbSynonymTypes = dbRecord[0]['synonymTypes']
-
-       # make sure synonyms and synonym types are in the same order
-       for i in range(0,len(dbSynonyms)):
-           for j in range(i+1,len(dbSynonyms)):
-               if dbSynonyms[i] > dbSynonyms[j]:
-                   tmpSynonym = dbSynonyms[i]
-                   dbSynonyms[i] = dbSynonyms[j]
-                   dbSynonyms[j] = tmpSynonym
-                   tmpSynonymType = dbSynonymTypes[i]
-                   dbSynonymTypes[i] = dbSynonymTypes[j]
-                   dbSynonymTypes[j] = tmpSynonymType
-
-       for i in range(0,len(fileSynonyms)):
-           for j in range(i+1,len(fileSynonyms)):
-               if fileSynonyms[i] > fileSynonyms[j]:
-                   tmpSynonym = fileSynonyms[i]
-                   fileSynonyms[i] = fileSynonyms[j]
-                   fileSynonyms[j] = tmpSynonym
-                   tmpSynonymType = fileSynonymTypes[i]
-                   fileSynonymTypes[i] = fileSynonymTypes[j]
-                   fileSynonymTypes[j] = tmpSynonymType
-
-       if self.useSynonymType and (fileSynonymTypes != dbSynonymTypes):
-           changeSynonymTypes = 1
-       else:
-           changeSynonymTypes = 0
-
-       if (fileSynonyms != dbSynonyms or changeSynonymTypes):
-          # if there are any differences between the file and
-          # the database, simply delete all existing synonyms
-          # and reinsert them
-          vocloadlib.nl_sqlog(DELETE_ALL_SYNONYMS % (termKey, self.mgitype_key), self.log)
-          self.generateSynonymSQL(fileSynonyms, fileSynonymTypes, termKey)
+       # match the file synonyms to the database synonyms and only
+       # delete, insert or retype the synonyms that differ
+
+       diff = synonymDiff.diffSynonyms(fileSynonyms, fileSynonymTypes,
+               dbRecord[0]['synonyms'], dbRecord[0]['synonymTypes'],
+               dbRecord[0]['synonymKeys'], self.useSynonymType)
+
+       if not diff.isEmpty():
+          self.applySynonymDiff(diff, termKey)
           recordChanged = 1
 
        #
@@ -1237,7 +1989,10 @@ class TermLoad:
 
        if (fileIsObsoleteField != dbRecord[0]['isObsolete']):
 
-          vocloadlib.nl_sqlog(UPDATE_STATUS % (fileIsObsoleteField, termKey), self.log)
+          if self.staged is not None:
+             self.staged.add('tmp_termstatus', termKey, int(fileIsObsoleteField))
+          else:
+             vocloadlib.nl_sqlog(UPDATE_STATUS % (fileIsObsoleteField, termKey), self.log)
           recordChanged = 1
 
           # Now write report record if the term is obsoleted 
@@ -1247,53 +2002,204 @@ class TermLoad:
 
        elif (record['term'] != dbRecord[0]['term']):
           # double-quote any single-quote values
-          vocloadlib.nl_sqlog(UPDATE_TERM % (record['term'].replace("'", "''"), termKey), self.log)
+          if self.staged is not None:
+             self.staged.add('tmp_term', termKey, "'" + record['term'].replace("'", "''") + "'")
+          else:
+             vocloadlib.nl_sqlog(UPDATE_TERM % (record['term'].replace("'", "''"), termKey), self.log)
           recordChanged = 1
 
        #
        # Now write report discrepancy record(s) if necessary
        #
 
+       # the annotations of the term are looked up for all the changed
+       # terms at once, after the input file (or, for a chunked load, the
+       # chunk) has been processed (see collectAnnotationDiscrepancies)
+
        if (definitionDiscrepancy or commentDiscrepancy or obsoleteTermDiscrepancy):
+          self.annotationDiscrepancies.append((termKey, record, dbRecord[0],
+                definitionDiscrepancy, commentDiscrepancy, obsoleteTermDiscrepancy))
+
+       return recordChanged
+
+    def reportAnnotationDiscrepancies(self):
+       # Purpose: write the definition/comment/obsolete changes found by
+       #          processRecordChanges for terms which have annotations
+       #          to the Curator/Discrepancy Report
+       # Returns: nothing
+       # Assumes: discrepancy file is open and writeable
+       # Effects: queries the database; report output
+       # Throws:  propagates any exceptions raised 
+
+       self.collectAnnotationDiscrepancies()
+
+       for (accID, term, msg) in self.annotationMessages:
+          self.writeDiscrepancyFile(accID, term, msg)
+
+       self.annotationMessages = []
+
+       return
+
+    def collectAnnotationDiscrepancies(self):
+       # Purpose: make the report messages for the changes found by
+       #          processRecordChanges for terms which have annotations
+       # Returns: nothing
+       # Assumes: nothing
+       # Effects: queries the database; adds (accID, term, message) to
+       #          self.annotationMessages and empties
+       #          self.annotationDiscrepancies
+       # Throws:  propagates any exceptions raised 
 
-          annotations = vocloadlib.getAnyTermMarkerCrossReferences(termKey, self.ANNOT_TYPE_KEY)
+       if not self.annotationDiscrepancies:
+          return
+
+       termKeys = [d[0] for d in self.annotationDiscrepancies]
+       symbolMap = self.getTermMarkerSymbols(termKeys)
+
+       for (termKey, record, dbRecord, definitionDiscrepancy,
+             commentDiscrepancy, obsoleteTermDiscrepancy) in self.annotationDiscrepancies:
 
           # only write record if annotations exist
-          if len (annotations) >= 1:
-
-             symbols = ""
-
-             #build list of symbols
-
-             for annotation in annotations:
-                symbols = symbols + " " + annotation['symbol']
-
-             if definitionDiscrepancy:
-                msg = "Definition change for Term with annotations.\n" + \
-                    "Old Definition: %s\n" % (dbRecord[0]['note']) + \
-                    "New Definition: %s\n" % (record['note']) + \
-                    "Symbols: %s" % (symbols) 
-                self.writeDiscrepancyFile(record['accID'], record['term'], msg)  
-           
-             if commentDiscrepancy:
-                msg = "Comment change for Term with annotations.\n" + \
-                    "Old Comment: %s\n" % (dbRecord[0]['comments']) + \
-                    "New Comment: %s\n" % (record['comment']) + \
-                    "Symbols: %s" % (symbols) 
-                self.writeDiscrepancyFile(record['accID'], record['term'], msg)  
-
-             if obsoleteTermDiscrepancy:
-                msg = "Term has been obsoleted but has annotations.\n" + \
-                    "Symbols: %s" % (symbols) 
-                self.writeDiscrepancyFile(record['accID'], record['term'], msg)
+          if termKey not in symbolMap:
+             continue
 
-       return recordChanged
+          symbols = ""
+
+          #build list of symbols
+
+          for symbol in symbolMap[termKey]:
+             symbols = symbols + " " + symbol
+
+          if definitionDiscrepancy:
+             msg = "Definition change for Term with annotations.\n" + \
+                 "Old Definition: %s\n" % (dbRecord['note']) + \
+                 "New Definition: %s\n" % (record['note']) + \
+                 "Symbols: %s" % (symbols) 
+             self.annotationMessages.append((record['accID'], record['term'], msg))  
+        
+          if commentDiscrepancy:
+             msg = "Comment change for Term with annotations.\n" + \
+                 "Old Comment: %s\n" % (dbRecord['comments']) + \
+                 "New Comment: %s\n" % (record['comment']) + \
+                 "Symbols: %s" % (symbols) 
+             self.annotationMessages.append((record['accID'], record['term'], msg))  
+
+          if obsoleteTermDiscrepancy:
+             msg = "Term has been obsoleted but has annotations.\n" + \
+                 "Symbols: %s" % (symbols) 
+             self.annotationMessages.append((record['accID'], record['term'], msg))
+
+       self.annotationDiscrepancies = []
+
+       return
+
+    def getTermMarkerSymbols(self, termKeys):
+       # Purpose: get the symbols of the markers annotated to the given
+       #          terms (with annotation type self.ANNOT_TYPE_KEY)
+       # Returns: dictionary of _Term_key -> list of marker symbols; terms
+       #          without annotations are not in the dictionary
+       # Assumes: nothing
+       # Effects: queries the database, TERM_KEY_BATCH_SIZE terms at a
+       #          time, unless the vocabulary's annotations are not
+       #          reported (ANNOT_TYPE_KEY=0)
+       # Throws:  propagates any exceptions raised by db.sql()
+
+       symbolMap = {}
+
+       if not termKeys or int(self.ANNOT_TYPE_KEY) == 0:
+          return symbolMap
+
+       termKeys = sorted(set(termKeys))
+
+       for i in range(0, len(termKeys), TERM_KEY_BATCH_SIZE):
+          batch = ','.join([str(k) for k in termKeys[i:i + TERM_KEY_BATCH_SIZE]])
+          for r in db.sql(SELECT_TERM_MARKER_SYMBOLS % (batch, self.ANNOT_TYPE_KEY), 'auto'):
+             if r['_Term_key'] not in symbolMap:
+                symbolMap[r['_Term_key']] = []
+             symbolMap[r['_Term_key']].append(r['symbol'])
+
+       return symbolMap
     
+    def applySynonymDiff(self, diff, termKey):
+       # Purpose: delete, retype and insert (or stage) the synonyms in a
+       #          synonymDiff.SynonymDiff
+       # Returns: nothing
+       # Assumes: nothing
+       # Effects: deletes, updates and inserts MGI_Synonym records
+       # Throws:  propagates any exceptions raised by vocloadlib's nl_sqlog() function
+
+       for synonymKey in diff.deletes:
+          if self.staged is not None:
+             self.staged.add('tmp_deletesynonym', synonymKey)
+          else:
+             vocloadlib.nl_sqlog(DELETE_SYNONYM % synonymKey, self.log)
+
+       for (synonymKey, synonymType) in diff.typeChanges:
+          synonymTypeKey = vocloadlib.getSynonymTypeKey(synonymType)
+          if self.staged is not None:
+             self.staged.add('tmp_synonymtype', synonymKey, synonymTypeKey)
+          else:
+             vocloadlib.nl_sqlog(UPDATE_SYNONYMTYPE % (synonymTypeKey, synonymKey), self.log)
+
+       if diff.inserts:
+          self.generateSynonymSQL([i[0] for i in diff.inserts],
+                                  [i[1] for i in diff.inserts], termKey)
+
+       return
+
+    def updateTermNote(self, note, termKey):
+       # Purpose: update (or stage an update of) the note of a term
+       # Returns: nothing
+       # Assumes: note is an SQL literal ('null' or a quoted, escaped str.)
+       # Effects: updates VOC_Term.note in the database
+       # Throws:  propagates any exceptions raised by vocloadlib's nl_sqlog() function
+
+       if self.staged is not None:
+          self.staged.add('tmp_termnote', termKey, note)
+       else:
+          vocloadlib.nl_sqlog(UPDATE_TERMNOTE % (note, termKey), self.log)
+
+       return
+
+    def applyStagedChanges(self):
+       # Purpose: apply the changes collected in the staging tables, with
+       #          one set-based statement per kind of change
+       # Returns: nothing
+       # Assumes: nothing
+       # Effects: loads and drops the staging tables; updates VOC_Term and
+       #          deletes/inserts MGI_Note, MGI_NoteChunk and MGI_Synonym
+       #          records in the database
+       # Throws:  propagates any exceptions raised by vocloadlib's nl_sqlog() function
+
+       if self.staged is None or self.staged.isEmpty():
+          return
+
+       for (table, columns) in STAGING_TABLES:
+          if self.staged.count(table):
+             self.log.writeline('Staged %d rows in %s' % (self.staged.count(table), table))
+
+       values = {
+          'noteTypeKey' : os.environ['VOCAB_COMMENT_KEY'],
+          'noteMGITypeKey' : os.environ['MGITYPE'],
+          'mgiTypeKey' : self.mgitype_key,
+          'refsKey' : self.refs_key,
+          }
+
+       self.staged.load()
+
+       for (table, statement) in APPLY_STAGED_CHANGES:
+          if self.staged.count(table):
+             vocloadlib.nl_sqlog(statement % values, self.log)
+
+       self.staged.drop()
+
+       return
+
     def generateSynonymSQL(self, fileSynonyms, fileSynonymTypes, termKey):
        # Purpose: add records as needed to MGI_Synonym table
        # Returns: nothing
-       # Assumes: open database connection or bcp file
-       # Effects: inserts via online sql or bcp into the
+       # Assumes: open database connection or bulk writer
+       # Effects: inserts via online sql or bulk copy into the
        #          MGI_Synonym table
        # Throws:  propagates any exceptions raised 
 
@@ -1301,23 +2207,30 @@ class TermLoad:
 
           if fileSynonyms[i]:
 
-             self.max_synonym_key = self.max_synonym_key + 1
+             self.max_synonym_key = self.keyAllocator.nextKey('MGI_Synonym')
              synonymTypeKey = vocloadlib.getSynonymTypeKey(fileSynonymTypes[i])
 
-             if self.isBCPLoad:
-                synonym = fileSynonyms[i]
-                self.loadSynonymBCP = 1
-                self.termSynonymBCPFile.write(BCP_INSERT_SYNONYM % \
-                       (self.max_synonym_key,
+             if self.bulkWriting:
+                self.synonymWriter.write(self.max_synonym_key,
                         termKey,
                         self.mgitype_key,
                         synonymTypeKey,
                         self.refs_key,
-                        synonym))
+                        fileSynonyms[i],
+                        CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
+
+             elif self.staged is not None:
+                # the synonym is stored as the bulk writer stores it; only
+                # its quotes are doubled for the SQL literal
+                synonym = fileSynonyms[i].replace('\'','\'\'')
+                self.staged.add('tmp_synonym',
+                        self.max_synonym_key,
+                        termKey,
+                        synonymTypeKey,
+                        "'" + synonym + "'")
 
              else: # asserts self.isIncrementalLoad() or full load with on-line sql:
-                synonym = ascii(fileSynonyms[i])
-                synonym = synonym.replace('\'','\'\'')
+                synonym = fileSynonyms[i].replace('\'','\'\'')
                 vocloadlib.nl_sqlog(INSERT_SYNONYM % \
                        (self.max_synonym_key,
                         termKey,
@@ -1376,6 +2289,34 @@ class TermLoad:
 
        else:
            raise TermLoadError(unknown_data_loader % fullModeDataLoader)
+
+    def setNewTermDataLoader(self):
+       # Purpose: Determines the mode of loading the terms that an
+       #          incremental load adds (changes to existing terms always
+       #          use on-line SQL).  If the configuration variable
+       #          'NEW_TERM_DATA_LOADER' is set to 'bcp', the new terms
+       #          and their notes, synonyms and accession IDs are copied
+       #          by the bulk writers; if it is 'sql' (or not set), they
+       #          are inserted with on-line SQL
+       # Returns: 1 - bcp is mode of loading, 0 - online sql is mode of loading
+       # Assumes: mode is 'full' or 'incremental'
+       # Effects: nothing
+       # Throws:  TermLoadError if the data loader is unknown
+
+       try:
+           newTermDataLoader = os.environ['NEW_TERM_DATA_LOADER']
+       except:
+           return 0
+
+       if not self.isIncrementalLoad():
+           return 0
+
+       if newTermDataLoader == "bcp":
+           return 1
+       elif newTermDataLoader == "sql":
+           return 0
+       else:
+           raise TermLoadError(unknown_data_loader % newTermDataLoader)
        
        
     ###--- Post Process Hook ---###
@@ -1431,8 +2372,12 @@ if __name__ == '__main__':
         log.writeline('Operating in NO-LOAD mode')
 
     vocloadlib.setupSql(server, database, username, password)
+    db.useOneConnection(1)
+    loadMetrics.start()
+    sqlProfiler.start()
     load = TermLoad(input_file, mode, vocab_key, refs_key, log)
     load.go()
     if load.commitTransaction:
            db.commit()
+    db.useOneConnection(0)
     vocloadlib.unsetupSql()
@@ -5,8 +5,9 @@
 #  Purpose:
 #
 #      This script will determine the topological sort order for a
-#      vocabulary using its DAG and create an output file that contains
-#      the key for each term in the vocabulary and it sequence number.
+#      vocabulary using its DAG and copy the key for each term in the
+#      vocabulary and its sequence number into a work table, which is
+#      used to update VOC_Term.
 #
 #  Usage:
 #
@@ -40,8 +41,9 @@
 #         in the DAG_Edge table.
 #      3) Traverse the DAG and sort the nodes at each level based on the
 #         term name.
-#      4) As each node is visited for the first time, write the term key
-#         for that node and a sequence number to the bcp file.
+#      4) As each node is visited for the first time, copy the term key
+#         for that node and a sequence number into the work table.
+#      5) Update the VOC_Term sequence numbers from the work table.
 #
 #  Notes:  None
 #
@@ -62,6 +64,9 @@ import os
 import DAG
 import vocloadlib
 import db
+import bulkWriter
+import loadMetrics
+import sqlProfiler
 
 # init database connection
 server = os.environ['DBSERVER']
@@ -72,6 +77,9 @@ fp = open(passwordFileName, 'r')
 password = str.strip(fp.readline())
 fp.close()
 vocloadlib.setupSql (server, database, username, password)
+db.useOneConnection(1)
+loadMetrics.start()
+sqlProfiler.start()
 dagSortBCPFile = os.environ['VOC_DAG_SORT_BCP_FILE']
 bcpErrorFile = os.environ['BCP_ERROR_FILE']
 bcpLogFile = os.environ['BCP_LOG_FILE']
@@ -81,6 +89,9 @@ bcpLogFile = os.environ['BCP_LOG_FILE']
 vocabName = os.environ['VOCAB_NAME']
 mgiType = os.environ['MGITYPE']
 
+# work table for the term sort order
+tempTable = 'tmp_voc_dagsort'
+
 #
 #  CLASSES
 #
@@ -114,8 +125,8 @@ class Node:
 
 def initialize():
     #
-    # Purpose: Initialize variables, open the bcp file, connects to the
-    #          database and obtain keys needed by this load.
+    # Purpose: Initialize variables, create the work table and its bulk
+    #          writer and obtain keys needed by this load.
     # Returns: Nothing
     # Assumes: Nothing
     # Effects: Sets global variables
@@ -126,15 +137,16 @@ def initialize():
     global rootKey
     global sequenceNum
     global visitedNodes
-    global fpBCP
+    global sortWriter
 
     sequenceNum = 0
     visitedNodes = {}
 
-
-    #  Open the bcp file.
+    #  Create the work table and open its bulk writer.  It is a temp
+    #  table, so it goes away with the connection if the load fails.
     #
-    fpBCP = open(dagSortBCPFile,'w')
+    db.sql('''create temporary table %s (_term_key int, sequencenum int)''' % tempTable)
+    sortWriter = bulkWriter.BulkWriter(tempTable, dagSortBCPFile)
 
     vocabKey = vocloadlib.getVocabKey(vocabName)
 
@@ -231,26 +243,26 @@ def buildDAG ():
 def sortNode (node):
     #
     # Purpose: Traverses the DAG structure and applies a sort order to
-    #          each node based on the term for each node.  Creates a bcp
-    #          file for updating the terms with the sort order.
+    #          each node based on the term for each node.  Copies the
+    #          sort order into the work table.
     # Returns: Nothing
     # Assumes: Nothing
-    # Effects: Writes to the bcp file
+    # Effects: Writes to the bulk writer
     # Throws: Nothing
     #
     global dag
     global sequenceNum
-    global fpBCP
+    global sortWriter
 
     #  If the node has not been visited yet, write its term key and the
-    #  next available sequence number to the bcp file.  Otherwise, this
+    #  next available sequence number to the bulk writer.  Otherwise, this
     #  node and all of its children must have been visited already, so
     #  skip it.
     #
     nodeKey = node.getId()
     if nodeKey not in visitedNodes:
         sequenceNum = sequenceNum + 1
-        fpBCP.write('%d|%d\n' % (node.getTermKey(),sequenceNum))
+        sortWriter.write(node.getTermKey(), sequenceNum)
         visitedNodes[nodeKey] = sequenceNum
     else:
         return
@@ -281,35 +293,28 @@ def sortNode (node):
 
 def finalize():
     #
-    # Purpose: Closes the bcp file and the connection to the database.
+    # Purpose: Copies the rest of the sort order into the work table and
+    #          closes the bulk writer.
     # Returns: Nothing
     # Assumes: Nothing
-    # Effects: Nothing
-    # Throws: Nothing
+    # Effects: Copies rows into the work table
+    # Throws: propagates exceptions from the bulk writer
     #
-    global fpBCP
+    global sortWriter
 
-
-    #  Close the bcp file.
+    #  Close the bulk writer.
     #
-    fpBCP.close()
+    sortWriter.close()
 
     return
 
-def loadBCPFile(bcpFileName):
+def applySortOrder():
     """
-    Loads the BCP file into 
-    a database table and uses that to update voc_term
+    Uses the sort order in the work table
+    to update voc_term
     """
 
-    # create a table to insert the bcp file
-    tempTable = 'tmp_voc_dagsort'
-    db.sql('''create table %s (_term_key int, sequencenum int)''' % tempTable)
-
     try:
-        # import term sort data
-        db.bcp(bcpFileName, tempTable, delimiter='|')
-
         db.sql('''create index %s_idx_term_key on %s (_term_key)''' % (tempTable, tempTable))
 
         # now update voc_term using this imported data
@@ -331,22 +336,31 @@ def loadBCPFile(bcpFileName):
 #
 
 print('Perform initialization')
+loadMetrics.startPhase('Initialize')
 initialize()
+loadMetrics.endPhase()
 
 print('Build the DAG')
+loadMetrics.startPhase('Build DAG')
 buildDAG()
+loadMetrics.endPhase()
 
 node = dag.findNode(rootKey)
 #print 'Root term: %s' % node.getLabel()
 
 print('Apply topological sort order to the DAG')
+loadMetrics.startPhase('Sort DAG')
 sortNode(node)
 
 finalize()
+loadMetrics.endPhase()
 
 print('import term sequencenum into voc_term')
-loadBCPFile(dagSortBCPFile)
+loadMetrics.startPhase('Apply Sort Order')
+applySortOrder()
 
 db.commit()
+db.useOneConnection(0)
+loadMetrics.endPhase()
 
 sys.exit(0)
@@ -37,6 +37,8 @@ import os
 import vocloadlib   # MGI-written Python libraries
 import loadDAG
 import loadTerms
+import loadMetrics
+import sqlProfiler
 import db
 
 ###--- Exceptions ---###
@@ -68,21 +70,25 @@ INSERT_VOCABDAG = 'insert into VOC_VocabDAG (_Vocab_key, _DAG_key) values (%d, %
 class VOCLoad:
     # IS: a vocabulary load, including sub-loads for a set of terms and
     #   possibly a DAG structure
-    # HAS: a log, an RcdFile configuration, a file of terms, a mode (full
-    #   or incremental), and other attributes of the vocabulary
+    # HAS: a log, an RcdFile configuration, a file of terms (or the term
+    #   records themselves), a mode (full or incremental), and other
+    #   attributes of the vocabulary
     # DOES: loads a set of terms and (for complex vocabularies) a DAG
     #   structure for them
 
     def __init__ (self,
         config,     # RcdFile for info about dags
         mode,       # str. do a 'full' or 'incremental' load?
-        log     # Log.Log object; where to do logging
+        log,    # Log.Log object; where to do logging
+        termRecords = None  # list of term dictionaries to load instead
+                    # of reading the TERM_FILE (see loadTerms.TermLoad)
         ):
         # Purpose: constructor
         # Returns: nothing
         # Assumes: nothing
         # Effects: initializes vocloadlib by calling setupSql(), sends
-        #   a few queries to the database
+        #   a few queries to the database; starts the load metrics
+        #   and the SQL profiler (if the program has not)
         # Throws: error if the mode is unknown or if vocloadlib's SQL
         #   routines could not be initialized and tested
         #   successfully
@@ -92,6 +98,9 @@ class VOCLoad:
         self.log = log
         self.config = config
         self.termfile = os.environ['TERM_FILE']
+        loadMetrics.start ()
+        sqlProfiler.start ()
+        self.termRecords = termRecords
 
         if mode in [ 'full', 'incremental' ]:
             self.mode = mode
@@ -106,6 +115,8 @@ class VOCLoad:
         self.password = str.strip ( self.passwordFile.readline() )
 
         vocloadlib.setupSql (self.server, self.database, self.username, self.password)
+        # the term load's bulk writers copy on the shared connection
+        db.useOneConnection(1)
         # confirm the sql setup worked by doing simple query
         db.sql ('select count(1) from VOC_Vocab')
 
@@ -168,17 +179,19 @@ class VOCLoad:
         # Throws: propagates all exceptions
         self.log.writeline (vocloadlib.timestamp (
             'Full VOC Load Start:'))
+        loadMetrics.startPhase ('Full VOC Load')
+
+        # with shadow tables (see loadTerms.isShadowSwapOn()), the term
+        # load deletes the existing terms and DAGs when it swaps in the
+        # new terms, in the transaction it commits, so neither is locked
+        # while the new terms are built
+        shadowSwap = loadTerms.isShadowSwapOn ()
 
         # Only delete data if it currently exists in the database
         if self.vocab_key:
-            dags = db.sql ('''select _DAG_key
-                        from VOC_VocabDAG
-                        where _Vocab_key = %d
-                        ''' % self.vocab_key)
-            for dag in dags:
-                vocloadlib.nl_sqlog ( 'delete from DAG_DAG where _DAG_key = %d' % dag['_DAG_key'], self.log )
-
-            vocloadlib.deleteVocabTerms (self.vocab_key, self.log)
+            if not shadowSwap:
+                self.deleteDAGs ()
+                vocloadlib.deleteVocabTerms (self.vocab_key, self.log)
         else:
             #insert into VOC_Vocab table only if a record does not already exist
 
@@ -192,7 +205,9 @@ class VOCLoad:
 
         # load the terms
 
-        termload = loadTerms.TermLoad (self.termfile, self.mode, self.vocab_key, self.refs_key, self.log, self.passwordFileName )
+        termload = loadTerms.TermLoad (self.termfile, self.mode, self.vocab_key, self.refs_key, self.log, self.passwordFileName, self.termRecords )
+        if shadowSwap:
+            termload.swapCallbacks.append (self.deleteDAGs)
         termload.go()
 
         # load the DAGs if it is a complex vocabulary
@@ -215,13 +230,34 @@ class VOCLoad:
 
         if not self.isSimple:
             for (key, dag) in list(self.config.items()):
+                loadMetrics.startPhase ('DAG Load: %s' % dag['NAME'])
                 dagload = loadDAG.DAGLoad (dag['LOAD_FILE'], self.mode, dag['NAME'], self.log, self.passwordFileName )
                 dagload.go()
+                loadMetrics.endPhase ()
 
+        loadMetrics.endPhase ()
         self.log.writeline (vocloadlib.timestamp (
             'Full VOC Load Stop:'))
         return
 
+    def deleteDAGs (self):
+        # Purpose: delete the DAGs of the vocabulary
+        # Returns: nothing
+        # Assumes: vocloadlib.setupSql() has been called appropriatley
+        # Effects: deletes the vocabulary's DAG_DAG records (and,
+        #   through the database, their nodes, edges and closures)
+        # Throws: propagates all exceptions
+        if not self.vocab_key:
+            return
+
+        dags = db.sql ('''select _DAG_key
+                    from VOC_VocabDAG
+                    where _Vocab_key = %d
+                    ''' % self.vocab_key)
+        for dag in dags:
+            vocloadlib.nl_sqlog ( 'delete from DAG_DAG where _DAG_key = %d' % dag['_DAG_key'], self.log )
+        return
+
     def goIncremental (self):
         # Purpose: controls the processing of performing incremental
         #   loads of a vocabulary and, in the cases of complex
@@ -234,22 +270,27 @@ class VOCLoad:
 
         self.log.writeline (vocloadlib.timestamp (
             'Incremental VOC Load Start:'))
+        loadMetrics.startPhase ('Incremental VOC Load')
 
         if not self.vocab_key:
             raise error(unknown_vocab % self.vocab_name)
 
         # Now load the terms
         termload = loadTerms.TermLoad (self.termfile, self.mode,
-            self.vocab_key, self.refs_key, self.log, self.passwordFileName )
+            self.vocab_key, self.refs_key, self.log, self.passwordFileName,
+            self.termRecords )
         termload.go()
 
         # load DAGs
         if not self.isSimple:
             for (key, dag) in list(self.config.items()):
+                loadMetrics.startPhase ('DAG Load: %s' % dag['NAME'])
                 dagload = loadDAG.DAGLoad (dag['LOAD_FILE'],
                     self.mode, dag['NAME'], self.log, self.passwordFileName )
                 dagload.go()
+                loadMetrics.endPhase ()
 
+        loadMetrics.endPhase ()
         self.log.writeline (vocloadlib.timestamp (
             'Incremental VOC Load Stop:'))
 
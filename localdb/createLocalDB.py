@@ -0,0 +1,155 @@
+#
+#  createLocalDB.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Create the local (SQLite) stand-in database for a vocabulary load
+#      (see db.py): the tables of schema.sql, the reference rows of
+#      seed.sql, and the rows of the vocabulary being loaded -- its
+#      VOC_Vocab row, its reference (JNUM) and its DAGs (from the rcd
+#      file).
+#
+#  Usage:
+#
+#      createLocalDB.py [-f <db file>] [-k <vocab key>] [<RcdFile>]
+#
+#      where
+#          -f is the database file (default LOCAL_DB_FILE); an existing
+#             file is replaced
+#
+#          -k is the _Vocab_key of the vocabulary (default 1); the loads
+#             which name a vocabulary by its key (e.g. the Disease
+#             Ontology xref delete) need the MGD key
+#
+#          RcdFile is the rcd file of the vocabulary's DAGs; a simple
+#             vocabulary has none
+#
+#  Env Vars:
+#
+#      LOCAL_DB_FILE, VOCAB_NAME, JNUM, IS_SIMPLE, IS_PRIVATE and
+#      LOGICALDB_KEY (see Configuration.default and the vocabulary's
+#      config file)
+#
+#  Outputs:
+#
+#      - the database file
+#      - the time taken, written to stdout
+#
+###########################################################################
+
+import sys
+import os
+import getopt
+import sqlite3
+import time
+
+USAGE = 'Usage:  %s [-f <db file>] [-k <vocab key>] [<RcdFile>]' % sys.argv[0]
+
+# the reference rows are keyed from here
+REFS_KEY = 1
+
+# Purpose: Read a file of SQL statements.
+# Returns: str
+# Assumes: the file is in this directory
+# Effects: Reads the file
+# Throws: propagates exceptions reading the file
+#
+def readSQL (fileName):
+    fp = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), fileName), 'r')
+    text = fp.read()
+    fp.close()
+    return text
+
+# Purpose: Get the names and abbreviations of the DAGs in an rcd file.
+# Returns: List of (name, abbreviation) tuples
+# Assumes: Nothing
+# Effects: Reads the rcd file
+# Throws: propagates exceptions from rcdlib
+#
+def getDAGs (rcdFile):
+    if not rcdFile:
+        return []
+
+    import rcdlib
+    config = rcdlib.RcdFile (rcdFile, rcdlib.Rcd, 'NAME')
+    dags = []
+    for (key, dag) in config.items():
+        dags.append((dag['NAME'], dag['ABBREV']))
+    return dags
+
+# Purpose: Get an environment variable.
+# Returns: str
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getEnv (name, default):
+    try:
+        return os.environ[name]
+    except:
+        return default
+
+# Purpose: Create the database.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Replaces the database file
+# Throws: propagates sqlite3 exceptions
+#
+def createDB (dbFile, vocabKey, dags):
+    if os.path.exists(dbFile):
+        os.remove(dbFile)
+
+    conn = sqlite3.connect(dbFile)
+    conn.executescript(readSQL('schema.sql'))
+    conn.executescript(readSQL('seed.sql'))
+
+    # the vocabulary's reference, by its J number
+    jnum = getEnv('JNUM', 'J:1')
+    conn.execute('''insert into ACC_Accession (_Accession_key, accID,
+        prefixPart, numericPart, _LogicalDB_key, _Object_key, _MGIType_key)
+        values (1, ?, 'J:', ?, 1, ?, 1)''',
+        (jnum, int(jnum.split(':')[1]), REFS_KEY))
+
+    conn.execute('insert into VOC_Vocab values (?, ?, ?, ?, ?, ?)',
+        (vocabKey, REFS_KEY, int(getEnv('LOGICALDB_KEY', '1')),
+        int(getEnv('IS_SIMPLE', '0')), int(getEnv('IS_PRIVATE', '0')),
+        getEnv('VOCAB_NAME', 'Local Vocabulary')))
+
+    dagKey = 1
+    for (name, abbreviation) in dags:
+        conn.execute('insert into DAG_DAG values (?, ?, 13, ?, ?)',
+            (dagKey, REFS_KEY, name, abbreviation))
+        conn.execute('''insert into VOC_VocabDAG (_Vocab_key, _DAG_key)
+            values (?, ?)''', (vocabKey, dagKey))
+        dagKey = dagKey + 1
+
+    conn.commit()
+    conn.close()
+
+#
+#  Main
+#
+
+try:
+    options, args = getopt.getopt(sys.argv[1:], 'f:k:')
+except getopt.GetoptError:
+    print(USAGE)
+    sys.exit(1)
+
+dbFile = getEnv('LOCAL_DB_FILE', 'localdb.sqlite')
+vocabKey = 1
+for (option, value) in options:
+    if option == '-f':
+        dbFile = value
+    elif option == '-k':
+        vocabKey = int(value)
+
+if len(args) > 1:
+    print(USAGE)
+    sys.exit(1)
+
+start = time.time()
+dags = getDAGs(args and args[0] or None)
+createDB(dbFile, vocabKey, dags)
+print('created %s (%d DAGs) in %.3f sec' % (dbFile, len(dags), time.time() - start))
@@ -0,0 +1,398 @@
+#
+#  db.py
+###########################################################################
+#
+#  Purpose:
+#
+#      A stand-in for the MGI db module which runs the loads against a
+#      local SQLite database (see schema.sql and createLocalDB.py), so
+#      full and incremental loads can be run and timed without a MGD
+#      server.
+#
+#      It has the db functions the loads use (sql, bcp, commit,
+#      useOneConnection, sharedDbConnection for the bulk writers).  The
+#      set_* and logging functions do nothing.
+#
+#      SQL is run as it is written for PostgreSQL, after a few rewrites
+#      SQLite needs:
+#
+#          - "delete from X a using Y where ..." becomes a
+#            "where exists (select ...)" delete
+#          - "update X a set ... from ..." gets its "as a"
+#          - "select ... into temp X from ..." becomes
+#            "create temp table X as select ... from ..."
+#          - "create temp table X (like Y ...)" becomes
+#            "create temp table X as select * from Y where 0"
+#          - generate_series(a, b) becomes a recursive query
+#          - "::type" casts are removed
+#
+#      nextval() and setval() work on the one-row sequence tables of
+#      schema.sql.  VOC_mergeTerms() is done here: it moves the old term's
+#      annotations and accession IDs to the new term and deletes the old
+#      term.
+#
+#      Configuration.default puts this directory ahead of the MGI
+#      libraries in PYTHONPATH when DB_BACKEND is "local".
+#
+#  Env Vars:
+#
+#      LOCAL_DB_FILE  the SQLite database file
+#
+###########################################################################
+
+import os
+import re
+import sqlite3
+import datetime
+
+class LocalDBError(Exception):
+    """
+    For all local database exceptions
+    """
+
+no_db_file = 'local database %s does not exist (see createLocalDB.py)'
+bad_copy = 'cannot parse copy statement: %s'
+
+try:
+    dbFile = os.environ['LOCAL_DB_FILE']
+except:
+    dbFile = 'localdb.sqlite'
+
+# the sequences read by nextval(): name -> [last_value, is_called]
+sequences = {}
+
+# the sequences changed by the current statement
+changedSequences = set()
+
+#
+# rewrites of PostgreSQL statements for SQLite
+#
+
+DELETE_USING = re.compile(r'^\s*delete\s+from\s+(\w+)(?:\s+(?!using\b)(\w+))?\s+using\s+(.*?)\s+where\s+(.*)$',
+    re.IGNORECASE | re.DOTALL)
+
+UPDATE_ALIAS = re.compile(r'^(\s*update\s+\w+\s+)(?!set\b)(\w+\s+set\b)',
+    re.IGNORECASE)
+
+SELECT_INTO = re.compile(r'^\s*select\s+(.*?)\s+into\s+temp(?:orary)?\s+(?:table\s+)?(\w+)\s+(from\b.*)$',
+    re.IGNORECASE | re.DOTALL)
+
+CREATE_LIKE = re.compile(r'^\s*create\s+temp(?:orary)?\s+table\s+(\w+)\s*\(\s*like\s+(\w+)[^)]*\)\s*$',
+    re.IGNORECASE)
+
+GENERATE_SERIES = re.compile(r'generate_series\s*\(\s*([^,()]+?)\s*,\s*([^,()]+?)\s*\)',
+    re.IGNORECASE)
+
+CAST = re.compile(r'::\w+')
+
+MERGE_TERMS = re.compile(r'^\s*select\s+\*\s+from\s+VOC_mergeTerms\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*$',
+    re.IGNORECASE)
+
+COPY = re.compile(r'^\s*copy\s+(\w+)\s*(\(.*?\))?\s+from\s+stdin\s*$',
+    re.IGNORECASE | re.DOTALL)
+
+COPY_ESCAPE = re.compile(r'\\(.)')
+
+COPY_ESCAPES = { 't' : '\t', 'n' : '\n', 'r' : '\r', '\\' : '\\' }
+
+# Purpose: Rewrite a PostgreSQL statement for SQLite.
+# Returns: str
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def translate (cmd):
+    cmd = cmd.strip().rstrip(';')
+    cmd = CAST.sub('', cmd)
+    cmd = GENERATE_SERIES.sub(r'(with recursive _series(value) as ' + \
+        r'(select \1 union all select value + 1 from _series where value < \2) ' + \
+        r'select value from _series)', cmd)
+
+    match = DELETE_USING.match(cmd)
+    if match:
+        table, alias, using, where = match.groups()
+        if alias:
+            table = '%s as %s' % (table, alias)
+        return 'delete from %s where exists (select 1 from %s where %s)' % \
+            (table, using, where)
+
+    match = CREATE_LIKE.match(cmd)
+    if match:
+        return 'create temp table %s as select * from %s where 0' % match.groups()
+
+    match = SELECT_INTO.match(cmd)
+    if match:
+        columns, table, rest = match.groups()
+        return 'create temp table %s as select %s %s' % (table, columns, rest)
+
+    return UPDATE_ALIAS.sub(r'\1as \2', cmd)
+
+#
+# functions PostgreSQL has and SQLite does not
+#
+
+# Purpose: now()
+# Returns: str (the current time, as current_timestamp gives it)
+#
+def now ():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+# Purpose: Get a sequence, reading it from its table the first time.
+# Returns: list of [last_value, is_called]
+# Throws: sqlite3 exceptions if there is no such sequence table
+#
+def getSequence (name):
+    name = name.lower()
+    if name not in sequences:
+        row = connection.execute(
+            'select last_value, is_called from %s' % name).fetchone()
+        sequences[name] = [row[0], row[1]]
+    return sequences[name]
+
+# Purpose: nextval()
+# Returns: int
+#
+def nextval (name):
+    sequence = getSequence(name)
+    if sequence[1]:
+        sequence[0] = sequence[0] + 1
+    sequence[1] = 1
+    changedSequences.add(name.lower())
+    return sequence[0]
+
+# Purpose: setval()
+# Returns: int (value)
+#
+def setval (name, value, isCalled = 1):
+    sequence = getSequence(name)
+    sequence[0] = value
+    sequence[1] = int(bool(isCalled))
+    changedSequences.add(name.lower())
+    return value
+
+# Purpose: Save the sequences changed by a statement to their tables.
+# Returns: Nothing
+# Assumes: A transaction is open
+# Effects: Updates the sequence tables
+# Throws: propagates sqlite3 exceptions
+#
+def saveSequences ():
+    for name in changedSequences:
+        last_value, is_called = sequences[name]
+        connection.execute('update %s set last_value = ?, is_called = ?' % \
+            name, (last_value, is_called))
+    changedSequences.clear()
+
+# Purpose: Open the database.
+# Returns: sqlite3.Connection
+# Assumes: Nothing
+# Effects: Opens the database file
+# Throws: LocalDBError if the file does not exist
+#
+def connect ():
+    if not os.path.exists(dbFile):
+        raise LocalDBError(no_db_file % dbFile)
+
+    conn = sqlite3.connect(dbFile, isolation_level = None)
+    conn.create_function('now', 0, now)
+    conn.create_function('nextval', 1, nextval)
+    conn.create_function('setval', 2, setval)
+    conn.create_function('setval', 3, setval)
+    conn.execute('pragma foreign_keys = off')
+    return conn
+
+# Purpose: Begin a transaction if one is not open (as the PostgreSQL
+#          connection of the db module does).
+# Returns: Nothing
+#
+def begin ():
+    if not connection.in_transaction:
+        connection.execute('begin')
+
+# Purpose: Merge a term into another (VOC_mergeTerms).
+# Returns: list with one row
+# Assumes: A transaction is open
+# Effects: Moves the annotations and accession IDs of the old term to the
+#          new term; deletes the old term (and, by trigger, its synonyms
+#          and notes)
+# Throws: propagates sqlite3 exceptions
+#
+def mergeTerms (oldKey, newKey):
+    connection.execute('''update VOC_Annot set _Term_key = ?
+        where _Term_key = ?''', (newKey, oldKey))
+    connection.execute('''update ACC_Accession
+        set _Object_key = ?, preferred = 0, modification_date = now()
+        where _Object_key = ? and _MGIType_key = 13''', (newKey, oldKey))
+    connection.execute('delete from VOC_Term where _Term_key = ?', (oldKey,))
+    return [{'voc_mergeterms' : None}]
+
+# Purpose: Run one statement.
+# Returns: list of dictionaries (one per row) for a query, None if
+#          parser is None or the statement returns no rows
+# Assumes: Nothing
+# Effects: Runs the statement
+# Throws: propagates sqlite3 exceptions
+#
+def execute (cmd, parser):
+    word = cmd.strip().rstrip(';').lower()
+    if word == 'commit':
+        commit()
+        return None
+    if word == 'rollback':
+        rollback()
+        return None
+    if word in ('begin', 'begin transaction'):
+        begin()
+        return None
+
+    begin()
+    match = MERGE_TERMS.match(cmd.strip().rstrip(';'))
+    if match:
+        return mergeTerms(int(match.group(1)), int(match.group(2)))
+
+    cursor = connection.execute(translate(cmd))
+    if cursor.description is None:
+        results = None
+    else:
+        columns = [d[0] for d in cursor.description]
+        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    cursor.close()
+    saveSequences()
+
+    if parser is None:
+        return None
+    return results
+
+# Purpose: Run SQL (db.sql).
+# Returns: the results of one statement (see execute), or a list of the
+#          results if cmd is a list of statements
+# Assumes: Nothing
+# Effects: Runs the statements
+# Throws: propagates sqlite3 exceptions
+#
+def sql (cmd, parser = 'auto', **kwargs):
+    if isinstance(cmd, list):
+        return [execute(c, parser) for c in cmd]
+    return execute(cmd, parser)
+
+# Purpose: Commit the open transaction (db.commit).
+# Returns: Nothing
+#
+def commit ():
+    if connection.in_transaction:
+        connection.execute('commit')
+
+# Purpose: Roll back the open transaction.
+# Returns: Nothing
+# Effects: Discards the sequences read in the transaction
+#
+def rollback ():
+    if connection.in_transaction:
+        connection.execute('rollback')
+    sequences.clear()
+    changedSequences.clear()
+
+# Purpose: Insert rows (already split into values) into a table.
+# Returns: Nothing
+# Assumes: Each row has a value for each of columns (or of the table's
+#          columns, if columns is None)
+# Effects: Inserts the rows
+# Throws: propagates sqlite3 exceptions
+#
+def insertRows (table, columns, rows):
+    rows = list(rows)
+    if not rows:
+        return
+
+    begin()
+    placeholders = ','.join(['?'] * len(rows[0]))
+    if columns:
+        connection.executemany('insert into %s %s values (%s)' % \
+            (table, columns, placeholders), rows)
+    else:
+        connection.executemany('insert into %s values (%s)' % \
+            (table, placeholders), rows)
+
+# Purpose: Load a bcp file into a table (db.bcp).
+# Returns: Nothing
+# Assumes: Empty fields are null
+# Effects: Inserts the rows of the file
+# Throws: propagates sqlite3 exceptions and exceptions reading the file
+#
+def bcp (inputFileName, table, delimiter = '\t', **kwargs):
+    fp = open(inputFileName, 'r')
+    rows = []
+    for line in fp:
+        rows.append([v if v != '' else None
+            for v in line.rstrip('\n').split(delimiter)])
+    fp.close()
+
+    insertRows(table, None, rows)
+
+# Purpose: Parse a value of the COPY text format.
+# Returns: str, or None for \N
+#
+def unescape (value):
+    if value == '\\N':
+        return None
+    if '\\' not in value:
+        return value
+    return COPY_ESCAPE.sub(lambda m: COPY_ESCAPES.get(m.group(1), m.group(1)),
+        value)
+
+# CLASS: LocalCursor
+# IS: A cursor of the local database, for the bulk writers.
+# HAS: Nothing
+# DOES: Copies rows in the COPY text format into a table.
+#
+class LocalCursor:
+
+    # Purpose: Copy rows into a table ("copy TABLE [(columns)] from stdin").
+    # Returns: Nothing
+    # Assumes: fp has rows in the COPY text format
+    # Effects: Inserts the rows
+    # Throws: LocalDBError if the statement cannot be parsed; propagates
+    #         sqlite3 exceptions
+    #
+    def copy_expert (self, cmd, fp):
+        match = COPY.match(cmd)
+        if not match:
+            raise LocalDBError(bad_copy % cmd)
+
+        table, columns = match.groups()
+        rows = [[unescape(v) for v in line.rstrip('\n').split('\t')]
+            for line in fp if line != '\n']
+        insertRows(table, columns, rows)
+
+    def close (self):
+        return
+
+# CLASS: LocalConnection
+# IS: The connection of the local database, as the bulk writers see it.
+# HAS: Nothing
+# DOES: Gives cursors.
+#
+class LocalConnection:
+
+    def cursor (self):
+        return LocalCursor()
+
+# Purpose: db.useOneConnection(); there is only one connection.
+# Returns: Nothing
+#
+def useOneConnection (onOff = 0):
+    return
+
+# Purpose: The set_* and logging functions of the db module, which do
+#          nothing here.
+# Returns: function which does nothing
+# Throws: AttributeError for other names
+#
+def __getattr__ (name):
+    if name.startswith('set') or name.startswith('sqlLog'):
+        return lambda *args, **kwargs: None
+    raise AttributeError(name)
+
+connection = connect()
+
+sharedDbConnection = LocalConnection()
@@ -0,0 +1,255 @@
+--
+--  schema.sql
+--
+--  Purpose:
+--
+--      The MGI tables the vocabulary loads read and write, for the local
+--      (SQLite) stand-in database (see db.py).  Columns are in the order
+--      of the MGD tables, so bulk rows copy into them unchanged.  Only
+--      the columns the loads use are kept for the tables they only read.
+--
+--      Sequences are one-row tables (last_value, is_called), as a
+--      PostgreSQL sequence reads.
+--
+--      The triggers stand in for the MGD delete triggers which remove
+--      the accession IDs, synonyms and notes of deleted terms.
+--
+
+create table ACC_MGIType (
+    _MGIType_key int primary key,
+    name text not null
+);
+
+create table ACC_LogicalDB (
+    _LogicalDB_key int primary key,
+    name text not null,
+    description text null
+);
+
+create table ACC_Accession (
+    _Accession_key int primary key,
+    accID text not null,
+    prefixPart text null,
+    numericPart int null,
+    _LogicalDB_key int not null,
+    _Object_key int not null,
+    _MGIType_key int not null,
+    private smallint not null default 0,
+    preferred smallint not null default 1,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index ACC_Accession_idx_accID on ACC_Accession (accID);
+create index ACC_Accession_idx_Object_key on ACC_Accession (_Object_key, _MGIType_key);
+
+create table VOC_Vocab (
+    _Vocab_key int primary key,
+    _Refs_key int not null,
+    _LogicalDB_key int not null,
+    isSimple smallint not null default 0,
+    isPrivate smallint not null default 0,
+    name text not null
+);
+
+create table VOC_Term (
+    _Term_key int primary key,
+    _Vocab_key int not null,
+    term text null,
+    abbreviation text null,
+    note text null,
+    sequenceNum int null,
+    isObsolete smallint not null default 0,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index VOC_Term_idx_Vocab_key on VOC_Term (_Vocab_key);
+
+create table VOC_Term_EMAPA (
+    _Term_key int primary key,
+    _DefaultParent_key int null,
+    startStage int not null,
+    endStage int not null,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create table VOC_Term_EMAPS (
+    _Term_key int primary key,
+    _Stage_key int not null,
+    _DefaultParent_key int null,
+    _EMAPA_Term_key int not null,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create table VOC_AnnotType (
+    _AnnotType_key int primary key,
+    _MGIType_key int not null,
+    _Vocab_key int not null,
+    name text not null
+);
+
+create table VOC_Annot (
+    _Annot_key int primary key,
+    _AnnotType_key int not null,
+    _Object_key int not null,
+    _Term_key int not null,
+    _Qualifier_key int null,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index VOC_Annot_idx_Term_key on VOC_Annot (_Term_key);
+
+create table VOC_VocabDAG (
+    _Vocab_key int not null,
+    _DAG_key int not null,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create table MGI_NoteType (
+    _NoteType_key int primary key,
+    _MGIType_key int not null,
+    noteType text not null,
+    private smallint not null default 0
+);
+
+create table MGI_Note (
+    _Note_key int primary key,
+    _Object_key int not null,
+    _MGIType_key int not null,
+    _NoteType_key int not null,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index MGI_Note_idx_Object_key on MGI_Note (_Object_key);
+
+create table MGI_NoteChunk (
+    _Note_key int not null,
+    sequenceNum int not null,
+    note text not null,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index MGI_NoteChunk_idx_Note_key on MGI_NoteChunk (_Note_key);
+
+create table MGI_SynonymType (
+    _SynonymType_key int primary key,
+    _MGIType_key int not null,
+    _Organism_key int null,
+    synonymType text not null,
+    allowOnlyOne smallint not null default 0
+);
+
+create table MGI_Synonym (
+    _Synonym_key int primary key,
+    _Object_key int not null,
+    _MGIType_key int not null,
+    _SynonymType_key int not null,
+    _Refs_key int null,
+    synonym text not null,
+    _CreatedBy_key int not null default 1001,
+    _ModifiedBy_key int not null default 1001,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index MGI_Synonym_idx_Object_key on MGI_Synonym (_Object_key);
+
+create table MRK_Marker (
+    _Marker_key int primary key,
+    symbol text not null
+);
+
+create table DAG_DAG (
+    _DAG_key int primary key,
+    _Refs_key int not null,
+    _MGIType_key int not null,
+    name text not null,
+    abbreviation text null
+);
+
+create table DAG_Label (
+    _Label_key int primary key,
+    label text not null
+);
+
+create table DAG_Node (
+    _Node_key int primary key,
+    _DAG_key int not null,
+    _Object_key int not null,
+    _Label_key int not null,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create index DAG_Node_idx_Object_key on DAG_Node (_Object_key);
+
+create table DAG_Edge (
+    _Edge_key int primary key,
+    _DAG_key int not null,
+    _Parent_key int not null,
+    _Child_key int not null,
+    _Label_key int not null,
+    sequenceNum int not null,
+    creation_date text not null default current_timestamp,
+    modification_date text not null default current_timestamp
+);
+
+create table DAG_Closure (
+    _DAG_key int not null,
+    _MGIType_key int not null,
+    _Ancestor_key int not null,
+    _Descendent_key int not null,
+    _AncestorObject_key int not null,
+    _DescendentObject_key int not null,
+    _AncestorLabel_key int not null,
+    _DescendentLabel_key int not null
+);
+
+create table voc_term_seq (last_value int not null, is_called smallint not null);
+create table mgi_synonym_seq (last_value int not null, is_called smallint not null);
+create table voc_annot_seq (last_value int not null, is_called smallint not null);
+create table mgi_note_seq (last_value int not null, is_called smallint not null);
+create table acc_accession_seq (last_value int not null, is_called smallint not null);
+
+insert into voc_term_seq values (1, 0);
+insert into mgi_synonym_seq values (1, 0);
+insert into voc_annot_seq values (1, 0);
+insert into mgi_note_seq values (1, 0);
+insert into acc_accession_seq values (1, 0);
+
+create trigger VOC_Term_delete after delete on VOC_Term
+begin
+    delete from ACC_Accession where _Object_key = old._Term_key and _MGIType_key = 13;
+    delete from MGI_Synonym where _Object_key = old._Term_key and _MGIType_key = 13;
+    delete from MGI_Note where _Object_key = old._Term_key and _MGIType_key = 13;
+    delete from DAG_Node where _Object_key = old._Term_key;
+end;
+
+create trigger MGI_Note_delete after delete on MGI_Note
+begin
+    delete from MGI_NoteChunk where _Note_key = old._Note_key;
+end;
+
+create trigger DAG_Node_delete after delete on DAG_Node
+begin
+    delete from DAG_Edge where _Parent_key = old._Node_key or _Child_key = old._Node_key;
+end;
@@ -0,0 +1,61 @@
+--
+--  seed.sql
+--
+--  Purpose:
+--
+--      The reference rows (MGI types, logical databases, synonym, note
+--      and annotation types) the vocabulary loads look up, for the local
+--      stand-in database.  The keys are the ones the load configurations
+--      use; the logical database names are the ones LogicalDBResolver
+--      looks up for Disease Ontology xrefs.
+--
+--      createLocalDB.py adds the rows of the vocabulary being loaded
+--      (VOC_Vocab, its reference and its DAGs).
+--
+
+insert into ACC_MGIType values (1, 'Reference');
+insert into ACC_MGIType values (2, 'Marker');
+insert into ACC_MGIType values (12, 'Genotype');
+insert into ACC_MGIType values (13, 'Vocabulary Term');
+
+insert into ACC_LogicalDB values (1, 'MGI', 'Mouse Genome Informatics');
+insert into ACC_LogicalDB values (15, 'OMIM', 'Online Mendelian Inheritance in Man');
+insert into ACC_LogicalDB values (28, 'InterPro', 'InterPro');
+insert into ACC_LogicalDB values (31, 'GO', 'Gene Ontology');
+insert into ACC_LogicalDB values (34, 'Mammalian Phenotype', 'Mammalian Phenotype');
+insert into ACC_LogicalDB values (42, 'Adult Mouse Anatomy', 'Adult Mouse Anatomy');
+insert into ACC_LogicalDB values (145, 'Sequence Ontology', 'Sequence Ontology');
+insert into ACC_LogicalDB values (146, 'Marker Category', 'Marker Category');
+insert into ACC_LogicalDB values (169, 'EMAPA', 'Mouse Developmental Anatomy');
+insert into ACC_LogicalDB values (170, 'EMAPS', 'Mouse Developmental Anatomy by Stage');
+insert into ACC_LogicalDB values (171, 'Feature Relationship', 'Feature Relationship');
+insert into ACC_LogicalDB values (173, 'Cell Ontology', 'Cell Ontology');
+insert into ACC_LogicalDB values (180, 'ORDO', 'Orphanet Rare Disease Ontology');
+insert into ACC_LogicalDB values (191, 'Disease Ontology', 'Disease Ontology');
+insert into ACC_LogicalDB values (192, 'MESH', 'Medical Subject Headings');
+insert into ACC_LogicalDB values (193, 'NCI', 'NCI Thesaurus');
+insert into ACC_LogicalDB values (194, 'ICD10CM', 'ICD-10-CM');
+insert into ACC_LogicalDB values (195, 'UMLS_CUI', 'UMLS');
+insert into ACC_LogicalDB values (196, 'EFO', 'Experimental Factor Ontology');
+insert into ACC_LogicalDB values (197, 'GARD', 'Genetic and Rare Diseases');
+insert into ACC_LogicalDB values (198, 'KEGG', 'KEGG');
+insert into ACC_LogicalDB values (201, 'OMIM:PS', 'OMIM Phenotypic Series');
+
+insert into MGI_SynonymType values (1017, 13, null, 'exact', 0);
+insert into MGI_SynonymType values (1018, 13, null, 'broad', 0);
+insert into MGI_SynonymType values (1019, 13, null, 'narrow', 0);
+insert into MGI_SynonymType values (1020, 13, null, 'related', 0);
+
+insert into MGI_NoteType values (1000, 13, 'Comment', 0);
+insert into MGI_NoteType values (1001, 13, 'Private Vocab Comment', 1);
+
+insert into VOC_AnnotType values (1000, 2, 0, 'GO/Marker');
+insert into VOC_AnnotType values (1003, 2, 0, 'InterPro/Marker');
+
+insert into DAG_Label values (1, 'Not Specified');
+insert into DAG_Label values (2, 'is-a');
+insert into DAG_Label values (3, 'part-of');
+insert into DAG_Label values (4, 'regulates');
+insert into DAG_Label values (5, 'negatively_regulates');
+insert into DAG_Label values (6, 'positively_regulates');
+insert into DAG_Label values (7, 'develops_from');
@@ -0,0 +1,99 @@
+#
+#  logicalDBResolver.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Map accession ID prefixes to ACC_LogicalDB keys, for loads (Disease
+#      Ontology) whose secondary IDs come from several logical databases.
+#      ACC_LogicalDB is read once; each lookup is then a dictionary lookup.
+#
+#      The logical database of an ID is named by its prefix up to the
+#      first ":" (e.g. 'OMIM:100100' -> 'OMIM'), except that OMIM
+#      phenotypic series IDs ('OMIM:PS...') belong to 'OMIM:PS'.
+#
+#      Prefixes that do not name a logical database are counted, so the
+#      load can report them.
+#
+###########################################################################
+
+import db
+
+SELECT_LOGICALDB = 'select _LogicalDB_key, name from ACC_LogicalDB'
+
+# CLASS: LogicalDBResolver
+# IS: A map of logical database name -> _LogicalDB_key.
+# HAS: The map and a count of the prefixes that were not found in it.
+# DOES: Finds the logical database of an accession ID prefix.
+#
+class LogicalDBResolver:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: The database connection has been set up
+    # Effects: Queries ACC_LogicalDB
+    # Throws: propagates exceptions from db.sql()
+    #
+    def __init__ (self):
+        self.keys = {}
+        for r in db.sql(SELECT_LOGICALDB, 'auto'):
+            self.keys[r['name']] = r['_LogicalDB_key']
+
+        # prefix -> number of IDs it was not found for
+        self.unresolved = {}
+
+
+    # Purpose: Find the logical database of an accession ID prefix.
+    # Returns: _LogicalDB_key, or default if the prefix does not name a
+    #          logical database
+    # Assumes: Nothing
+    # Effects: Counts the prefixes that are not found, if countUnresolved
+    #          is set (the primary IDs of a vocabulary are expected to use
+    #          the default)
+    # Throws: Nothing
+    #
+    def getKey (self, prefixPart, default, countUnresolved = 1):
+        if prefixPart.find('OMIM:PS') >= 0:
+            name = 'OMIM:PS'
+        else:
+            name = prefixPart.split(':')[0]
+
+        key = self.keys.get(name)
+        if key is None:
+            if countUnresolved:
+                self.unresolved[name] = self.unresolved.get(name, 0) + 1
+            return default
+
+        return key
+
+
+    # Purpose: Add the prefixes that another copy of the resolver (e.g. in
+    #          a worker process) did not find.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Adds to the counts of the prefixes that were not found
+    # Throws: Nothing
+    #
+    def addUnresolved (self, unresolved):
+        for name in list(unresolved.keys()):
+            self.unresolved[name] = self.unresolved.get(name, 0) + unresolved[name]
+
+
+    # Purpose: Write the prefixes that were not found to a log.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Writes to the log
+    # Throws: Nothing
+    #
+    def report (self, log):
+        if not self.unresolved:
+            return
+
+        total = 0
+        for name in sorted(self.unresolved.keys()):
+            log.writeline('Unresolved LogicalDB prefix: %s (%d IDs)' % \
+                (name, self.unresolved[name]))
+            total = total + self.unresolved[name]
+
+        log.writeline('%d IDs with %d unresolved LogicalDB prefixes were loaded with the vocabulary LogicalDB' % \
+            (total, len(self.unresolved)))
@@ -0,0 +1,316 @@
+#
+#  sqlProfiler.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Profile the SQL statements of a load (opt-in, SQL_PROFILE=1).
+#
+#      start() hooks db.sql() (see dbHooks.py), which times each call;
+#      the statements of vocloadlib.nl_sqlog() are run, and timed, by
+#      db.sql().  Statements are grouped by their normalized text -- quoted strings
+#      and numbers are replaced by "?" and "in (...)" lists are collapsed
+#      -- and the groups are named by the statement templates of the
+#      vocload modules (INSERT_TERM, UPDATE_TERMNOTE, MERGE_TERMS,
+#      SELECT_LOGICALDB, ...) that produce them.  For each group we keep
+#      the count, the total and maximum time and the rows returned.
+#
+#      Calls that take longer than SQL_SLOW_THRESHOLD seconds are written
+#      to the slow log as they happen; a summary table of the groups,
+#      slowest total first, is printed when the program exits.
+#
+#  Env Vars:
+#
+#      SQL_PROFILE         1 to profile the SQL statements (default 0)
+#      SQL_SLOW_THRESHOLD  seconds after which a call is slow (default 1)
+#      SQL_SLOW_LOG        the slow log ("" = no slow log)
+#
+###########################################################################
+
+import sys
+import os
+import re
+import time
+import atexit
+
+import dbHooks
+
+# number of groups in the summary table
+SUMMARY_SIZE = 40
+
+# longest statement written to the slow log, in characters
+SLOW_STATEMENT_SIZE = 2000
+
+QUOTED = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+IN_LIST = re.compile(r'\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+SPACE = re.compile(r'\s+')
+
+# a template placeholder: %s, %d, %(name)s, %(name)d
+PLACEHOLDER = re.compile(r"'?%(?:\(\w+\))?[sd]'?")
+
+# stands for a %s which is not quoted (any text) while a template is
+# normalized
+ANY_TEXT = '\x00'
+
+# normalized statement -> [count, total seconds, max seconds, rows]
+profile = {}
+
+# normalized statement -> template name (or None), once looked up
+templateNames = {}
+
+# the template patterns of the vocload modules: [(name, pattern), ...]
+templates = None
+
+# slow log file, once opened
+fpSlow = None
+
+# the profiler has been started
+started = 0
+
+# Purpose: Returns true if SQL_PROFILE is set.
+# Returns: 1 if SQL statements should be profiled, 0 if not
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def isProfileOn ():
+    try:
+        return int(os.environ['SQL_PROFILE'])
+    except:
+        return 0
+
+# Purpose: Get the time after which a call is slow.
+# Returns: float (seconds)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getSlowThreshold ():
+    try:
+        return float(os.environ['SQL_SLOW_THRESHOLD'])
+    except:
+        return 1.0
+
+# Purpose: Start profiling the SQL statements of this program.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Hooks db.sql() (see dbHooks.py); opens the slow
+#          log; the summary is printed when the program exits.  Does
+#          nothing unless SQL_PROFILE is set, or if already started.
+# Throws: propagates exceptions opening the slow log
+#
+def start ():
+    global started, fpSlow
+
+    if started or not isProfileOn():
+        return
+    started = 1
+
+    try:
+        slowLog = os.environ['SQL_SLOW_LOG']
+    except:
+        slowLog = None
+    if slowLog:
+        fpSlow = open(slowLog, 'a')
+
+    dbHooks.addSqlHook(record)
+    atexit.register(finish)
+
+# Purpose: Normalize a statement so statements from the same template
+#          are grouped.
+# Returns: str
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def normalize (statement):
+    statement = QUOTED.sub('?', statement)
+    statement = NUMBER.sub('?', statement)
+    statement = SPACE.sub(' ', statement).strip().rstrip(';').strip()
+    return IN_LIST.sub('in (?...)', statement)
+
+# Purpose: Get the key of a call (its normalized statement, or its
+#          normalized statements joined with " ; ").
+# Returns: str
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getKey (cmd):
+    if type(cmd) == list:
+        return ' ; '.join([normalize(str(c)) for c in cmd])
+    return normalize(str(cmd))
+
+# Purpose: Count the rows returned by a call.
+# Returns: integer
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def countRows (cmd, results):
+    if type(results) != list:
+        return 0
+    if type(cmd) != list:
+        return len(results)
+
+    rows = 0
+    for result in results:
+        if type(result) == list:
+            rows = rows + len(result)
+    return rows
+
+# Purpose: Record a call.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Adds the call to its group; writes it to the slow log if it
+#          is slow
+# Throws: Nothing
+#
+def record (cmd, results, seconds):
+    key = getKey(cmd)
+    rows = countRows(cmd, results)
+
+    if key not in profile:
+        profile[key] = [0, 0.0, 0.0, 0]
+    group = profile[key]
+    group[0] = group[0] + 1
+    group[1] = group[1] + seconds
+    group[2] = max(group[2], seconds)
+    group[3] = group[3] + rows
+
+    if fpSlow and seconds >= getSlowThreshold():
+        if type(cmd) == list:
+            statement = ';\n'.join([str(c) for c in cmd])
+        else:
+            statement = str(cmd)
+        fpSlow.write('%s\t%.3f sec\t%d rows\t%s\n%s\n\n' % (
+            time.strftime('%Y-%m-%d %H:%M:%S'), seconds, rows,
+            os.path.basename(sys.argv[0]),
+            statement[:SLOW_STATEMENT_SIZE]))
+        fpSlow.flush()
+
+# Purpose: Turn a statement template into a pattern that matches the
+#          normalized statements made from it.
+# Returns: compiled regular expression
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def templatePattern (template):
+
+    def placeholder (match):
+        if match.group(0)[0] == "'" or match.group(0)[-1] == 'd':
+            return '?'
+        return ANY_TEXT
+
+    normalized = normalize(PLACEHOLDER.sub(placeholder, template))
+    pattern = re.escape(normalized).replace(re.escape(ANY_TEXT), '.*?')
+    return re.compile(pattern + '$', re.DOTALL)
+
+# Purpose: Find the statement templates of the vocload modules.
+# Returns: list of (name, pattern)
+# Assumes: the templates are upper case module attributes (strings, or
+#          lists of tuples whose last item is a statement)
+# Effects: Nothing
+# Throws: Nothing
+#
+def findTemplates ():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    found = []
+
+    for (moduleName, module) in list(sys.modules.items()):
+        fileName = getattr(module, '__file__', None)
+        if not fileName or \
+                os.path.dirname(os.path.abspath(fileName)) != directory:
+            continue
+
+        for (name, value) in list(vars(module).items()):
+            if not name.isupper():
+                continue
+            if type(value) == str and SPACE.search(value.strip()):
+                found.append((name, templatePattern(value)))
+            elif type(value) == list:
+                for i in range(len(value)):
+                    if type(value[i]) == tuple and type(value[i][-1]) == str:
+                        found.append(('%s[%d]' % (name, i),
+                            templatePattern(value[i][-1])))
+
+    return found
+
+# Purpose: Name the group of a normalized statement by its template.
+# Returns: str (the template name(s), or the normalized statement if it
+#          did not come from a template)
+# Assumes: Nothing
+# Effects: Looks up the templates of the vocload modules the first
+#          time it is called
+# Throws: Nothing
+#
+def getName (key):
+    global templates
+
+    if templates is None:
+        templates = findTemplates()
+
+    names = []
+    for statement in key.split(' ; '):
+        if statement not in templateNames:
+            templateNames[statement] = None
+            for (name, pattern) in templates:
+                if pattern.match(statement):
+                    templateNames[statement] = name
+                    break
+        names.append(templateNames[statement] or statement)
+
+    return ' ; '.join(names)
+
+# Purpose: Get the summary of the groups, merged by name.
+# Returns: list of [name, count, total seconds, max seconds, rows],
+#          slowest total first
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def getSummary ():
+    merged = {}
+    for (key, group) in list(profile.items()):
+        name = getName(key)
+        if name not in merged:
+            merged[name] = [name, 0, 0.0, 0.0, 0]
+        total = merged[name]
+        total[1] = total[1] + group[0]
+        total[2] = total[2] + group[1]
+        total[3] = max(total[3], group[2])
+        total[4] = total[4] + group[3]
+
+    summary = list(merged.values())
+    summary.sort(key = lambda g: g[2], reverse = True)
+    return summary
+
+# Purpose: Print the summary table and close the slow log.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Writes to stdout
+# Throws: Nothing
+#
+def finish ():
+    global fpSlow
+
+    if fpSlow:
+        fpSlow.close()
+        fpSlow = None
+
+    if not profile:
+        return
+
+    summary = getSummary()
+    print('SQL profile of %s (%d statement groups, slowest total first):' % \
+        (os.path.basename(sys.argv[0]), len(summary)))
+    print('%8s %10s %10s %10s %10s  %s' % ('count', 'total sec', 'mean ms',
+        'max ms', 'rows', 'statement'))
+    for (name, count, total, maximum, rows) in summary[:SUMMARY_SIZE]:
+        if len(name) > 100:
+            name = name[:97] + '...'
+        print('%8d %10.3f %10.2f %10.2f %10d  %s' % (count, total,
+            1000.0 * total / count, 1000.0 * maximum, rows, name))
+    sys.stdout.flush()
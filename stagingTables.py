@@ -0,0 +1,118 @@
+#
+#  stagingTables.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Collect rows in memory for a set of temporary (staging) tables,
+#      load them into the database in a few multi-row inserts and drop
+#      the tables again.  The caller applies the staged rows to the real
+#      tables with one set-based UPDATE/DELETE/INSERT per table, instead
+#      of one statement per row.
+#
+#      All SQL is sent through vocloadlib.nl_sqlog(), so it is logged and
+#      is not executed in no-load mode.
+#
+###########################################################################
+
+import vocloadlib
+
+# number of rows sent in each insert into a staging table
+BATCH_SIZE = 1000
+
+# CLASS: StagingTables
+# IS: A set of temporary tables and the rows waiting to be loaded into
+#     them.
+# HAS: The table definitions (in creation order), the rows for each table
+#      and a log.
+# DOES: Adds rows, creates/loads the tables and drops them.
+#
+class StagingTables:
+
+    # Purpose: Constructor
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def __init__ (self,
+        definitions,    # list of (table name, column definitions) tuples
+        log             # Log.Log object
+        ):
+        self.definitions = definitions
+        self.log = log
+        self.rows = {}
+        for (table, columns) in definitions:
+            self.rows[table] = []
+        self.loaded = []
+
+
+    # Purpose: Add a row to a staging table.
+    # Returns: Nothing
+    # Assumes: Each value is already an SQL literal (quoted and escaped,
+    #          or 'null')
+    # Effects: Nothing
+    # Throws: KeyError if the table is not defined
+    #
+    def add (self, table, *values):
+        self.rows[table].append('(' + ','.join(map(str, values)) + ')')
+
+
+    # Purpose: Returns the number of rows waiting for a staging table.
+    # Returns: Integer
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def count (self, table):
+        return len(self.rows[table])
+
+
+    # Purpose: Returns true if no rows are waiting for any staging table.
+    # Returns: 1 if there are no rows, 0 if there are
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def isEmpty (self):
+        for rows in list(self.rows.values()):
+            if rows:
+                return 0
+        return 1
+
+
+    # Purpose: Create the staging tables that have rows waiting and load
+    #          the rows.
+    # Returns: Nothing
+    # Assumes: The tables do not exist
+    # Effects: Creates and loads temporary tables
+    # Throws: propagates exceptions from vocloadlib.nl_sqlog()
+    #
+    def load (self):
+        for (table, columns) in self.definitions:
+            if not self.rows[table]:
+                continue
+
+            self.loaded.append(table)
+            vocloadlib.nl_sqlog('create temporary table %s (%s)' % (table, columns), self.log)
+
+            rows = self.rows[table]
+            for i in range(0, len(rows), BATCH_SIZE):
+                vocloadlib.nl_sqlog('insert into %s values %s' % \
+                    (table, ',\n'.join(rows[i:i + BATCH_SIZE])), self.log)
+
+
+    # Purpose: Drop the staging tables created by load() and forget the
+    #          rows.
+    # Returns: Nothing
+    # Assumes: Nothing
+    # Effects: Drops temporary tables
+    # Throws: propagates exceptions from vocloadlib.nl_sqlog()
+    #
+    def drop (self):
+        for table in self.loaded:
+            vocloadlib.nl_sqlog('drop table %s' % table, self.log)
+        self.loaded = []
+
+        for table in list(self.rows.keys()):
+            self.rows[table] = []
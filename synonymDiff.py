@@ -0,0 +1,116 @@
+#
+#  synonymDiff.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Compare the synonyms of a term in the input file with its synonyms
+#      in the database and work out the smallest set of changes that
+#      makes the database match the file:
+#
+#      - synonyms with the same text and type in both are left alone
+#      - a database synonym whose text is in the file with another type
+#        has its type changed (it keeps its _Synonym_key)
+#      - the remaining database synonyms are deleted
+#      - the remaining file synonyms are inserted
+#
+#      Synonyms are matched by (text, type) in dictionaries, so the order
+#      of the synonyms does not matter and duplicates are matched one for
+#      one.
+#
+###########################################################################
+
+# CLASS: SynonymDiff
+# IS: The changes needed to make the synonyms of a term in the database
+#     match the input file.
+# HAS: inserts: list of (synonym, synonym type) to insert
+#      deletes: list of _Synonym_key to delete
+#      typeChanges: list of (_Synonym_key, new synonym type)
+# DOES: Nothing
+#
+class SynonymDiff:
+
+    def __init__ (self, inserts, deletes, typeChanges):
+        self.inserts = inserts
+        self.deletes = deletes
+        self.typeChanges = typeChanges
+
+    # Purpose: Returns true if the database already matches the file.
+    # Returns: 1 if there are no changes, 0 if there are
+    # Assumes: Nothing
+    # Effects: Nothing
+    # Throws: Nothing
+    #
+    def isEmpty (self):
+        return not (self.inserts or self.deletes or self.typeChanges)
+
+
+# Purpose: Compare file and database synonyms.
+# Returns: SynonymDiff object
+# Assumes: The synonym lists and their type (and key) lists are the same
+#          length; empty file synonyms have been removed
+# Effects: Nothing
+# Throws: Nothing
+#
+def diffSynonyms (
+    fileSynonyms,       # list of synonyms in the input file
+    fileSynonymTypes,   # list of their synonym types
+    dbSynonyms,         # list of synonyms in the database
+    dbSynonymTypes,     # list of their synonym types
+    dbSynonymKeys,      # list of their _Synonym_keys
+    compareTypes = 1    # if 0, a synonym matches on its text alone
+    ):
+
+    # Database synonyms by (text, type); the type is left out of the
+    # match if types are not compared.
+    #
+    unmatched = {}
+    for i in range(len(dbSynonyms)):
+        if compareTypes:
+            pair = (dbSynonyms[i], dbSynonymTypes[i])
+        else:
+            pair = (dbSynonyms[i], None)
+        unmatched.setdefault(pair, []).append(dbSynonymKeys[i])
+
+    # Leave the exact matches alone.
+    #
+    remaining = []
+    for i in range(len(fileSynonyms)):
+        if compareTypes:
+            pair = (fileSynonyms[i], fileSynonymTypes[i])
+        else:
+            pair = (fileSynonyms[i], None)
+        keys = unmatched.get(pair)
+        if keys:
+            keys.pop(0)
+        else:
+            remaining.append(i)
+
+    # The database synonyms that were not matched, by text.
+    #
+    byText = {}
+    for (pair, keys) in list(unmatched.items()):
+        for key in keys:
+            byText.setdefault(pair[0], []).append(key)
+
+    for keys in list(byText.values()):
+        keys.sort()
+
+    # A file synonym whose text is still in the database is a type change;
+    # anything else is new.
+    #
+    inserts = []
+    typeChanges = []
+    for i in remaining:
+        keys = byText.get(fileSynonyms[i])
+        if keys:
+            typeChanges.append((keys.pop(0), fileSynonymTypes[i]))
+        else:
+            inserts.append((fileSynonyms[i], fileSynonymTypes[i]))
+
+    deletes = []
+    for keys in list(byText.values()):
+        deletes.extend(keys)
+    deletes.sort()
+
+    return SynonymDiff(inserts, deletes, typeChanges)
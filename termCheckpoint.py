@@ -0,0 +1,117 @@
+#
+#  termCheckpoint.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Keep the progress of a chunked incremental term load (see
+#      INCREMENTAL_CHUNK_SIZE) in a checkpoint file, so a rerun of a
+#      failed load resumes after the last chunk that was committed.
+#
+#      The checkpoint is only used by a load of the same vocabulary from
+#      the same input, which is recognized by a digest of the input
+#      records; the load removes it when it has been committed.
+#
+#      The checkpoint also keeps the annotation discrepancies found in
+#      the committed records, as they are reported at the end of the load
+#      (see TermLoad.reportAnnotationDiscrepancies) and a resumed load
+#      does not compare those records again.
+#
+#      The checkpoint file has a header line:
+#          format version <tab> _Vocab_key <tab> input digest <tab>
+#          number of input records committed
+#      then one line per annotation discrepancy, a JSON list:
+#          [accID, term, message]
+#
+###########################################################################
+
+import os
+import json
+import hashlib
+
+# changes when the file format or the digest change, so older
+# checkpoints are not used
+CHECKPOINT_VERSION = '2'
+
+# separates the fields (and the records) that are hashed
+SEPARATOR = '\x1f'
+
+# Purpose: Compute the digest of the input records of a load.
+# Returns: str (hex digest)
+# Assumes: Nothing
+# Effects: Nothing
+# Throws: Nothing
+#
+def digest (
+    records     # list of term dictionaries (keyed by Termfile column)
+    ):
+    sha = hashlib.sha1()
+    for record in records:
+        fields = []
+        for name in sorted(record.keys()):
+            fields.append('%s=%s' % (name, record[name]))
+        sha.update((SEPARATOR.join(fields) + '\n').encode('utf-8'))
+    return sha.hexdigest()
+
+
+# Purpose: Read the progress of an earlier, failed load.
+# Returns: Tuple of (integer number of input records committed, list of
+#          the (accID, term, message) annotation discrepancies found in
+#          them); (0, []) if there is no checkpoint, or it is for another
+#          vocabulary, input or version
+# Assumes: Nothing
+# Effects: Reads the checkpoint file
+# Throws: Nothing
+#
+def readCheckpoint (fileName, vocabKey, inputDigest):
+    if not fileName or not os.path.exists(fileName):
+        return 0, []
+
+    try:
+        fp = open(fileName, 'r')
+        fields = fp.readline().rstrip('\n').split('\t')
+        if fields[:3] != [CHECKPOINT_VERSION, str(vocabKey), inputDigest]:
+            fp.close()
+            return 0, []
+
+        discrepancies = []
+        for line in fp:
+            discrepancies.append(tuple(json.loads(line)))
+        fp.close()
+
+        return int(fields[3]), discrepancies
+    except:
+        return 0, []
+
+
+# Purpose: Save the progress of a load.
+# Returns: Nothing
+# Assumes: The records have been committed
+# Effects: Replaces the checkpoint file (the new file is written under a
+#          temporary name first, so a failed write leaves the old one)
+# Throws: propagates exceptions writing the file
+#
+def writeCheckpoint (fileName, vocabKey, inputDigest, recordsDone,
+    discrepancies   # list of (accID, term, message)
+    ):
+    tmpName = fileName + '.tmp'
+
+    fp = open(tmpName, 'w')
+    fp.write('%s\t%s\t%s\t%d\n' % (CHECKPOINT_VERSION, vocabKey,
+        inputDigest, recordsDone))
+    for discrepancy in discrepancies:
+        fp.write(json.dumps(list(discrepancy)) + '\n')
+    fp.close()
+
+    os.replace(tmpName, fileName)
+
+
+# Purpose: Remove the checkpoint of a load.
+# Returns: Nothing
+# Assumes: The load has been committed
+# Effects: Removes the checkpoint file, if there is one
+# Throws: propagates exceptions removing the file
+#
+def removeCheckpoint (fileName):
+    if fileName and os.path.exists(fileName):
+        os.remove(fileName)
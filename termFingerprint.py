@@ -0,0 +1,121 @@
+#
+#  termFingerprint.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Fingerprint the fields of a term record that the incremental term
+#      load compares to the database (term, status, definition, comment,
+#      synonyms and synonym types), and keep the fingerprints of the last
+#      successful load of a vocabulary in a snapshot file.
+#
+#      A term whose fingerprint matches the snapshot has not changed in
+#      the input since it was loaded, so its database records need not be
+#      read or compared -- unless the term, its synonyms or its notes were
+#      modified in the database since the load (by modification_date; the
+#      term load drops those terms from the snapshot it reads).  Changes
+#      that leave no modification_date (e.g. a synonym deleted outside the
+#      load) are not seen while the snapshot is kept; removing the
+#      snapshot file makes the next load compare every term.
+#
+#      The snapshot file has a header line with the format version, the
+#      _Vocab_key and the database time the load started, then one line
+#      per term:  _Term_key <tab> fingerprint
+#
+###########################################################################
+
+import os
+import hashlib
+
+# changes when the fields or their normalization change, so older
+# snapshots are not used
+FINGERPRINT_VERSION = '2'
+
+# separates the fields (and the synonyms) that are hashed
+SEPARATOR = '\x1f'
+
+# Purpose: Compute the fingerprint of a term record.
+# Returns: str (hex digest)
+# Assumes: synonyms and synonymTypes (if given) are parallel lists
+# Effects: Nothing
+# Throws: Nothing
+#
+def fingerprint (
+    term,           # str. term
+    isObsolete,     # isObsolete bit
+    note,           # str. definition
+    comment,        # str. comment
+    synonyms,       # list of str. synonyms
+    synonymTypes    # list of str. synonym types, or None if the types are
+                    # not compared
+    ):
+    if synonymTypes is None:
+        pairs = sorted(synonyms)
+    else:
+        pairs = sorted([synonym + SEPARATOR + synonymType
+            for (synonym, synonymType) in zip(synonyms, synonymTypes)])
+
+    fields = [term, str(int(isObsolete)), str.strip(note), str.strip(comment)] + pairs
+    return hashlib.sha1(SEPARATOR.join(fields).encode('utf-8')).hexdigest()
+
+
+# Purpose: Read the fingerprints of a vocabulary's last successful load.
+# Returns: Tuple of (database time the load started, dictionary of
+#          _Term_key -> fingerprint); (None, {}) if there is no snapshot,
+#          or it is for another vocabulary or version
+# Assumes: Nothing
+# Effects: Reads the snapshot file
+# Throws: Nothing
+#
+def readSnapshot (fileName, vocabKey):
+    fingerprints = {}
+
+    if not fileName or not os.path.exists(fileName):
+        return None, fingerprints
+
+    try:
+        fp = open(fileName, 'r')
+        header = fp.readline().rstrip('\n').split('\t')
+        if header[:2] != [FINGERPRINT_VERSION, str(vocabKey)] or len(header) != 3:
+            fp.close()
+            return None, fingerprints
+
+        for line in fp:
+            termKey, value = line.rstrip('\n').split('\t')
+            fingerprints[int(termKey)] = value
+        fp.close()
+    except:
+        return None, {}
+
+    return header[2], fingerprints
+
+
+# Purpose: Save the fingerprints of a vocabulary's load.
+# Returns: Nothing
+# Assumes: The load has been committed
+# Effects: Replaces the snapshot file (the new file is written under a
+#          temporary name first, so a failed write leaves the old one)
+# Throws: propagates exceptions writing the file
+#
+def writeSnapshot (fileName, vocabKey, loadTime, fingerprints):
+    tmpName = fileName + '.tmp'
+
+    fp = open(tmpName, 'w')
+    fp.write('%s\t%s\t%s\n' % (FINGERPRINT_VERSION, vocabKey, loadTime))
+    for termKey in sorted(fingerprints.keys()):
+        fp.write('%d\t%s\n' % (termKey, fingerprints[termKey]))
+    fp.close()
+
+    os.replace(tmpName, fileName)
+
+
+# Purpose: Remove the snapshot of a vocabulary's loads.
+# Returns: Nothing
+# Assumes: Nothing
+# Effects: Removes the snapshot file, if there is one, so the next load
+#          compares every term
+# Throws: propagates exceptions removing the file
+#
+def removeSnapshot (fileName):
+    if fileName and os.path.exists(fileName):
+        os.remove(fileName)
@@ -0,0 +1,63 @@
+#
+#  termIndex.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Build an index of the terms of a vocabulary that are already in
+#      the database, keyed by _Term_key, for the incremental term load.
+#      Each entry holds the term, its note (definition), isObsolete, its
+#      comment and its synonyms/synonym types, so comparing an input
+#      record to the database is a dictionary lookup rather than a scan
+#      of all the terms of the vocabulary.
+#
+###########################################################################
+
+# Purpose: Group the rows of the term, comment and synonym queries by
+#          _Term_key.
+# Returns: Dictionary of _Term_key -> dictionary with the keys '_Term_key',
+#          'term', 'note', 'isObsolete', 'comments' (None if the term has
+#          no comment), 'synonyms', 'synonymTypes' and 'synonymKeys'
+#          (lists, in the same order)
+# Assumes: comment rows are ordered by _Object_key and chunk sequence
+#          number
+# Effects: Nothing
+# Throws: Nothing
+#
+def buildIndex (
+    terms,      # rows with _Term_key, term, note, isObsolete
+    comments,   # rows with _Object_key, note
+    synonyms    # rows with _Object_key, _Synonym_key, synonym, synonymType
+    ):
+    index = {}
+
+    for r in terms:
+        index[r['_Term_key']] = {
+            '_Term_key' : r['_Term_key'],
+            'term' : r['term'],
+            'note' : r['note'],
+            'isObsolete' : r['isObsolete'],
+            'comments' : None,
+            'synonyms' : [],
+            'synonymTypes' : [],
+            'synonymKeys' : [],
+            }
+
+    for r in comments:
+        entry = index.get(r['_Object_key'])
+        if entry is None:
+            continue
+        if entry['comments'] is None:
+            entry['comments'] = r['note']
+        else:
+            entry['comments'] = entry['comments'] + r['note']
+
+    for r in synonyms:
+        entry = index.get(r['_Object_key'])
+        if entry is None:
+            continue
+        entry['synonyms'].append(r['synonym'])
+        entry['synonymTypes'].append(r['synonymType'])
+        entry['synonymKeys'].append(r['_Synonym_key'])
+
+    return index
@@ -0,0 +1,76 @@
+#
+#  test_bulkWriter.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Check that the bulk writers load empty values as null, as db.bcp()
+#      did: a VOC_Term row written as a full load writes it (see
+#      TermLoad.addTerm and fullLoadRows.py), with an empty abbreviation
+#      and note, is copied into the local (SQLite) database and read
+#      back.
+#
+#      The writers need the MGI vocloadlib module; the test is skipped
+#      where it cannot be imported.
+#
+###########################################################################
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCALDB = os.path.join(REPO, 'localdb')
+
+# exit status of the script when vocloadlib cannot be imported
+NO_VOCLOADLIB = 77
+
+SCRIPT = '''
+import sys
+sys.path[:0] = [%(localdb)r, %(repo)r]
+
+try:
+    import vocloadlib
+except ImportError:
+    sys.exit(%(skip)d)
+
+import db
+import bulkWriter
+
+writer = bulkWriter.BulkWriter('VOC_Term')
+writer.write(1001, 1, 'term one', '', '', None, 0,
+    1001, 1001, '2024-01-01', '2024-01-01')
+writer.write(1002, 1, 'term two', 'T2', 'a note', 1, 0,
+    1001, 1001, '2024-01-01', '2024-01-01')
+writer.close()
+db.commit()
+
+for r in db.sql(\'\'\'select _Term_key, abbreviation, note, sequenceNum
+        from VOC_Term where _Term_key in (1001, 1002)
+        order by _Term_key\'\'\', 'auto'):
+    print(r['_Term_key'], r['abbreviation'], r['note'], r['sequenceNum'])
+'''
+
+def test_empty_values_are_null (tmp_path):
+    dbFile = str(tmp_path / 'test.sqlite')
+    env = dict(os.environ, LOCAL_DB_FILE = dbFile)
+
+    subprocess.check_call([sys.executable,
+        os.path.join(LOCALDB, 'createLocalDB.py'), '-f', dbFile, '-k', '1'],
+        env = env, stdout = subprocess.DEVNULL)
+
+    process = subprocess.run([sys.executable, '-c',
+        SCRIPT % {'localdb' : LOCALDB, 'repo' : REPO, 'skip' : NO_VOCLOADLIB}],
+        env = env, stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+        universal_newlines = True)
+
+    if process.returncode == NO_VOCLOADLIB:
+        pytest.skip('vocloadlib is not available')
+    assert process.returncode == 0, process.stderr
+
+    assert process.stdout.splitlines() == [
+        '1001 None None None',
+        '1002 T2 a note 1',
+        ]